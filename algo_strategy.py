@@ -1,6 +1,5 @@
 import gamelib
 import random
-import math
 import warnings
 from sys import maxsize
 import json
@@ -32,7 +31,7 @@ class AlgoStrategy(gamelib.AlgoCore):
         """
         gamelib.debug_write('Configuring your custom algo strategy...')
         self.config = config
-        global WALL, FACTORY, TURRET, SCOUT, DEMOLISHER, INTERCEPTOR, MP, SP, all_turn_states
+        global WALL, FACTORY, TURRET, SCOUT, DEMOLISHER, INTERCEPTOR, MP, SP
         WALL = config["unitInformation"][0]["shorthand"]
         FACTORY = config["unitInformation"][1]["shorthand"]
         TURRET = config["unitInformation"][2]["shorthand"]
@@ -42,8 +41,82 @@ class AlgoStrategy(gamelib.AlgoCore):
         MP = 1
         SP = 0
         # This is a good place to do initial setup
-        all_turn_states = []
+        # We only use breach, selfDestruct, spawn, damage, death and attack events, other frames are skipped undecoded
+        self.subscribe_frames(gamelib.FRAMES_EVENTS, ["breach", "selfDestruct", "spawn", "damage", "death", "attack"])
+        # Every breach and self destruct of the last action phase, in frame order
+        self.frame_history = gamelib.FrameHistory(window=2, event_types=["breach", "selfDestruct"])
+        self.event_index = gamelib.EventIndex(window=4, event_types=["breach", "selfDestruct"])
+        self.spawn_tracker = gamelib.SpawnTracker(player_index=1, history=4)
+        self.damage_timeline = gamelib.DamageTimeline(window=2)
+        self.turret_stats = gamelib.TurretStats()
+        self.opponent_model = gamelib.OpponentModel(player_index=1)
+        # We count one MP per factory, upgraded or not
+        self.forecaster = gamelib.ResourceForecaster(config, factory_income=(0, 1.0), upgraded_factory_income=(0, 1.0))
+        self.build_planner = gamelib.BuildPlanner(config)
         self.scored_on_locations = []
+        self.previous_state = None
+        # Board-only analyses used at the start of on_turn, prepared during the previous action phase
+        self.register_precompute("spawn_damages", self.spawn_damages)
+        # Damage estimates of spawn locations, reused while the board stays the same
+        self.transpositions = gamelib.TranspositionTable()
+        self.register_regions()
+        self.register_layouts()
+
+    def register_regions(self):
+        """
+        Board areas used by several helpers, built once so they can be tested in O(1)
+        """
+        # The enemy's side of our attack paths
+        gamelib.register_region("left_base", gamelib.Region.from_rows({
+            10: (3, 14), 11: (2, 14), 12: (1, 14), 13: (0, 14), 14: (0, 14),
+            15: (1, 14), 16: (2, 14), 17: (3, 14), 18: (3, 14)}))
+        gamelib.register_region("right_base", gamelib.Region.from_rows({
+            10: (14, 25), 11: (14, 26), 12: (14, 27), 13: (14, 28), 14: (14, 28),
+            15: (14, 27), 16: (14, 26), 17: (14, 25), 18: (14, 24)}))
+        gamelib.register_region("front_enemy_rows", gamelib.Region.from_rows({14: (0, 28), 15: (1, 27), 16: (2, 26)}))
+        # Enemy halves compared by structure health, they share the two middle columns
+        top_half = gamelib.get_region("top_half")
+        gamelib.register_region("enemy_left", top_half & gamelib.Region.from_rows({y: (0, 15) for y in range(14, 28)}))
+        gamelib.register_region("enemy_right", top_half & gamelib.Region.from_rows({y: (13, 28) for y in range(14, 28)}))
+        # Factory blocks, shifted away from the side that is opened for attacks
+        gamelib.register_region("factories_right", gamelib.Region.from_rows({
+            5: (11, 19), 6: (10, 20), 7: (9, 21), 8: (8, 22), 9: (7, 23), 10: (9, 24), 11: (14, 25)}))
+        gamelib.register_region("factories_left", gamelib.Region.from_rows({
+            5: (9, 17), 6: (8, 18), 7: (7, 19), 8: (6, 20), 9: (5, 20), 10: (4, 19), 11: (3, 11)}))
+
+    def register_layouts(self):
+        """
+        Defenses built by starting_defense, deploy_left, deploy_right and more_factories, in the order they are built.
+        deploy_right builds the mirror of deploy_left, except for its factories and turrets
+        """
+        BUILD, BUILD_OR_UPGRADE, UPGRADE = gamelib.BUILD, gamelib.BUILD_OR_UPGRADE, gamelib.UPGRADE
+        Layout = gamelib.Layout
+        self.layouts = {}
+
+        factories = [[13,3],[14,3],[13,4]]
+        self.layouts["starting_defense"] = (Layout.from_locations(TURRET, [[6,12],[21,12]])
+            + Layout.from_locations(FACTORY, factories) + Layout.from_locations(FACTORY, factories, UPGRADE))
+
+        # Diagonal wall on the right, with the walls joining it to the factories, and the short wall on the left
+        left_front = (Layout.from_locations(WALL, [[18,4],[17,4],[16,4],[15,3],[14,2]] + [[14 + num, num] for num in range(5, 13)])
+            + Layout.from_locations(WALL, [[13 - num, num + 2] for num in range(1, 9)])
+            + Layout([(WALL, [8,13], BUILD), (TURRET, [8,12], BUILD_OR_UPGRADE), (TURRET, [6,10], BUILD_OR_UPGRADE)]))
+        factory_row = Layout.from_locations(FACTORY, [[x, 4] for x in range(12, 16)], BUILD_OR_UPGRADE)
+        left_walls = Layout.from_locations(WALL, [[8,10],[3,13],[4,13],[5,13],[6,13],[7,13],[7,12],[27,13],[26,13]])
+        self.layouts["left_core"] = left_front + factory_row + Layout.from_locations(TURRET, [[4,12],[7,10]]) + left_walls
+        self.layouts["right_core"] = left_front.mirrored() + factory_row + Layout.from_locations(TURRET, [[23,12],[20,10],[20,9]]) + left_walls.mirrored()
+        self.layouts["left_turrets"] = Layout.from_locations(TURRET, [[6,12],[5,12],[4,12]])
+        self.layouts["right_turrets"] = self.layouts["left_turrets"].mirrored()
+        # Upgraded after the turrets, the front wall and the walls of the core layout
+        self.layouts["left_key_walls"] = Layout.from_locations(WALL, [[8,13]]) + left_walls
+        self.layouts["right_key_walls"] = self.layouts["left_key_walls"].mirrored()
+
+        for side in ("right", "left"):
+            locations = gamelib.get_region("factories_" + side).locations()
+            self.layouts["factories_" + side] = Layout.from_locations(FACTORY, locations) + Layout.from_locations(FACTORY, locations, UPGRADE)
+
+        for layout in self.layouts.values():
+            layout.compile(self.config)
 
     def on_turn(self, turn_state):
         """
@@ -53,11 +126,25 @@ class AlgoStrategy(gamelib.AlgoCore):
         unit deployments, and transmitting your intended deployments to the
         game engine.
         """
-        game_state = gamelib.GameState(self.config, turn_state)
+        # Later turns update the previous board instead of parsing a new one
+        if self.previous_state is None:
+            game_state = gamelib.GameState(self.config, turn_state, self.unit_registry)
+        else:
+            game_state = gamelib.GameState.from_previous(self.previous_state, turn_state)
+        self.previous_state = game_state
+        self.opponent_model.observe(game_state)
+        # The last action phase is over, fold it into the spawn heatmap and rank the structures with it
+        self.spawn_tracker.update()
+        self.turret_stats.update()
         turn_number = game_state.turn_number
-        projected_mp = game_state.project_future_MP(1)
-        num_factories = self.get_num_factories(game_state)
-        future_mp = num_factories + projected_mp
+        self.transpositions.new_generation()
+        future_mp = self.future_mp(game_state)
+        # Spawn damage estimates prepared during the action phase, otherwise they are estimated when needed
+        spawn_damages = self.precomputed("spawn_damages", game_state, compute=False)
+        if spawn_damages is not None:
+            board_hash = game_state.game_map.zobrist_hash
+            for location, (damage, path_length) in spawn_damages.items():
+                self.transpositions.store(board_hash, (), [list(location)], 0, damage, 0, path_length)
         enemy_unit_health_left = self.enemy_unit_health_left(game_state)
         enemy_unit_health_right = self.enemy_unit_health_right(game_state)
 
@@ -91,21 +178,8 @@ class AlgoStrategy(gamelib.AlgoCore):
 
     # Basic Starting Defense
     def starting_defense(self, game_state):
-        # Turrets
-        #tur_pos = [[2,12], [25,12], [10,12], [17,12]]
-        tur_pos = [[6,12],[21,12]]
-        for pos in tur_pos:
-            if not game_state.contains_stationary_unit(pos):
-                game_state.attempt_spawn(TURRET, pos)
-               
-        #Factories
-        fact_pos = [[13,3],[14,3],[13,4]]
-        for pos in fact_pos:
-            if not game_state.contains_stationary_unit(pos):
-                game_state.attempt_spawn(FACTORY, pos)
-        for pos in fact_pos:
-            if game_state.contains_stationary_unit(pos):
-                game_state.attempt_upgrade(pos)
+        # Turrets, then factories which are upgraded once they are all built
+        self.layouts["starting_defense"].apply(game_state)
 
     
     # Initial Deploy decision(Right or Left)
@@ -179,78 +253,9 @@ class AlgoStrategy(gamelib.AlgoCore):
     def deploy_left(self, game_state):
         my_factories = self.get_num_factories(game_state)
         my_occupied = self.my_occupied(game_state)
-        projected_mp = game_state.project_future_MP(1)
-        num_factories = self.get_num_factories(game_state)
-        future_mp = num_factories + projected_mp
+        future_mp = self.future_mp(game_state)
 
-        wall_pos = [] # Right
-        for num in range(4, 13):
-            x = game_state.HALF_ARENA + num
-            y =  num
-            wall_pos.append([int(x), int(y)])
-            wall_pos.append([17,4])
-            wall_pos.append([16,4])
-            wall_pos.append([15,3])
-            wall_pos.append([14,2])
-        for pos in wall_pos:
-            if not game_state.contains_stationary_unit(pos):
-                game_state.attempt_spawn(WALL, pos)
-                
-        wall_pos = [] # Left
-        for num in range(1, 9):
-            x = game_state.HALF_ARENA - 1 - num
-            y =  num + 2
-            wall_pos.append([int(x), int(y)])
-        for pos in wall_pos:
-            if not game_state.contains_stationary_unit(pos):
-                game_state.attempt_spawn(WALL, pos)
-        #[1,12],[2,12],[3,12]
-        wall_pos_00 = [[8,13]]
-        #if game_state.number_affordable(SCOUT) > 40 or future_mp > 40 or game_state.enemy_health <= 15:
-        #    wall_pos_00.remove([1,12])
-        #    wall_pos_00.remove([2,12])
-
-        tur_pos = [[8,12]]
-        for pos in wall_pos_00:
-            if not game_state.contains_stationary_unit(pos):
-                game_state.attempt_spawn(WALL, pos)
-        for pos in tur_pos:
-            if not game_state.contains_stationary_unit(pos):
-                game_state.attempt_spawn(TURRET, pos)
-            else:
-                game_state.attempt_upgrade(pos)
-
-        tur_pos = [[6,10]]
-        for pos in tur_pos:
-            if not game_state.contains_stationary_unit(pos):
-                game_state.attempt_spawn(TURRET, pos)
-            else:
-                game_state.attempt_upgrade(pos)
-
-        fact_pos = []
-        for num in range(12, 16):
-            x = num
-            y = 4
-            fact_pos.append([int(x), int(y)])
-        for pos in fact_pos:
-            if not game_state.contains_stationary_unit(pos):
-                game_state.attempt_spawn(FACTORY, pos)
-            else:
-                game_state.attempt_upgrade(pos)
-        #[3,12],
-        tur_pos = [[4,12]]
-        for pos in tur_pos:
-            if not game_state.contains_stationary_unit(pos):
-                game_state.attempt_spawn(TURRET, pos)
-        #[4,11],,[25,12]
-        tur_pos = [[7,10]]
-        for pos in tur_pos:
-            if not game_state.contains_stationary_unit(pos):
-                game_state.attempt_spawn(TURRET, pos)
-        wall_pos_01 = [[8,10],[3,13],[4,13],[5,13],[6,13],[7,13],[7,12],[27,13],[26,13]]
-        for pos in wall_pos_01:
-            if not game_state.contains_stationary_unit(pos):
-                game_state.attempt_spawn(WALL, pos)
+        self.plan_layout(game_state, "left_core")
         
         if game_state.number_affordable(SCOUT) > 40 or future_mp > 40 or game_state.enemy_health <= 15:
             # ,[1,12],[2,12]
@@ -269,7 +274,7 @@ class AlgoStrategy(gamelib.AlgoCore):
             for pos in my_occupied:
                 if game_state.contains_unit_of_type(TURRET, pos) != False:
                     my_turrets.append(pos)
-            for pos in my_turrets:
+            for pos in self.turret_stats.prioritize(my_turrets, 0):
                 game_state.attempt_upgrade(pos)
 
         #wall_pos_02 = [[7,13],[6,13],[5,13]]
@@ -277,13 +282,11 @@ class AlgoStrategy(gamelib.AlgoCore):
         #    if not game_state.contains_stationary_unit(pos):
         #        game_state.attempt_spawn(WALL, pos)
 
-        tur_pos = [[6,12],[5,12],[4,12]]
-        for pos in tur_pos:
-            if not game_state.contains_stationary_unit(pos):
-                game_state.attempt_spawn(TURRET, pos)
+        self.layouts["left_turrets"].apply(game_state)
         
         # Upgrade as many key walls as possible.
-        wall_pos = wall_pos_00 + wall_pos_01 #+ wall_pos_02
+        # Walls the last attack would destroy again are upgraded first
+        wall_pos = self.damage_timeline.prioritize(self.layouts["left_key_walls"].locations(), game_state.game_map, game_state.turn_number - 1)
         for pos in wall_pos:
             game_state.attempt_upgrade(pos)
 
@@ -293,7 +296,7 @@ class AlgoStrategy(gamelib.AlgoCore):
             for pos in my_occupied:
                 if game_state.contains_unit_of_type(TURRET, pos) != False:
                     my_turrets.append(pos)
-            for pos in my_turrets:
+            for pos in self.turret_stats.prioritize(my_turrets, 0):
                 game_state.attempt_upgrade(pos)
         
         if game_state.number_affordable(WALL) > 200:
@@ -306,79 +309,9 @@ class AlgoStrategy(gamelib.AlgoCore):
     def deploy_right(self, game_state):
         my_factories = self.get_num_factories(game_state)
         my_occupied = self.my_occupied(game_state)
-        projected_mp = game_state.project_future_MP(1)
-        num_factories = self.get_num_factories(game_state)
-        future_mp = num_factories + projected_mp
+        future_mp = self.future_mp(game_state)
 
-        wall_pos = [] # Left
-        for num in range(4, 13):
-            x = game_state.HALF_ARENA - 1 - num
-            y =  num
-            wall_pos.append([int(x), int(y)])
-            wall_pos.append([10,4])
-            wall_pos.append([11,4])
-            wall_pos.append([12,3])
-            wall_pos.append([13,2])
-        for pos in wall_pos:
-            if not game_state.contains_stationary_unit(pos):
-                game_state.attempt_spawn(WALL, pos)
-        
-        wall_pos = [] # Right
-        for num in range(1, 9):
-            x = game_state.HALF_ARENA + num
-            y =  num + 2
-            wall_pos.append([int(x), int(y)])
-        for pos in wall_pos:
-            if not game_state.contains_stationary_unit(pos):
-                game_state.attempt_spawn(WALL, pos)
-        #[24,12],[25,12],[26,12],
-        wall_pos_00 = [[19,13]]
-        #if game_state.number_affordable(SCOUT) > 40 or future_mp > 40 or game_state.enemy_health <= 15:
-        #    wall_pos_00.remove([26,12])
-        #    wall_pos_00.remove([25,12])
-
-        tur_pos = [[19,12]]
-        for pos in wall_pos_00:
-            if not game_state.contains_stationary_unit(pos):
-                game_state.attempt_spawn(WALL, pos)
-        for pos in tur_pos:
-            if not game_state.contains_stationary_unit(pos):
-                game_state.attempt_spawn(TURRET, pos)
-            else:
-                game_state.attempt_upgrade(pos)
-        
-        tur_pos = [[21,10]]
-        for pos in tur_pos:
-            if not game_state.contains_stationary_unit(pos):
-                game_state.attempt_spawn(TURRET, pos)
-            else:
-                game_state.attempt_upgrade(pos)
-        
-        fact_pos = []
-        for num in range(12, 16):
-            x = num
-            y = 4
-            fact_pos.append([int(x), int(y)])
-        for pos in fact_pos:
-            if not game_state.contains_stationary_unit(pos):
-                game_state.attempt_spawn(FACTORY, pos)
-            else:
-                game_state.attempt_upgrade(pos)
-               
-        tur_pos = [[23,12]]
-        for pos in tur_pos:
-            if not game_state.contains_stationary_unit(pos):
-                game_state.attempt_spawn(TURRET, pos)
-        
-        #[23,11],,[2,12]
-        tur_pos = [[20,10],[20,9]]
-        for pos in tur_pos:
-            if not game_state.contains_stationary_unit(pos):
-                game_state.attempt_spawn(TURRET, pos)
-        wall_pos_01 = [[19,10],[24,13],[23,13],[22,13],[21,13],[20,13],[20,12],[0,13],[1,13]]
-        for pos in wall_pos_01:
-            if not game_state.contains_stationary_unit(pos):
-                game_state.attempt_spawn(WALL, pos)
+        self.plan_layout(game_state, "right_core")
         
         if game_state.number_affordable(SCOUT) > 40 or future_mp > 40 or game_state.enemy_health <= 15:
             #,[26,12],[25,12]
@@ -397,7 +330,7 @@ class AlgoStrategy(gamelib.AlgoCore):
             for pos in my_occupied:
                 if game_state.contains_unit_of_type(TURRET, pos) != False:
                     my_turrets.append(pos)
-            for pos in my_turrets:
+            for pos in self.turret_stats.prioritize(my_turrets, 0):
                 game_state.attempt_upgrade(pos)
         
         #wall_pos_02 = [[20,13],[21,13],[22,13]]
@@ -405,13 +338,11 @@ class AlgoStrategy(gamelib.AlgoCore):
         #    if not game_state.contains_stationary_unit(pos):
         #        game_state.attempt_spawn(WALL, pos)
 
-        tur_pos = [[21,12],[22,12],[23,12]]
-        for pos in tur_pos:
-            if not game_state.contains_stationary_unit(pos):
-                game_state.attempt_spawn(TURRET, pos)
+        self.layouts["right_turrets"].apply(game_state)
         
         # Upgrade as many key walls as possible.
-        wall_pos = wall_pos_00 + wall_pos_01 #+ wall_pos_02
+        # Walls the last attack would destroy again are upgraded first
+        wall_pos = self.damage_timeline.prioritize(self.layouts["right_key_walls"].locations(), game_state.game_map, game_state.turn_number - 1)
         for pos in wall_pos:
             game_state.attempt_upgrade(pos)
         
@@ -421,7 +352,7 @@ class AlgoStrategy(gamelib.AlgoCore):
             for pos in my_occupied:
                 if game_state.contains_unit_of_type(TURRET, pos) != False:
                     my_turrets.append(pos)
-            for pos in my_turrets:
+            for pos in self.turret_stats.prioritize(my_turrets, 0):
                 game_state.attempt_upgrade(pos)
         
         if game_state.number_affordable(WALL) > 200:
@@ -435,73 +366,14 @@ class AlgoStrategy(gamelib.AlgoCore):
     def more_factories(self, game_state):
     
         if not game_state.contains_stationary_unit([9,4]):
-            fact_pos = []
-            for num in range(11,19):
-                x = num
-                y = 5
-                fact_pos.append([int(x), int(y)])
-            for num in range(10,20):
-                x = num
-                y = 6
-                fact_pos.append([int(x), int(y)])
-            for num in range(9,21):
-                x = num
-                y = 7
-                fact_pos.append([int(x), int(y)])
-            for num in range(8,22):
-                x = num
-                y = 8
-                fact_pos.append([int(x), int(y)])
-            for num in range(7,23):
-                x = num
-                y = 9
-                fact_pos.append([int(x), int(y)])
-            for num in range(9,24):
-                x = num
-                y = 10
-                fact_pos.append([int(x), int(y)])
-            for num in range(14,25):
-                x = num
-                y = 11
-                fact_pos.append([int(x), int(y)])            
-
+            layout = self.layouts["factories_right"]
         elif not game_state.contains_stationary_unit([18,4]):
-            fact_pos = []
-            for num in range(9,17):
-                x = num
-                y = 5
-                fact_pos.append([int(x), int(y)])
-            for num in range(8,18):
-                x = num
-                y = 6
-                fact_pos.append([int(x), int(y)])
-            for num in range(7,19):
-                x = num
-                y = 7
-                fact_pos.append([int(x), int(y)])
-            for num in range(6,20):
-                x = num
-                y = 8
-                fact_pos.append([int(x), int(y)])
-            for num in range(5,20):
-                x = num
-                y = 9
-                fact_pos.append([int(x), int(y)])
-            for num in range(4,19):
-                x = num
-                y = 10
-                fact_pos.append([int(x), int(y)])
-            for num in range(3,11):
-                x = num
-                y = 11
-                fact_pos.append([int(x), int(y)])
-
-        for pos in fact_pos:
-            if not game_state.contains_stationary_unit(pos) and game_state.number_affordable(FACTORY) > 2:
-                game_state.attempt_spawn(FACTORY, pos)
-        for pos in fact_pos:
-            if game_state.contains_stationary_unit(pos):
-                game_state.attempt_upgrade(pos)
+            layout = self.layouts["factories_left"]
+        else:
+            return
+
+        # Keep enough SP for two more factories while building, then upgrade what is there
+        layout.apply(game_state, reserve=2)
 
     def main_atk(self, game_state): 
         enemy_mp = game_state.get_resource(1, 1)
@@ -514,28 +386,9 @@ class AlgoStrategy(gamelib.AlgoCore):
         enemy_occupied = self.enemy_occupied(game_state)
         enemy_turrets = self.enemy_turrets(game_state)
         turn_number = game_state.turn_number
-        projected_mp = game_state.project_future_MP(1)
-        num_factories = self.get_num_factories(game_state)
-        future_mp = num_factories + projected_mp
-
-        front_enemy_rows = []
-        for num in range (0,28):
-            x = num
-            y = 14
-            front_enemy_rows.append([int(x), int(y)])
-        for num in range (1,27):
-            x = num
-            y = 15
-            front_enemy_rows.append([int(x), int(y)])
-        for num in range (2,26):
-            x = num
-            y = 16
-            front_enemy_rows.append([int(x), int(y)])
-
-        occupied_front = []
-        for pos in front_enemy_rows:
-            if pos in enemy_occupied:
-                occupied_front.append(pos)
+        future_mp = self.future_mp(game_state)
+
+        occupied_front = gamelib.get_region("front_enemy_rows").count_in_region(enemy_occupied)
 
         enemy_unit_health_left = self.enemy_unit_health_left(game_state)
         enemy_unit_health_right = self.enemy_unit_health_right(game_state)
@@ -599,7 +452,7 @@ class AlgoStrategy(gamelib.AlgoCore):
         
         dem_stack_damage = game_state.number_affordable(DEMOLISHER) * 6 * 2 * 4.5
 
-        if dem_stack_damage > 300 and game_state.number_affordable(SCOUT) < 40 and future_mp < 40 and enemy_mp < 30 or len(occupied_front) > 25 and dem_stack_damage > 350 and game_state.number_affordable(SCOUT) < 45 and enemy_mp < 30:
+        if dem_stack_damage > 300 and game_state.number_affordable(SCOUT) < 40 and future_mp < 40 and enemy_mp < 30 or occupied_front > 25 and dem_stack_damage > 350 and game_state.number_affordable(SCOUT) < 45 and enemy_mp < 30:
             #gamelib.debug_write("Demolisher atk")
             self.demolisher_atk(game_state)
         elif scout_stack_health > total_tur_scout_damage and turn_number > 1 and enemy_mp < my_hp + 15 or game_state.number_affordable(SCOUT) >= 45:
@@ -617,9 +470,7 @@ class AlgoStrategy(gamelib.AlgoCore):
         friendly_edges = game_state.game_map.get_edge_locations(game_state.game_map.BOTTOM_LEFT) + game_state.game_map.get_edge_locations(game_state.game_map.BOTTOM_RIGHT)
         deploy_locations = self.filter_blocked_locations(friendly_edges, game_state)
         turn_number = game_state.turn_number
-        projected_mp = game_state.project_future_MP(1)
-        num_factories = self.get_num_factories(game_state)
-        future_mp = num_factories + projected_mp
+        future_mp = self.future_mp(game_state)
 
         enemy_unit_health_left = self.enemy_unit_health_left(game_state)
         enemy_unit_health_right = self.enemy_unit_health_right(game_state)
@@ -743,6 +594,9 @@ class AlgoStrategy(gamelib.AlgoCore):
 
         my_turret_dmg = tur_upgraded_scout_damage + tur_non_upgraded_scout_damage
 
+        # Breaches last turn, or an opponent that usually attacks with this much MP
+        expect_attack = len(breaches_on_me) > 0 or self.opponent_model.attack_probability(enemy_mp) > 0.5
+
        #if game_state.contains_stationary_unit([18,4]) and len(breaches_on_me) > 0 or enemy_mp * 15 > my_turret_dmg and game_state.contains_stationary_unit([18,4]):
        #    game_state.attempt_spawn(INTERCEPTOR, [5,8], 1)
        #elif game_state.contains_stationary_unit([9,4]) and len(breaches_on_me) > 0 or enemy_mp * 15 > my_turret_dmg and game_state.contains_stationary_unit([9,4]):
@@ -751,23 +605,23 @@ class AlgoStrategy(gamelib.AlgoCore):
        #    return
 
         if enemy_mp > 10 and enemy_mp <= 20 and my_turret_dmg < enemy_mp * 15:
-            if game_state.contains_stationary_unit([18,4]) and len(breaches_on_me) > 0 and game_state.contains_stationary_unit([18,4]):
+            if game_state.contains_stationary_unit([18,4]) and expect_attack and game_state.contains_stationary_unit([18,4]):
                 game_state.attempt_spawn(INTERCEPTOR, [5,8], 1)
-            elif game_state.contains_stationary_unit([9,4]) and len(breaches_on_me) > 0 and game_state.contains_stationary_unit([9,4]):
+            elif game_state.contains_stationary_unit([9,4]) and expect_attack and game_state.contains_stationary_unit([9,4]):
                 game_state.attempt_spawn(INTERCEPTOR, [22,8], 1)
             else:
                 return
         elif enemy_mp > 20 and enemy_mp <= 30 and my_turret_dmg < enemy_mp * 15:    
-            if game_state.contains_stationary_unit([18,4]) and len(breaches_on_me) > 0 and game_state.contains_stationary_unit([18,4]):
+            if game_state.contains_stationary_unit([18,4]) and expect_attack and game_state.contains_stationary_unit([18,4]):
                 game_state.attempt_spawn(INTERCEPTOR, [5,8], 3)
-            elif game_state.contains_stationary_unit([9,4]) and len(breaches_on_me) > 0 and game_state.contains_stationary_unit([9,4]):
+            elif game_state.contains_stationary_unit([9,4]) and expect_attack and game_state.contains_stationary_unit([9,4]):
                 game_state.attempt_spawn(INTERCEPTOR, [22,8], 3)
             else:
                 return
         elif enemy_mp > 40 and my_turret_dmg < enemy_mp * 15:
-            if game_state.contains_stationary_unit([18,4]) and len(breaches_on_me) > 0 and game_state.contains_stationary_unit([18,4]):
+            if game_state.contains_stationary_unit([18,4]) and expect_attack and game_state.contains_stationary_unit([18,4]):
                 game_state.attempt_spawn(INTERCEPTOR, [5,8], 5)
-            elif game_state.contains_stationary_unit([9,4]) and len(breaches_on_me) > 0 and game_state.contains_stationary_unit([9,4]):
+            elif game_state.contains_stationary_unit([9,4]) and expect_attack and game_state.contains_stationary_unit([9,4]):
                 game_state.attempt_spawn(INTERCEPTOR, [22,8], 5)
             else: 
                 return
@@ -993,78 +847,37 @@ class AlgoStrategy(gamelib.AlgoCore):
     def on_action_frame(self, turn_string):
         # Let's record at what position we get scored on
         state = json.loads(turn_string)
-        #events = state["events"]
-        #breaches = events["breach"]
-        #selfDestructs = events["selfDestruct"]
-        try:
-            all_turn_states[state["turnInfo"][1]][state["turnInfo"][2]] = state
-        except Exception:
-            all_turn_states.append([])
-            all_turn_states[state["turnInfo"][1]].append(state)
+        self.frame_history.record(state)
+        self.event_index.record(state)
+        self.spawn_tracker.record(state)
+        self.damage_timeline.record(state)
+        self.turret_stats.record(state)
+        self.opponent_model.record(state)
     def detect_breaches_on_opponent(self, game_state):
-        list_breaches = []
         if game_state.turn_number != 0:
-            for frame in all_turn_states[game_state.turn_number -1]:
-                for breach in frame["events"]["breach"]:
-                    if breach[4] == 1:
-                        list_breaches.append(breach[0])
-            return list_breaches
+            return self.frame_history.locations(game_state.turn_number - 1, "breach", 0)
     #Detect breaches made on us
     def detect_breaches_on_self(self, game_state):
-        list_breaches = []
         if game_state.turn_number != 0:
-            for frame in all_turn_states[game_state.turn_number -1]:
-                for breach in frame["events"]["breach"]:
-                    if breach[4] == 2:
-                        list_breaches.append(breach[0])
-            return list_breaches
+            return self.frame_history.locations(game_state.turn_number - 1, "breach", 1)
     # Check if we self destructed last round
     def detect_our_selfDestructs(self, game_state):
-        list_selfDestructs = []
         if game_state.turn_number != 0:
-            for frame in all_turn_states[game_state.turn_number -1]:
-                for selfDestruct in frame["events"]["selfDestruct"]:
-                    if selfDestruct[4] == 1:
-                        list_selfDestructs.append(selfDestruct[0])
-            return list_selfDestructs
+            return self.frame_history.locations(game_state.turn_number - 1, "selfDestruct", 0)
 
     def enemy_unit_health_right(self, game_state):
-        enemy_occupied = self.enemy_occupied(game_state)
-        for pos in enemy_occupied:
-            if pos[0] < 13:
-               enemy_occupied.remove(pos)
-        total_health = 0
-        for pos in enemy_occupied:
-            unit = game_state.game_map[pos][0] 
-            total_health = unit.health + total_health
-        return total_health
+        return game_state.game_map.region_totals(gamelib.get_region("enemy_right"), 1)[0]
     
     def enemy_unit_health_left(self, game_state):
-        enemy_occupied = self.enemy_occupied(game_state)
-        for pos in enemy_occupied:
-            if pos[0] > 14:
-               enemy_occupied.remove(pos)
-        total_health = 0
-        for pos in enemy_occupied:
-            unit = game_state.game_map[pos][0] 
-            total_health = unit.health + total_health
-
-        return total_health
+        return game_state.game_map.region_totals(gamelib.get_region("enemy_left"), 1)[0]
 
     # Breaches on right side
     def right_breached_on_self(self, game_state):
-        list_breaches = self.detect_breaches_on_self(game_state)
         right_edge = self.bottom_right(game_state)
-        
-        check = any(i in list_breaches for i in right_edge)
-        if check is True:
-            return True 
-        else:
-            return False
+        return self.event_index.any_at(game_state.turn_number - 1, "breach", 1, right_edge)
         
     # Breaches on the right side, at top
     def right_top_breached(self, game_state):
-        list_breaches = self.detect_breaches_on_self(game_state)
         my_right_top = []
         for num in range(10, 14):
             x = game_state.HALF_ARENA + num
@@ -1072,39 +885,21 @@ class AlgoStrategy(gamelib.AlgoCore):
             my_right_top.append([int(x), int(y)])
         
         #gamelib.debug_write("Right Top: ",my_right_top)
-        check = any(i in list_breaches for i in my_right_top)
-
-        if check is True:
-            return True 
-        else:
-            return False
+        return self.event_index.any_at(game_state.turn_number - 1, "breach", 1, my_right_top)
 
     # Breaches on left side
     def left_breached_on_self(self, game_state):
-        list_breaches = self.detect_breaches_on_self(game_state)
         left_edge = self.bottom_left(game_state)
-        
-        check = any(i in list_breaches for i in left_edge)
-
-        if check is True:
-            return True 
-        else:
-            return False
+        return self.event_index.any_at(game_state.turn_number - 1, "breach", 1, left_edge)
     # Breaches on the right side, at top
     def left_top_breached(self, game_state):
-        list_breaches = self.detect_breaches_on_self(game_state)
         my_left_top = []
         for num in range(10, 14):
             x = game_state.HALF_ARENA - 1 - num
             y = num
             my_left_top.append([int(x), int(y)])
         #gamelib.debug_write("My top left ", my_left_top)
-        check = any(i in list_breaches for i in my_left_top)
-
-        if check is True:
-            return True 
-        else:
-            return False
+        return self.event_index.any_at(game_state.turn_number - 1, "breach", 1, my_left_top)
     # Bottom left edges
     def bottom_left(self, game_state):
         bottom_left = []
@@ -1130,38 +925,24 @@ class AlgoStrategy(gamelib.AlgoCore):
         return filtered
     # Get my occupied locations
     def my_occupied(self, game_state):
-        bottom_half = []
-        for i in range(game_state.ARENA_SIZE):
-            for j in range(math.floor(game_state.ARENA_SIZE / 2)):
-                if (game_state.game_map.in_arena_bounds([i, j])):
-                    bottom_half.append([i, j])
-        bottom_occupied = []
-        for pos in bottom_half:
-            if game_state.contains_stationary_unit(pos):
-                bottom_occupied.append(pos)
-        return bottom_occupied
+        bottom_occupied = game_state.game_map.structure_region() & gamelib.get_region("bottom_half")
+        return sorted(bottom_occupied.locations())
     # Get enemy occupied positions
     def enemy_occupied(self, game_state): 
-        top_half = []
-        for i in range(game_state.ARENA_SIZE):
-            for j in range(math.floor(game_state.ARENA_SIZE * 2)):
-                if (game_state.game_map.in_arena_bounds([i, j]) and j > 13):
-                    top_half.append([i, j])
-        top_occupied = []
-        for pos in top_half:
-            if game_state.contains_stationary_unit(pos):
-                top_occupied.append(pos) 
-        return top_occupied     
+        top_occupied = game_state.game_map.structure_region() & gamelib.get_region("top_half")
+        return sorted(top_occupied.locations())
+    # Build a layout in priority order, skipping the entries we can not afford
+    def plan_layout(self, game_state, name):
+        self.build_planner.clear()
+        self.build_planner.add_layout(self.layouts[name])
+        return self.build_planner.apply(game_state)
+    # MP we will have next turn, counting factories
+    def future_mp(self, game_state):
+        return self.forecaster.mp(game_state, 1)
+
     # Get how many factories I have
     def get_num_factories(self, game_state):
-        bottom_occupied = self.my_occupied(game_state)
-
-        my_fact_pos = []
-        for pos in bottom_occupied:
-            if game_state.contains_unit_of_type(FACTORY, pos) != False: 
-                my_fact_pos.append(pos)
-
-        return len(my_fact_pos)
+        return self.forecaster.factories(game_state.game_map, 0)[0]
 
     # Try and get enemy factory numbers, for now I guess I'll assume they're in the back.
     def get_enemy_factories(self, game_state):
@@ -1176,17 +957,37 @@ class AlgoStrategy(gamelib.AlgoCore):
     # Find least damage spawn (From starter python-algo)
     def least_damage_spawn_location(self, location_options, game_state):
         damages = []
+        board_hash = game_state.game_map.zobrist_hash
         # Get the damage estimate each path will take
         for location in location_options:
-            path = game_state.find_path_to_edge(location)
-            damage = 0
-            for path_location in path:
-                # Get number of enemy turrets that can attack each location and multiply by turret damage
-                damage += len(game_state.get_attackers(path_location, 0)) * gamelib.GameUnit(TURRET, game_state.config).damage_i
+            cached = self.transpositions.probe(board_hash, (), [location])
+            if cached is not None:
+                damages.append(cached[1])
+                continue
+            damage, path_length = self.spawn_damage(location, game_state)
+            self.transpositions.store(board_hash, (), [location], 0, damage, 0, path_length)
             damages.append(damage)
         
         # Now just return the location that takes the least damage
         return location_options[damages.index(min(damages))]
+    # Damage estimate and length of the path of a unit spawned at a location
+    def spawn_damage(self, location, game_state):
+        threat_map = game_state.get_threat_map()
+        turret_damage = gamelib.GameUnit(TURRET, game_state.config).damage_i
+        path = game_state.find_path_to_edge(location)
+        damage = 0
+        for path_location in path:
+            # Get number of enemy turrets that can attack each location and multiply by turret damage
+            damage += threat_map.attacker_count(path_location, 0) * turret_damage
+        return damage, len(path)
+    # Damage estimates of every free location on our edges, only depends on the structures on the board
+    def spawn_damages(self, game_state):
+        game_map = game_state.game_map
+        edges = game_map.get_edge_locations(game_map.BOTTOM_LEFT) + game_map.get_edge_locations(game_map.BOTTOM_RIGHT)
+        threat_map = game_state.get_threat_map()
+        turret_damage = gamelib.GameUnit(TURRET, game_state.config).damage_i
+        sums = game_state.path_sums(edges, lambda location: threat_map.attacker_count(location, 0))
+        return {location: (attackers * turret_damage, path_length) for location, (attackers, path_length) in sums.items()}
     
     # Get enemy paths for right side attacks
     def get_enemy_paths_right(self, game_state):
@@ -1253,175 +1054,40 @@ class AlgoStrategy(gamelib.AlgoCore):
         return left_spawns
 
 
-    # Get attack paths going left
+    # Get the tiles of the left base enemy attacks go over, busiest first
     def get_left_attacks (self, game_state):
-        enemy_path_right = self.get_enemy_paths_right(game_state)
-        enemy_path_left = self.get_enemy_paths_left(game_state)
-        left_base = []
-        for num in range(3, 14):
-            x = num 
-            y = 10
-            left_base.append([int(x), int(y)])
-        for num in range(2, 14):
-            x = num 
-            y = 11
-            left_base.append([int(x), int(y)])
-        for num in range(1, 14):
-            x = num 
-            y = 12
-            left_base.append([int(x), int(y)])
-        for num in range(0, 14):
-            x = num 
-            y = 13
-            left_base.append([int(x), int(y)])
-        for num in range(0, 14):
-            x = num 
-            y = 14
-            left_base.append([int(x), int(y)])
-        for num in range(1, 14):
-            x = num 
-            y = 15
-            left_base.append([int(x), int(y)])
-        combined_paths = enemy_path_right + enemy_path_left
-        for num in range(2, 14):
-            x = num 
-            y = 16
-            left_base.append([int(x), int(y)])
-        combined_paths = enemy_path_right + enemy_path_left  
-        for num in range(3, 14):
-            x = num 
-            y = 17
-            left_base.append([int(x), int(y)])
-        combined_paths = enemy_path_right + enemy_path_left  
-        for num in range(3, 14):
-            x = num 
-            y = 18
-            left_base.append([int(x), int(y)])
-        combined_paths = enemy_path_right + enemy_path_left  
-        left = []
-        for path in combined_paths:
-            for pos in path:
-                if pos in left_base:
-                    left.append(pos)
-        return left
-    # Get attack paths going right
+        return self.base_traffic(game_state, "left_base")
+    # Get the tiles of the right base enemy attacks go over, busiest first
     def get_right_attacks (self, game_state):
-        enemy_path_right = self.get_enemy_paths_right(game_state)
-        enemy_path_left = self.get_enemy_paths_left(game_state)
-        right_base = []
-        for num in range(14, 25):
-            x = num 
-            y = 10
-            right_base.append([int(x), int(y)])
-        for num in range(14, 26):
-            x = num 
-            y = 11
-            right_base.append([int(x), int(y)])
-        for num in range(14, 27):
-            x = num 
-            y = 12
-            right_base.append([int(x), int(y)])
-        for num in range(14, 28):
-            x = num 
-            y = 13
-            right_base.append([int(x), int(y)])
-        for num in range(14, 28):
-            x = num 
-            y = 14
-            right_base.append([int(x), int(y)])
-        for num in range(14, 27):
-            x = num 
-            y = 15
-            right_base.append([int(x), int(y)])
-        combined_paths = enemy_path_right + enemy_path_left
-        for num in range(14, 26):
-            x = num 
-            y = 16
-            right_base.append([int(x), int(y)])
-        combined_paths = enemy_path_right + enemy_path_left
-        for num in range(14, 25):
-            x = num 
-            y = 17
-            right_base.append([int(x), int(y)])
-        combined_paths = enemy_path_right + enemy_path_left
-        for num in range(14, 24):
-            x = num 
-            y = 18
-            right_base.append([int(x), int(y)])
-        combined_paths = enemy_path_right + enemy_path_left
-        right = []
-        for path in combined_paths:
-            for pos in path:
-                if pos in right_base:
-                    right.append(pos)
-        return right
+        return self.base_traffic(game_state, "right_base")
+
+    def base_traffic(self, game_state, base):
+        traffic = game_state.path_traffic(self.enemy_spawn_weights(game_state))
+        crossed = [pos for pos in gamelib.get_region(base) if (pos[0], pos[1]) in traffic]
+        return sorted(crossed, key=lambda pos: -traffic[(pos[0], pos[1])])
+    # Where the enemy spawns, weighted by how often, from the spawns seen over the game
+    def enemy_spawn_weights(self, game_state):
+        weights = self.spawn_tracker.heatmap()
+        if not weights:
+            weights = {(pos[0], pos[1]): 1 for pos in self.hypothetical_enemy_spawn(game_state)}
+        return weights
     
-    # Get Enemy information spawn positions
+    # Get Enemy information spawn positions, from the spawn events of the last action phases
     def enemy_spawns_one_turn(self, game_state):
-        #enemy_edges = self.get_enemy_edges(game_state)
         if game_state.turn_number < 1:
             unique_spawn_pos = self.hypothetical_enemy_spawn(game_state)
             return unique_spawn_pos
-        all_spawn_pos = []
-        # 3 = SCOUT, 4 = EMP, 5 = INTERCEPTOR
-        #gamelib.debug_write("p2units [3]: ", all_turn_states[game_state.turn_number -1][0]["p2Units"][3])
-        # For SCOUTS/PINGS
-        for i in all_turn_states[game_state.turn_number -1][0]["p2Units"][3]:
-            # Pings/Scouts move fast and the first recorded location is always 1 away from the edge. 
-            # Mobile units move vertically, then horizontally (From what I've witnessed), so we'll increase the y by one
-            # This should give the actual spawn location
-            all_spawn_pos.append([i[0],i[1]+1]) 
-            #all_info_spawn_pos.append([i[0],i[1]])
-        # For DESCTRUCTORS/EMPS
-        for i in all_turn_states[game_state.turn_number -1][0]["p2Units"][4]:
-            #gamelib.debug_write("[i[0],i[1]] [4]", [i[0],i[1]])
-            all_spawn_pos.append([i[0],i[1]])
-        # For INTERCEPTORS/SCRAMBLERS
-        for i in all_turn_states[game_state.turn_number -1][0]["p2Units"][5]:
-            all_spawn_pos.append([i[0],i[1]])
-        unique_spawn_pos = []
-        for pos in all_spawn_pos:
-            if pos not in unique_spawn_pos:
-                unique_spawn_pos.append(pos)
-        return unique_spawn_pos
+        return self.spawn_tracker.spawns(game_state.turn_number - 1)
     def enemy_spawns_two_turn(self, game_state):
         if game_state.turn_number < 2:
             unique_spawn_pos = self.hypothetical_enemy_spawn(game_state)
             return unique_spawn_pos
-        all_spawn_pos = []
-        for i in all_turn_states[game_state.turn_number -2][0]["p2Units"][3]:    
-            # Pings/Scouts move fast and the first recorded location is always 1 away from the edge. 
-            # Mobile units move vertically, then horizontally (From what I've witnessed), so we'll increase the y by one
-            # This should give the actual spawn location
-            all_spawn_pos.append([i[0],i[1]+1]) 
-        for i in all_turn_states[game_state.turn_number -2][0]["p2Units"][4]:
-            all_spawn_pos.append([i[0],i[1]])
-        for i in all_turn_states[game_state.turn_number -2][0]["p2Units"][5]:
-            all_spawn_pos.append([i[0],i[1]])     
-        unique_spawn_pos = []
-        for pos in all_spawn_pos:
-            if pos not in unique_spawn_pos:
-                unique_spawn_pos.append(pos)
-        return unique_spawn_pos
+        return self.spawn_tracker.spawns(game_state.turn_number - 2)
     def enemy_spawns_three_turn(self, game_state): 
         if game_state.turn_number < 3:
             unique_spawn_pos = self.hypothetical_enemy_spawn(game_state)
             return unique_spawn_pos
-        all_spawn_pos = []
-        for i in all_turn_states[game_state.turn_number -3][0]["p2Units"][3]:    
-            # Pings/Scouts move fast and the first recorded location is always 1 away from the edge. 
-            # Mobile units move vertically, then horizontally (From what I've witnessed), so we'll increase the y by one
-            # This should give the actual spawn location
-            all_spawn_pos.append([i[0],i[1]+1]) 
-        for i in all_turn_states[game_state.turn_number -3][0]["p2Units"][4]:
-            all_spawn_pos.append([i[0],i[1]])
-        for i in all_turn_states[game_state.turn_number -3][0]["p2Units"][5]:
-            all_spawn_pos.append([i[0],i[1]])     
-        unique_spawn_pos = []
-        for pos in all_spawn_pos:
-            if pos not in unique_spawn_pos:
-                unique_spawn_pos.append(pos)
-        return unique_spawn_pos
+        return self.spawn_tracker.spawns(game_state.turn_number - 3)
     
     # Enemy right edges
     def get_enemy_edge_right(self, game_state):
@@ -1439,14 +1105,16 @@ class AlgoStrategy(gamelib.AlgoCore):
         return enemy_edges
 
     # We attempt to check all paths for opponent destructor and return the safest path
+    # Run from the opponent's side, so their edges are the bottom edges and our turrets are the attackers
     def hypothetical_enemy_spawn(self, game_state):
-        enemy_edges = self.get_enemy_edges(game_state)
-        deploy_locations = self.filter_blocked_locations(enemy_edges, game_state)
+        enemy_view = game_state.as_opponent()
+        enemy_edges = enemy_view.game_map.get_edge_locations(enemy_view.game_map.BOTTOM_LEFT) + enemy_view.game_map.get_edge_locations(enemy_view.game_map.BOTTOM_RIGHT)
+        deploy_locations = self.filter_blocked_locations(enemy_edges, enemy_view)
 
         spawns = []
-        spawn_pos = self.least_damage_spawn_location(deploy_locations, game_state)
+        spawn_pos = self.least_damage_spawn_location(deploy_locations, enemy_view)
 
-        spawns.append(spawn_pos)
+        spawns.append(enemy_view.game_map.flip_location(spawn_pos))
         
         return spawns
     
@@ -2,28 +2,91 @@
 The gamelib package contains modules that assist in algo creation \n
 
 The GameState class in game_state.py is the main class most players interact with. 
-It contains functions that let you get information about resources, deploy units, and help you strategize your move. \n
+It contains functions that let you get information about resources, deploy units, and help you strategize your move. 
+GameState.as_opponent() returns an OpponentGameState, a view of the same turn from your opponent's side of the board. \n
 
 The GameMap class in game_map.py represents the current game map. It can be used to access information related to the locations of units. 
-Investigating it is useful for any player that wants to access more information about the current state of the game. \n
+Investigating it is useful for any player that wants to access more information about the current state of the game. 
+GameMap.mirrored() returns a MirroredGameMap, a view of the map mirrored left to right. \n
 
 The GameUnit class in unit.py represetns a single unit. 
-Investigating it is useful for any player that wants to access information about units. \n
+Investigating it is useful for any player that wants to access information about units. 
+The UnitRegistry class in unit_registry.py lets structures keep the same GameUnit object from turn to turn. \n
 
 The AlgoCore class in algocore.py handles communication with the game engine, and forms the bones of an algo. AlgoStrategy inherits from it. 
 Investigating it is useful for advanced players interested in getting data from the action phase or communicating directly with the game engine. \n
 
 The Navigation class in navigation.py contains functions related to pathfinding, which are used by GameState in pathing related functions. 
-Investigating it is useful for advanced player who want to optimize the slow default pathing algorithm we provide. \n 
+Investigating it is useful for advanced player who want to optimize the slow default pathing algorithm we provide. 
+Paths are cached between turns by PathCache, keyed on the blocked layout hash GameMap keeps. 
+GameState.path_traffic counts how many units would walk over each location and GameState.path_sums sums a value over the path of every start, in one pass over the board instead of one path per start. \n 
+
+The SpeculativePrecomputer class in precompute.py runs board analyses for the next turn in a worker thread while the action phase is received. 
+AlgoCore owns one, see AlgoCore.register_precompute. \n
+
+The FrameHistory class in frame_history.py keeps the events and first frame unit positions of the last few action phases in compact arrays, without storing whole frames. \n
+
+The DamageTimeline class in damage_timeline.py accounts the damage each structure takes during the action phase and predicts which structures a repeated attack would destroy. \n
+
+The EventIndex class in event_index.py indexes action phase events by turn, player and location, with per turn aggregates. \n
+
+The SpawnTracker class in spawn_tracker.py follows where a player spawns mobile units, with a decayed heatmap over the whole game. \n
+
+The ActionPhaseTracker class in action_phase_tracker.py keeps a live board during the action phase, updated from the events of each frame. \n
+
+The TurretStats class in turret_stats.py ranks the structures of each player by the damage they dealt to mobile units. \n
+
+The Layout class in layout.py declares structures to build and upgrade in priority order, and applies them by diffing against the board. \n
+
+The BuildPlanner class in build_planner.py chooses the structures and upgrades worth the most for the SP available, with a knapsack over SP. 
+
+
+The OpponentModel class in opponent_model.py learns when, with what and where a player attacks, with statistics that decay every turn. \n
+
+The ResourceForecaster class in resource_forecaster.py projects the MP and SP of both players, including factory income, with table lookups. \n
+
+The TurnCache class in turn_cache.py memoizes queries derived from a GameState until the board changes. \n
+
+The Region class in regions.py is a precomputed set of board locations with fast membership, path intersection and counting. 
+Regions can be registered under a name with register_region, looked up with get_region and removed with unregister_region. 
+regions.py also provides edge_locations, the spawn edges of a player, and NEIGHBORS, the arena locations next to each location. \n
+
+The TranspositionTable class in transposition.py remembers the outcome of simulated attacks, keyed on the board hash. \n
+
+The ChokepointAnalyzer class in chokepoints.py finds articulation cells, the cells every enemy path goes through and minimum cuts of the pathing grid, cached by board hash. 
+
+
+The PlacementScorer class in placement.py scores many candidate structures at once, by the damage each adds to enemy paths and the enemy paths each lengthens. \n
+
+The ThreatMap class in threat_map.py keeps how many structures attack each location and follows the GameMap as structures change. 
+GameState.from_previous builds the next turn's GameState by updating the previous map, so the threat map and cached paths carry over. \n
 
 util.py contains a small handful of functions that help with communication, including the debug-printing function, debug_write().
 """
 
-from .algocore import AlgoCore
+from .algocore import AlgoCore, FRAMES_NONE, FRAMES_FIRST, FRAMES_EVENTS, FRAMES_ALL
 from .util import debug_write
-from .game_state import GameState
+from .game_state import GameState, OpponentGameState
 from .unit import GameUnit
-from .game_map import GameMap
+from .unit_registry import UnitRegistry
+from .game_map import GameMap, MirroredGameMap, OpponentGameMap
+from .precompute import SpeculativePrecomputer
+from .frame_history import FrameHistory
+from .event_index import EventIndex
+from .damage_timeline import DamageTimeline
+from .spawn_tracker import SpawnTracker
+from .layout import Layout, BUILD, BUILD_OR_UPGRADE, UPGRADE
+from .build_planner import BuildPlanner
+from .opponent_model import OpponentModel
+from .action_phase_tracker import ActionPhaseTracker
+from .resource_forecaster import ResourceForecaster
+from .turn_cache import TurnCache
+from .turret_stats import TurretStats
+from .transposition import TranspositionTable
+from .threat_map import ThreatMap
+from .chokepoints import ChokepointAnalyzer, TOP_EDGES, BOTTOM_EDGES
+from .placement import PlacementScorer
+from .regions import Region, register_region, get_region, unregister_region, intersect_path, count_in_region, edge_locations, NEIGHBORS
 
-__all__ = ["algocore", "game_state", "game_map", "navigation", "unit", "util"]
+__all__ = ["action_phase_tracker", "algocore", "build_planner", "chokepoints", "damage_timeline", "event_index", "frame_history", "game_state", "game_map", "layout", "navigation", "opponent_model", "placement", "precompute", "regions", "resource_forecaster", "spawn_tracker", "threat_map", "transposition", "turn_cache", "turret_stats", "unit", "unit_registry", "util"]
  
\ No newline at end of file
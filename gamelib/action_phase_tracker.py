@@ -0,0 +1,243 @@
+STRUCTURE_INDICES = (0, 1, 2)
+"""Config indices of the structure types, walls, factories and turrets"""
+
+REMOVE_INDEX = 6
+UPGRADE_INDEX = 7
+
+
+class ActionPhaseTracker:
+    """Keeps a live board of the action phase, updated from the events of each frame.
+
+    The first frame of an action phase seeds the board from its unit lists. Every following frame
+    is applied as a delta: spawn, move, damage, shield, death, breach and selfDestruct events add,
+    move, damage and remove units by their unit id. No GameState or GameMap is built for a frame.
+
+    Deltas need consecutive frames. If a frame is missing, for example because on_action_frame
+    only receives some frames (see AlgoCore.subscribe_frames), the board is seeded again from the
+    unit lists of the next frame that is recorded, so queries stay correct either way. Reseeding
+    costs as much as the unit lists are long, so feed the tracker with FRAMES_ALL while it is in use.
+
+    Units are kept by unit id, structures are also indexed by location, and mobile units are counted
+    per location and player, so looking up a location or the stack of a player does not scan the board.
+    Players are indexed like everywhere else in gamelib, 0 for you and 1 for your opponent.
+
+    Attributes :
+        * config (JSON): Contains information about the game, used for the health of spawned units
+        * turn_number (int): The turn of the action phase on the board, None before the first frame
+        * frame_number (int): The last frame applied to the board
+        * seeds (int): Number of frames the board was seeded from
+        * deltas (int): Number of frames applied as deltas
+
+    """
+    def __init__(self, config):
+        self.config = config
+        self.turn_number = None
+        self.frame_number = None
+        self.seeds = 0
+        self.deltas = 0
+        unit_information = config["unitInformation"]
+        self._full_health = [(info.get("startHealth", 0), info.get("upgrade", {}).get("startHealth", info.get("startHealth", 0))) for info in unit_information]
+        self._lowest_full_health = min(self._full_health[index][0] for index in STRUCTURE_INDICES)
+        self._clear()
+
+    def _clear(self):
+        # unit id -> [unit index, player index, x, y, health, full health]
+        self._units = {}
+        self._structures = {}
+        self._player_structures = [set(), set()]
+        self._damaged = [set(), set()]
+        self._mobile_at = [{}, {}]
+        self._mobile_count = [0, 0]
+
+    def record(self, state):
+        """Applies a parsed action frame to the board
+
+        Args:
+            state: The action frame, as returned by json.loads
+
+        """
+        turn_number = int(state["turnInfo"][1])
+        frame_number = int(state["turnInfo"][2])
+        if turn_number != self.turn_number or self.frame_number is None or frame_number != self.frame_number + 1:
+            self._seed(state)
+            self.seeds += 1
+        else:
+            self._apply(state["events"])
+            self.deltas += 1
+        self.turn_number = turn_number
+        self.frame_number = frame_number
+
+    def _seed(self, state):
+        """Rebuilds the board from the unit lists of a frame
+        """
+        self._clear()
+        for player_index, key in enumerate(("p1Units", "p2Units")):
+            units = state[key]
+            upgraded = set()
+            if len(units) > UPGRADE_INDEX:
+                upgraded = {(int(entry[0]), int(entry[1])) for entry in units[UPGRADE_INDEX]}
+            for unit_index, unit_list in enumerate(units[:REMOVE_INDEX]):
+                for entry in unit_list:
+                    x, y = int(entry[0]), int(entry[1])
+                    full_health = self._full_health[unit_index][1 if (x, y) in upgraded else 0]
+                    self._add(str(entry[3]), unit_index, player_index, x, y, float(entry[2]), full_health)
+
+    def _add(self, unit_id, unit_index, player_index, x, y, health, full_health):
+        if unit_id in self._units:
+            return
+        self._units[unit_id] = [unit_index, player_index, x, y, health, full_health]
+        if unit_index in STRUCTURE_INDICES:
+            self._structures[(x, y)] = unit_id
+            self._player_structures[player_index].add(unit_id)
+            if health < full_health:
+                self._damaged[player_index].add(unit_id)
+        else:
+            self._move_mobile(player_index, None, (x, y))
+
+    def _remove(self, unit_id):
+        unit = self._units.pop(unit_id, None)
+        if unit is None:
+            return
+        unit_index, player_index, x, y = unit[0], unit[1], unit[2], unit[3]
+        if unit_index in STRUCTURE_INDICES:
+            if self._structures.get((x, y)) == unit_id:
+                del self._structures[(x, y)]
+            self._player_structures[player_index].discard(unit_id)
+            self._damaged[player_index].discard(unit_id)
+        else:
+            self._move_mobile(player_index, (x, y), None)
+
+    def _move_mobile(self, player_index, source, target):
+        mobile_at = self._mobile_at[player_index]
+        if source is not None:
+            count = mobile_at[source] - 1
+            if count:
+                mobile_at[source] = count
+            else:
+                del mobile_at[source]
+            self._mobile_count[player_index] -= 1
+        if target is not None:
+            mobile_at[target] = mobile_at.get(target, 0) + 1
+            self._mobile_count[player_index] += 1
+
+    def _change_health(self, unit_id, amount):
+        unit = self._units.get(unit_id)
+        if unit is None:
+            return
+        unit[4] += amount
+        if unit[0] in STRUCTURE_INDICES:
+            if unit[4] < unit[5]:
+                self._damaged[unit[1]].add(unit_id)
+            else:
+                self._damaged[unit[1]].discard(unit_id)
+
+    def _apply(self, events):
+        """Applies the events of one frame to the board
+        """
+        for event in events.get("spawn", ()):
+            unit_index = int(event[1])
+            self._add(str(event[2]), unit_index, int(event[3]) - 1, int(event[0][0]), int(event[0][1]),
+                      float(self._full_health[unit_index][0]), self._full_health[unit_index][0])
+        for event in events.get("move", ()):
+            unit = self._units.get(str(event[4]))
+            if unit is None:
+                continue
+            target = (int(event[1][0]), int(event[1][1]))
+            self._move_mobile(unit[1], (unit[2], unit[3]), target)
+            unit[2], unit[3] = target
+        for event in events.get("damage", ()):
+            self._change_health(str(event[3]), -event[1])
+        for event in events.get("shield", ()):
+            self._change_health(str(event[5]), event[2])
+        for event in events.get("death", ()):
+            self._remove(str(event[2]))
+        for event in events.get("breach", ()):
+            self._remove(str(event[3]))
+        for event in events.get("selfDestruct", ()):
+            self._remove(str(event[4]))
+
+    def unit(self, unit_id):
+        """Gets a unit on the board by its unit id
+
+        Returns:
+            A (unit index, player index, [x, y], health) tuple, or None if the unit is not on the board
+
+        """
+        unit = self._units.get(str(unit_id))
+        if unit is None:
+            return None
+        return (unit[0], unit[1], [unit[2], unit[3]], unit[4])
+
+    def structure_at(self, location):
+        """Gets the structure at a location
+
+        Returns:
+            A (unit index, player index, health) tuple, or None if there is no structure
+
+        """
+        unit_id = self._structures.get((location[0], location[1]))
+        if unit_id is None:
+            return None
+        unit = self._units[unit_id]
+        return (unit[0], unit[1], unit[4])
+
+    def damaged_structures(self, player_index):
+        """Gets the structures of a player that are below their full health
+
+        Args:
+            player_index: The player owning the structures, 0 for you 1 for your opponent
+
+        Returns:
+            A list of [x, y] locations
+
+        """
+        units = self._units
+        return [[units[unit_id][2], units[unit_id][3]] for unit_id in self._damaged[player_index]]
+
+    def structures_below(self, player_index, health):
+        """Gets the structures of a player with less than the given health
+
+        Only damaged structures are looked at, unless health is above the full health of a structure type.
+
+        Args:
+            player_index: The player owning the structures, 0 for you 1 for your opponent
+            health: The health threshold
+
+        Returns:
+            A list of [x, y] locations
+
+        """
+        candidates = self._damaged[player_index] if health <= self._lowest_full_health else self._player_structures[player_index]
+        units = self._units
+        return [[units[unit_id][2], units[unit_id][3]] for unit_id in candidates if units[unit_id][4] < health]
+
+    def mobile_count(self, player_index, location=None):
+        """Counts the mobile units of a player
+
+        Args:
+            player_index: The player owning the units, 0 for you 1 for your opponent
+            location: If given, only units at this location are counted
+
+        Returns:
+            The number of mobile units
+
+        """
+        if location is None:
+            return self._mobile_count[player_index]
+        return self._mobile_at[player_index].get((location[0], location[1]), 0)
+
+    def stack_location(self, player_index):
+        """Gets where most mobile units of a player are
+
+        Args:
+            player_index: The player owning the units, 0 for you 1 for your opponent
+
+        Returns:
+            The [x, y] location with the most units, or None if the player has no mobile units
+
+        """
+        mobile_at = self._mobile_at[player_index]
+        if not mobile_at:
+            return None
+        x, y = max(mobile_at, key=mobile_at.get)
+        return [x, y]
@@ -1,8 +1,53 @@
 import json
 
 from .game_state import GameState
+from .precompute import SpeculativePrecomputer
+from .unit_registry import UnitRegistry
 from .util import get_command, debug_write, BANNER_TEXT, send_command
 
+FRAMES_NONE = 0
+"""Do not call on_action_frame"""
+FRAMES_FIRST = 1
+"""Call on_action_frame with the first frame of every action phase"""
+FRAMES_EVENTS = 2
+"""Call on_action_frame with frames that have events of the subscribed types"""
+FRAMES_ALL = 4
+"""Call on_action_frame with every frame"""
+
+
+def _scan_turn_info(game_state_string):
+    """Reads the turnInfo list of a message without decoding the whole message
+    """
+    start = game_state_string.find('"turnInfo"')
+    start = game_state_string.find('[', start)
+    end = game_state_string.find(']', start)
+    return [int(float(value)) for value in game_state_string[start + 1:end].split(',')]
+
+
+def _has_events(game_state_string, event_types):
+    """Checks if a message has at least one event of the given types without decoding it.
+    If event_types is None, any event counts.
+    """
+    start = game_state_string.find('"events"')
+    if start == -1:
+        return True
+    end = game_state_string.find('}', start)
+    events = game_state_string[start:end]
+    if event_types is None:
+        return '[[' in events.replace(' ', '')
+
+    for event_type in event_types:
+        key = events.find('"{}"'.format(event_type))
+        if key == -1:
+            continue
+        index = events.find('[', key) + 1
+        while events[index] in ' \n\t':
+            index += 1
+        if events[index] != ']':
+            return True
+    return False
+
+
 class AlgoCore(object):
     """
     This class handles communication with the game engine. \n
@@ -10,10 +55,18 @@ class AlgoCore(object):
 
     Attributes :
         * config (JSON): json object containing information about the game
+        * precomputer (:obj: SpeculativePrecomputer): Runs registered board analyses for the next turn during the action phase
+        * frame_subscription (int): Which action frames are passed to on_action_frame, see subscribe_frames
+        * frame_event_types (list): The event types FRAMES_EVENTS looks for, None for any event
+        * unit_registry (:obj: UnitRegistry): Pass it to GameState to reuse the structures of the previous turn
 
     """
     def __init__(self):
         self.config = None
+        self.precomputer = SpeculativePrecomputer()
+        self.frame_subscription = FRAMES_ALL
+        self.frame_event_types = None
+        self.unit_registry = UnitRegistry()
 
     def on_game_start(self, config):
         """
@@ -43,6 +96,43 @@ class AlgoCore(object):
         """
         pass
 
+    def subscribe_frames(self, frames, event_types=None):
+        """
+        Declares which action frames on_action_frame needs. By default it receives every frame. 
+        frames is FRAMES_NONE, FRAMES_ALL, or FRAMES_FIRST and FRAMES_EVENTS combined with |. 
+        With FRAMES_EVENTS, only frames with at least one event of event_types are passed, or with any event if event_types is None. 
+        Skipped frames are filtered by scanning the raw message, they are never decoded.
+        """
+        self.frame_subscription = frames
+        self.frame_event_types = None if event_types is None else list(event_types)
+
+    def _wants_frame(self, game_state_string, turn_info):
+        """
+        Checks if an action frame matches the frame subscription
+        """
+        if self.frame_subscription & FRAMES_ALL:
+            return True
+        if self.frame_subscription & FRAMES_FIRST and turn_info[2] == 0:
+            return True
+        if self.frame_subscription & FRAMES_EVENTS and _has_events(game_state_string, self.frame_event_types):
+            return True
+        return False
+
+    def register_precompute(self, name, analysis):
+        """
+        Registers a board analysis that is prepared for the next turn while action frames are received.
+        The analysis is a function taking a GameState, it must only depend on the structures on the board.
+        Retrieve the result in on_turn with precomputed(). 
+        """
+        self.precomputer.register(name, analysis)
+
+    def precomputed(self, name, game_state, compute=True):
+        """
+        Returns the result of a registered analysis for game_state. 
+        The result prepared during the last action phase is reused if the board matches, otherwise it is computed now,
+        or None is returned if compute is False.
+        """
+        return self.precomputer.get(name, game_state, compute)
 
     def start(self):
         """ 
@@ -62,26 +152,31 @@ class AlgoCore(object):
                 This means this must be the config file. So, load in the config file as a json and add it to your AlgoStrategy class.
                 """
                 parsed_config = json.loads(game_state_string)
+                self.precomputer.config = parsed_config
                 self.on_game_start(parsed_config)
             elif "turnInfo" in game_state_string:
-                state = json.loads(game_state_string)
-                stateType = int(state.get("turnInfo")[0])
+                turn_info = _scan_turn_info(game_state_string)
+                stateType = turn_info[0]
                 if stateType == 0:
                     """
                     This is the game turn game state message. Algo must now print to stdout 2 lines, one for build phase one for
                     deploy phase. Printing is handled by the provided functions.
                     """
+                    self.precomputer.wait_idle()
                     self.on_turn(game_state_string)
                 elif stateType == 1:
                     """
                     If stateType == 1, this game_state_string string represents a single frame of an action phase
                     """
-                    self.on_action_frame(game_state_string)
+                    self.precomputer.submit(game_state_string)
+                    if self._wants_frame(game_state_string, turn_info):
+                        self.on_action_frame(game_state_string)
                 elif stateType == 2:
                     """
                     This is the end game message. This means the game is over so break and finish the program.
                     """
                     debug_write("Got end state, game over. Stopping algo.")
+                    self.precomputer.stop()
                     break
                 else:
                     """
@@ -0,0 +1,176 @@
+import math
+
+from .layout import BUILD, BUILD_OR_UPGRADE, UPGRADE
+
+
+class BuildPlanner:
+    """Chooses the structures and upgrades that give the most value for the SP available.
+
+    Candidates are added with a value, their SP costs come from the config. plan() solves a knapsack
+    over SP, counted in steps of resolution, with one group of choices per location: nothing, the
+    build, the build and its upgrade, or only the upgrade when the structure is already there.
+    An upgrade is never chosen without its structure, and candidates the board already satisfies are skipped.
+
+    The chosen actions are returned and applied in the order the candidates were added, so the
+    priority order is kept whenever everything is affordable. When SP runs short, cheaper candidates
+    are taken instead of leaving SP unspent behind an expensive one.
+
+    Attributes :
+        * config (JSON): Contains information about the game
+        * resolution (float): The SP step costs are rounded up to and the budget is rounded down to
+
+    """
+    def __init__(self, config, resolution=1.0):
+        self.config = config
+        self.resolution = resolution
+        self._costs = {}
+        for info in config["unitInformation"]:
+            shorthand = info.get("shorthand")
+            if shorthand is not None:
+                upgrade = info.get("upgrade", {})
+                self._costs[shorthand] = (info.get("cost1", 0), upgrade.get("cost1", info.get("cost1", 0)), "upgrade" in info)
+        self._candidates = []
+
+    def clear(self):
+        """Removes every candidate
+        """
+        self._candidates = []
+
+    def add(self, unit_type, location, value, upgrade=False):
+        """Adds a candidate
+
+        Args:
+            unit_type: The shorthand of the structure type
+            location: The [x, y] location
+            value: How much the candidate is worth, in any unit as long as it is the same for all candidates
+            upgrade: True for an upgrade of the structure at the location, False to build it
+
+        """
+        self._candidates.append((unit_type, [location[0], location[1]], value, upgrade))
+
+    def add_layout(self, layout, values=None):
+        """Adds the entries of a Layout as candidates
+
+        A BUILD_OR_UPGRADE entry adds a build and an upgrade candidate, like Layout.apply the upgrade is only
+        chosen if the structure is already on the board.
+
+        Args:
+            layout: The Layout
+            values: A list with the value of each entry. By default each entry is worth more than all later entries together,
+                so the layout is built in priority order and a later entry is only chosen when the earlier ones do not fit
+
+        """
+        entries = layout.entries
+        if values is None:
+            values = [2 ** (len(entries) - 1 - i) for i in range(len(entries))]
+        for (unit_type, location, action), value in zip(entries, values):
+            if action != UPGRADE:
+                self.add(unit_type, location, value)
+            if action != BUILD:
+                self._candidates.append((unit_type, list(location), value, "existing" if action == BUILD_OR_UPGRADE else True))
+
+    def _steps(self, cost):
+        return int(math.ceil(cost / self.resolution - 1e-9))
+
+    def _groups(self, game_state):
+        """Builds the choices of every location, as (order, cost, value, actions) options
+        """
+        game_map = game_state.game_map
+        mask = game_map.structure_region().mask
+        groups = {}
+        order = []
+        for rank, (unit_type, location, value, upgrade) in enumerate(self._candidates):
+            key = (location[0], location[1])
+            group = groups.get(key)
+            if group is None:
+                group = groups[key] = {"build": None, "upgrade": None}
+                order.append(key)
+            if upgrade:
+                if group["upgrade"] is None:
+                    group["upgrade"] = (rank, unit_type, value, upgrade == "existing")
+            elif group["build"] is None:
+                group["build"] = (rank, unit_type, value)
+
+        result = []
+        for key in order:
+            group = groups[key]
+            x, y = key
+            options = []
+            if mask >> (y * game_map.ARENA_SIZE + x) & 1:
+                existing = None
+                for unit in game_map[x, y]:
+                    if unit.stationary:
+                        existing = unit
+                upgrade = group["upgrade"]
+                if upgrade is not None and not existing.upgraded and self._costs[existing.unit_type][2]:
+                    cost = self._costs[existing.unit_type][1]
+                    options.append((self._steps(cost), upgrade[2], [(upgrade[0], "upgrade", existing.unit_type, [x, y])]))
+            elif group["build"] is not None:
+                rank, unit_type, value = group["build"]
+                build_cost = self._costs[unit_type][0]
+                build = [(rank, "build", unit_type, [x, y])]
+                options.append((self._steps(build_cost), value, build))
+                upgrade = group["upgrade"]
+                if upgrade is not None and not upgrade[3] and self._costs[unit_type][2]:
+                    options.append((self._steps(build_cost + self._costs[unit_type][1]), value + upgrade[2],
+                                    build + [(upgrade[0], "upgrade", unit_type, [x, y])]))
+            if options:
+                result.append(options)
+        return result
+
+    def plan(self, game_state):
+        """Chooses the candidates to build and upgrade this turn
+
+        Args:
+            game_state: The GameState of the current turn, its SP is the budget
+
+        Returns:
+            A list of ("build" or "upgrade", unit_type, [x, y]) actions, in the order the candidates were added
+
+        """
+        groups = self._groups(game_state)
+        if not groups:
+            return []
+        budget = int(math.floor(game_state.get_resource(game_state.SP) / self.resolution + 1e-9))
+        capacity = min(budget, sum(max(option[0] for option in options) for options in groups))
+
+        # tables[g][s] is the best value of the first g groups within s steps of SP
+        tables = [[0] * (capacity + 1)]
+        for options in groups:
+            previous = tables[-1]
+            best = list(previous)
+            for cost, value, _ in options:
+                if cost > capacity:
+                    continue
+                shifted = [total + value for total in previous[:capacity + 1 - cost]]
+                best[cost:] = map(max, best[cost:], shifted)
+            tables.append(best)
+
+        chosen = []
+        steps = capacity
+        for g in range(len(groups), 0, -1):
+            current, previous = tables[g], tables[g - 1]
+            if current[steps] == previous[steps]:
+                continue
+            for cost, value, actions in groups[g - 1]:
+                if cost <= steps and previous[steps - cost] + value == current[steps]:
+                    chosen.extend(actions)
+                    steps -= cost
+                    break
+        chosen.sort(key=lambda action: action[0])
+        return [(kind, unit_type, location) for _, kind, unit_type, location in chosen]
+
+    def apply(self, game_state):
+        """Plans and then builds and upgrades the chosen candidates, see plan
+
+        Returns:
+            The number of structures built and upgraded
+
+        """
+        done = 0
+        for kind, unit_type, location in self.plan(game_state):
+            if kind == "build":
+                done += game_state.attempt_spawn(unit_type, location)
+            else:
+                done += game_state.attempt_upgrade(location)
+        return done
@@ -0,0 +1,293 @@
+from collections import OrderedDict
+
+from .regions import ARENA, ARENA_SIZE, NEIGHBORS, Region
+
+_CELLS = ARENA_SIZE * ARENA_SIZE
+_HALF = ARENA_SIZE // 2
+
+TOP_EDGES = Region.from_locations([[_HALF + n, ARENA_SIZE - 1 - n] for n in range(_HALF)] +
+                                  [[_HALF - 1 - n, ARENA_SIZE - 1 - n] for n in range(_HALF)], "top_edges")
+"""The top left and top right edges, where the enemy spawns mobile units"""
+BOTTOM_EDGES = Region.from_locations([[_HALF - 1 - n, n] for n in range(_HALF)] +
+                                     [[_HALF + n, n] for n in range(_HALF)], "bottom_edges")
+"""The bottom left and bottom right edges, where you spawn mobile units"""
+
+_UNLIMITED = _CELLS + 1
+
+
+def _mask(locations):
+    if locations is None or isinstance(locations, Region):
+        return None if locations is None else locations.mask
+    return Region.from_locations(locations).mask
+
+
+def _bits(mask):
+    indices = []
+    while mask:
+        low_bit = mask & -mask
+        indices.append(low_bit.bit_length() - 1)
+        mask ^= low_bit
+    return indices
+
+
+class ChokepointAnalyzer:
+    """Finds the cells of the pathing grid that every path has to go through, on the current board.
+
+    The grid is the one ShortestPathFinder searches: arena locations without a structure, each next
+    to the 4 locations around it. Blocking an articulation cell splits the free cells in two. A separator
+    is a cell every path from a set of sources to a set of sinks goes through, by default from the enemy
+    spawn edges to your edges, so one wall there changes every enemy path. Both are found with one depth
+    first search, in time linear in the size of the board.
+
+    min_cut finds the fewest cells that have to be blocked to cut every path, with augmenting paths
+    over the free cells, in time linear in the board for each cell of the cut.
+
+    Results are cached by the blocked layout hash of the map (see GameMap.blocked_hash), so asking
+    again on the same board, in the same turn or a later one, does not search again.
+
+    Attributes :
+        * max_entries (int): The number of results kept, the least recently used are dropped first
+        * hits (int): Number of queries answered from the cache
+        * misses (int): Number of queries that searched the board
+
+    """
+    def __init__(self, max_entries=64):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._results = OrderedDict()
+
+    def _cached(self, game_map, key, compute):
+        board = getattr(game_map, "blocked_hash", None)
+        if board is None:
+            self.misses += 1
+            return compute(self._free_mask(game_map))
+        key = (board,) + key
+        result = self._results.get(key)
+        if result is not None:
+            self.hits += 1
+            self._results.move_to_end(key)
+            return result
+        self.misses += 1
+        result = compute(self._free_mask(game_map))
+        self._results[key] = result
+        if len(self._results) > self.max_entries:
+            self._results.popitem(last=False)
+        return result
+
+    def _free_mask(self, game_map):
+        if hasattr(game_map, "structure_region"):
+            return ARENA.mask & ~game_map.structure_region().mask
+        blocked = 0
+        for x, y in game_map:
+            if any(unit.stationary for unit in game_map[x, y]):
+                blocked |= 1 << (y * ARENA_SIZE + x)
+        return ARENA.mask & ~blocked
+
+    def clear(self):
+        """Drops every cached result
+        """
+        self._results.clear()
+
+    def articulation_cells(self, game_map):
+        """Gets the free cells that split the free cells in two when blocked
+
+        Args:
+            game_map: The GameMap to analyze
+
+        Returns:
+            A Region of the articulation cells
+
+        """
+        return self._cached(game_map, ("articulation",), self._articulation_cells)
+
+    def separators(self, game_map, sources=None, sinks=None):
+        """Gets the free cells every path from the sources to the sinks goes through
+
+        Args:
+            game_map: The GameMap to analyze
+            sources: A Region or list of [x, y] locations paths start from, the enemy edges by default
+            sinks: A Region or list of [x, y] locations paths end on, your edges by default
+
+        Returns:
+            A Region of the cells, empty if the sources can not reach the sinks at all
+
+        """
+        sources = TOP_EDGES.mask if sources is None else _mask(sources)
+        sinks = BOTTOM_EDGES.mask if sinks is None else _mask(sinks)
+        return self._cached(game_map, ("separators", sources, sinks),
+                            lambda free: self._separators(free, sources, sinks))
+
+    def min_cut(self, game_map, sources=None, sinks=None, allowed=None, limit=None):
+        """Gets the fewest free cells to block so no path goes from the sources to the sinks
+
+        Args:
+            game_map: The GameMap to analyze
+            sources: A Region or list of [x, y] locations paths start from, the enemy edges by default
+            sinks: A Region or list of [x, y] locations paths end on, your edges by default
+            allowed: A Region or list of [x, y] locations the cut may use, for example the bottom half. Any free cell by default
+            limit: Give up once the cut needs more cells than this
+
+        Returns:
+            A Region of the cells, or None if no cut within allowed and limit exists
+
+        """
+        sources = TOP_EDGES.mask if sources is None else _mask(sources)
+        sinks = BOTTOM_EDGES.mask if sinks is None else _mask(sinks)
+        allowed = _mask(allowed)
+        return self._cached(game_map, ("min_cut", sources, sinks, allowed, limit),
+                            lambda free: self._min_cut(free, sources, sinks, allowed, limit))
+
+    def _adjacency(self, free):
+        cells = _bits(free)
+        adjacency = [None] * _CELLS
+        for index in cells:
+            adjacency[index] = [n for n in NEIGHBORS[index] if free >> n & 1]
+        return cells, adjacency
+
+    def _dfs(self, root, adjacency, discovered, low, finished, parent, counter):
+        """Iterative depth first search from root, filling discovery and finish times and low links
+        """
+        discovered[root] = low[root] = counter
+        counter += 1
+        stack = [(root, iter(adjacency[root]))]
+        while stack:
+            node, neighbors = stack[-1]
+            for neighbor in neighbors:
+                if discovered[neighbor] < 0:
+                    parent[neighbor] = node
+                    discovered[neighbor] = low[neighbor] = counter
+                    counter += 1
+                    stack.append((neighbor, iter(adjacency[neighbor])))
+                    break
+                if neighbor != parent[node] and discovered[neighbor] < low[node]:
+                    low[node] = discovered[neighbor]
+            else:
+                stack.pop()
+                finished[node] = counter
+                counter += 1
+                if stack and low[node] < low[stack[-1][0]]:
+                    low[stack[-1][0]] = low[node]
+        return counter
+
+    def _articulation_cells(self, free):
+        cells, adjacency = self._adjacency(free)
+        discovered = [-1] * _CELLS
+        low = [0] * _CELLS
+        finished = [0] * _CELLS
+        parent = [-1] * _CELLS
+        counter = 0
+        for root in cells:
+            if discovered[root] < 0:
+                counter = self._dfs(root, adjacency, discovered, low, finished, parent, counter)
+
+        # A root splits its component if it has two children, any other cell if a child can not reach above it
+        mask = 0
+        children = [0] * _CELLS
+        for index in cells:
+            node = parent[index]
+            if node < 0:
+                continue
+            if parent[node] < 0:
+                children[node] += 1
+                if children[node] == 2:
+                    mask |= 1 << node
+            elif low[index] >= discovered[node]:
+                mask |= 1 << node
+        return Region(mask)
+
+    def _separators(self, free, sources, sinks):
+        cells, adjacency = self._adjacency(free)
+        # Two extra nodes stand for all the sources and all the sinks
+        source, sink = _CELLS, _CELLS + 1
+        adjacency.extend([[], []])
+        for index in cells:
+            if sources >> index & 1:
+                adjacency[index].append(source)
+                adjacency[source].append(index)
+            if sinks >> index & 1:
+                adjacency[index].append(sink)
+                adjacency[sink].append(index)
+        size = _CELLS + 2
+        discovered = [-1] * size
+        low = [0] * size
+        finished = [0] * size
+        parent = [-1] * size
+        self._dfs(source, adjacency, discovered, low, finished, parent, 0)
+        if discovered[sink] < 0:
+            return Region()
+
+        # A cell separates if the subtree of one of its children holds the sink and can not reach above the cell
+        mask = 0
+        node = parent[sink]
+        child = sink
+        while node != source:
+            if low[child] >= discovered[node]:
+                mask |= 1 << node
+            child = node
+            node = parent[node]
+        return Region(mask)
+
+    def _min_cut(self, free, sources, sinks, allowed, limit):
+        # Every free cell is split in an entry node 2i and an exit node 2i + 1, joined by an edge of capacity 1
+        # when the cell may be cut. The sources and sinks are joined to two extra nodes
+        source, sink = 2 * _CELLS, 2 * _CELLS + 1
+        heads = [[] for _ in range(2 * _CELLS + 2)]
+        targets = []
+        capacity = []
+
+        def add_edge(start, end, amount):
+            heads[start].append(len(targets))
+            targets.append(end)
+            capacity.append(amount)
+            heads[end].append(len(targets))
+            targets.append(start)
+            capacity.append(0)
+
+        cells = _bits(free)
+        for index in cells:
+            cuttable = allowed is None or allowed >> index & 1
+            add_edge(2 * index, 2 * index + 1, 1 if cuttable else _UNLIMITED)
+            for neighbor in NEIGHBORS[index]:
+                if free >> neighbor & 1:
+                    add_edge(2 * index + 1, 2 * neighbor, _UNLIMITED)
+            if sources >> index & 1:
+                add_edge(source, 2 * index, _UNLIMITED)
+            if sinks >> index & 1:
+                add_edge(2 * index + 1, sink, _UNLIMITED)
+
+        flow = 0
+        while True:
+            came_from = {source: None}
+            frontier = [source]
+            while frontier and sink not in came_from:
+                next_frontier = []
+                for node in frontier:
+                    for edge in heads[node]:
+                        target = targets[edge]
+                        if capacity[edge] > 0 and target not in came_from:
+                            came_from[target] = edge
+                            next_frontier.append(target)
+                frontier = next_frontier
+            if sink not in came_from:
+                break
+            path = []
+            node = sink
+            while node != source:
+                edge = came_from[node]
+                path.append(edge)
+                node = targets[edge ^ 1]
+            amount = min(capacity[edge] for edge in path)
+            for edge in path:
+                capacity[edge] -= amount
+                capacity[edge ^ 1] += amount
+            flow += amount
+            if flow >= _UNLIMITED or (limit is not None and flow > limit):
+                return None
+
+        # The cut is the cells entered but not left by what the source still reaches
+        mask = 0
+        for index in cells:
+            if 2 * index in came_from and 2 * index + 1 not in came_from:
+                mask |= 1 << index
+        return Region(mask)
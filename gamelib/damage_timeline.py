@@ -0,0 +1,186 @@
+STRUCTURE_INDICES = (0, 1, 2)
+"""Config indices of the structure types, walls, factories and turrets"""
+
+
+class StructureDamage:
+    """What happened to one structure during an action phase
+
+    Attributes :
+        * unit_id (str): The id the engine gave the structure
+        * unit_index (int): The config index of the structure type
+        * player_index (int): The owner, 0 for you 1 for your opponent
+        * location (list): The [x, y] location of the structure
+        * damage (float): The damage taken over the action phase
+        * first_hit (int): The frame of the first damage event, None if it was not hit
+        * destroyed (int): The frame the structure was destroyed in, None if it survived or was removed by its owner
+
+    """
+    __slots__ = ("unit_id", "unit_index", "player_index", "location", "damage", "first_hit", "destroyed")
+
+    def __init__(self, unit_id, unit_index, player_index, location):
+        self.unit_id = unit_id
+        self.unit_index = unit_index
+        self.player_index = player_index
+        self.location = location
+        self.damage = 0.0
+        self.first_hit = None
+        self.destroyed = None
+
+    def __repr__(self):
+        return "StructureDamage({} at {}, damage: {}, first hit: {}, destroyed: {})".format(
+            self.unit_id, self.location, self.damage, self.first_hit, self.destroyed)
+
+
+class DamageTimeline:
+    """Accounts the damage every structure takes during the action phases of the last few turns.
+
+    Damage and death events are attributed to the structure ids they name as frames arrive, so a turn
+    summary is ready as soon as the action phase is over. Damage is also summed per location, which
+    lets predict_destroyed check the current board against the last attack in O(structures).
+
+    The damage and death events of every frame are needed, subscribe to them if frames are filtered
+    (see AlgoCore.subscribe_frames).
+
+    Attributes :
+        * window (int): The number of turns that are kept
+
+    """
+    def __init__(self, window=3):
+        self.window = window
+        self._turns = [None] * window
+        self._structures = [None] * window
+        self._location_damage = [None] * window
+
+    def record(self, state):
+        """Adds the damage and death events of a parsed action frame
+
+        Args:
+            state: The action frame, as returned by json.loads
+
+        """
+        turn_number = int(state["turnInfo"][1])
+        frame_number = int(state["turnInfo"][2])
+        slot = turn_number % self.window
+        if self._turns[slot] != turn_number:
+            self._turns[slot] = turn_number
+            self._structures[slot] = {}
+            self._location_damage[slot] = ({}, {})
+
+        structures = self._structures[slot]
+        location_damage = self._location_damage[slot]
+        events = state["events"]
+        for event in events.get("damage", ()):
+            unit_index = int(event[2])
+            if unit_index not in STRUCTURE_INDICES:
+                continue
+            entry = self._entry(structures, event[3], unit_index, int(event[4]) - 1, event[0])
+            entry.damage += event[1]
+            if entry.first_hit is None:
+                entry.first_hit = frame_number
+            by_location = location_damage[entry.player_index]
+            location = (entry.location[0], entry.location[1])
+            by_location[location] = by_location.get(location, 0) + event[1]
+        for event in events.get("death", ()):
+            unit_index = int(event[1])
+            if unit_index not in STRUCTURE_INDICES or event[4]:
+                continue
+            entry = self._entry(structures, event[2], unit_index, int(event[3]) - 1, event[0])
+            if entry.destroyed is None:
+                entry.destroyed = frame_number
+
+    def _entry(self, structures, unit_id, unit_index, player_index, location):
+        entry = structures.get(unit_id)
+        if entry is None:
+            entry = StructureDamage(unit_id, unit_index, player_index, [int(location[0]), int(location[1])])
+            structures[unit_id] = entry
+        return entry
+
+    def has_turn(self, turn_number):
+        """Checks if damage of a turn is stored
+
+        Args:
+            turn_number: The turn to check
+
+        Returns:
+            True if at least one frame of the turn was recorded and it is still inside the window
+
+        """
+        return turn_number >= 0 and self._turns[turn_number % self.window] == turn_number
+
+    def summary(self, turn_number, player_index=None):
+        """Gets the structures that were hit or destroyed during a turn
+
+        Args:
+            turn_number: The turn of the action phase
+            player_index: The owner of the structures, or None for both players
+
+        Returns:
+            A list of StructureDamage, in the order the structures were first hit. Do not modify them
+
+        """
+        if not self.has_turn(turn_number):
+            return []
+        entries = self._structures[turn_number % self.window].values()
+        if player_index is not None:
+            entries = [entry for entry in entries if entry.player_index == player_index]
+        return list(entries)
+
+    def damage_at(self, turn_number, location, player_index):
+        """Gets the damage taken by structures at a location during a turn
+
+        Args:
+            turn_number: The turn of the action phase
+            location: The [x, y] location
+            player_index: The owner of the structures, 0 for you 1 for your opponent
+
+        Returns:
+            The summed damage, also counting structures that were destroyed there
+
+        """
+        if not self.has_turn(turn_number):
+            return 0
+        return self._location_damage[turn_number % self.window][player_index].get((location[0], location[1]), 0)
+
+    def predict_destroyed(self, game_map, turn_number, player_index=0):
+        """Predicts which structures on the board a repeat of a turn's attack would destroy.
+
+        A structure is expected to fall if the structures at its location took at least its current
+        health in damage during that turn. Only locations that were hit are looked at.
+
+        Args:
+            game_map: The GameMap of the board to check, usually the map of the current turn
+            turn_number: The turn whose attack is repeated, usually the last turn
+            player_index: The owner of the structures, 0 for you 1 for your opponent
+
+        Returns:
+            A list of [x, y] locations, the structures with the least health left over first
+
+        """
+        if not self.has_turn(turn_number):
+            return []
+        doomed = []
+        for (x, y), damage in self._location_damage[turn_number % self.window][player_index].items():
+            for unit in game_map[x, y]:
+                if unit.stationary and unit.player_index == player_index and unit.health <= damage:
+                    doomed.append((unit.health - damage, [x, y]))
+        doomed.sort(key=lambda item: item[0])
+        return [location for _, location in doomed]
+
+    def prioritize(self, locations, game_map, turn_number, player_index=0):
+        """Orders locations so the structures predicted to be destroyed come first, see predict_destroyed
+
+        Args:
+            locations: A list of [x, y] locations, for example a list of rebuild or upgrade targets
+            game_map: The GameMap of the board to check
+            turn_number: The turn whose attack is repeated
+            player_index: The owner of the structures
+
+        Returns:
+            A new list with the same locations. The order is kept among the locations that are not predicted to fall
+
+        """
+        doomed = {(x, y): rank for rank, (x, y) in enumerate(self.predict_destroyed(game_map, turn_number, player_index))}
+        if not doomed:
+            return list(locations)
+        last = len(doomed)
+        return sorted(locations, key=lambda location: doomed.get((location[0], location[1]), last))
@@ -0,0 +1,172 @@
+EVENT_PLAYER_FIELD = {
+    "breach": 4,
+    "damage": 4,
+    "selfDestruct": 5,
+    "shield": 6,
+    "death": 3,
+    "spawn": 3,
+    "melee": 6,
+    "attack": 6,
+    "move": 5,
+}
+"""The position of the owning player in each event type"""
+
+EVENT_AMOUNT_FIELD = {
+    "breach": 1,
+    "damage": 1,
+    "selfDestruct": 2,
+    "shield": 2,
+    "melee": 2,
+    "attack": 2,
+}
+"""The position of the damage or shield amount in event types that have one"""
+
+INDEXED_EVENT_TYPES = ("breach", "selfDestruct", "damage", "shield", "death", "spawn", "melee")
+
+
+class EventIndex:
+    """Indexes action phase events by turn, player and location.
+
+    Events are added as frames arrive, together with per turn aggregates (number of events and
+    total damage or shield amount). Lookups by location are O(1) and checking a list of
+    locations is O(len(locations)), no matter how many frames the turn had.
+
+    Players are indexed like everywhere else in gamelib, 0 for you and 1 for your opponent.
+    The location of an event is where it happened, for example where a unit breached.
+
+    Attributes :
+        * window (int): The number of turns that are kept
+        * event_types (tuple): The event types that are indexed, see INDEXED_EVENT_TYPES
+
+    """
+    def __init__(self, window=5, event_types=INDEXED_EVENT_TYPES):
+        self.window = window
+        self.event_types = tuple(event_types)
+        self._turns = [None] * window
+        self._locations = [None] * window
+        self._totals = [None] * window
+
+    def record(self, state):
+        """Adds the events of a parsed action frame to the index
+
+        Args:
+            state: The action frame, as returned by json.loads
+
+        """
+        turn_number = int(state["turnInfo"][1])
+        slot = turn_number % self.window
+        if self._turns[slot] != turn_number:
+            self._turns[slot] = turn_number
+            self._locations[slot] = {event_type: ({}, {}) for event_type in self.event_types}
+            self._totals[slot] = {event_type: [[0, 0.0], [0, 0.0]] for event_type in self.event_types}
+
+        events = state["events"]
+        for event_type in self.event_types:
+            event_list = events.get(event_type)
+            if not event_list:
+                continue
+            player_field = EVENT_PLAYER_FIELD[event_type]
+            amount_field = EVENT_AMOUNT_FIELD.get(event_type)
+            locations = self._locations[slot][event_type]
+            totals = self._totals[slot][event_type]
+            for event in event_list:
+                player_index = int(event[player_field]) - 1
+                location = (int(event[0][0]), int(event[0][1]))
+                by_location = locations[player_index]
+                by_location[location] = by_location.get(location, 0) + 1
+                totals[player_index][0] += 1
+                if amount_field is not None:
+                    totals[player_index][1] += event[amount_field]
+
+    def has_turn(self, turn_number):
+        """Checks if events of a turn are stored
+
+        Args:
+            turn_number: The turn to check
+
+        Returns:
+            True if at least one frame of the turn was recorded and it is still inside the window
+
+        """
+        return turn_number >= 0 and self._turns[turn_number % self.window] == turn_number
+
+    def locations(self, turn_number, event_type, player_index):
+        """Gets the locations where events of a type happened during a turn
+
+        Args:
+            turn_number: The turn of the action phase
+            event_type: An event type, 'breach', 'selfDestruct', etc. Must be one of event_types
+            player_index: The player owning the event, 0 for you 1 for your opponent
+
+        Returns:
+            A dict mapping (x, y) tuples to the number of events there. Do not modify it
+
+        """
+        if not self.has_turn(turn_number):
+            return {}
+        return self._locations[turn_number % self.window][event_type][player_index]
+
+    def count(self, turn_number, event_type, player_index, location=None):
+        """Counts the events of a type during a turn
+
+        Args:
+            turn_number: The turn of the action phase
+            event_type: An event type, 'breach', 'selfDestruct', etc. Must be one of event_types
+            player_index: The player owning the event, 0 for you 1 for your opponent
+            location: If given, only events at this location are counted
+
+        Returns:
+            The number of events
+
+        """
+        if not self.has_turn(turn_number):
+            return 0
+        if location is None:
+            return self._totals[turn_number % self.window][event_type][player_index][0]
+        return self.locations(turn_number, event_type, player_index).get((location[0], location[1]), 0)
+
+    def total(self, turn_number, event_type, player_index):
+        """Sums the damage or shield amount of the events of a type during a turn
+
+        Args:
+            turn_number: The turn of the action phase
+            event_type: An event type with an amount, 'breach', 'damage', 'selfDestruct', 'shield' or 'melee'
+            player_index: The player owning the event, 0 for you 1 for your opponent
+
+        Returns:
+            The summed amount, 0 for event types without one
+
+        """
+        if not self.has_turn(turn_number):
+            return 0
+        return self._totals[turn_number % self.window][event_type][player_index][1]
+
+    def intersection(self, turn_number, event_type, player_index, locations):
+        """Finds which of the given locations had events of a type during a turn
+
+        Args:
+            turn_number: The turn of the action phase
+            event_type: An event type, 'breach', 'selfDestruct', etc. Must be one of event_types
+            player_index: The player owning the event, 0 for you 1 for your opponent
+            locations: A list of locations to check
+
+        Returns:
+            The locations that had at least one event, in the order they were given
+
+        """
+        indexed = self.locations(turn_number, event_type, player_index)
+        if not indexed:
+            return []
+        return [location for location in locations if (location[0], location[1]) in indexed]
+
+    def any_at(self, turn_number, event_type, player_index, locations):
+        """Checks if any of the given locations had events of a type during a turn
+
+        Returns:
+            True if at least one of the locations had an event
+
+        """
+        indexed = self.locations(turn_number, event_type, player_index)
+        if not indexed:
+            return False
+        return any((location[0], location[1]) in indexed for location in locations)
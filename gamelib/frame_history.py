@@ -0,0 +1,175 @@
+from array import array
+
+from .event_index import EVENT_PLAYER_FIELD, EVENT_AMOUNT_FIELD
+
+DEFAULT_EVENT_TYPES = ("breach", "selfDestruct", "damage", "shield", "death", "spawn", "melee")
+
+EVENT_UNIT_FIELD = {
+    "breach": 2,
+    "damage": 2,
+    "selfDestruct": 3,
+    "shield": 3,
+    "death": 1,
+    "spawn": 1,
+    "melee": 3,
+    "attack": 3,
+    "move": 3,
+}
+"""The position of the unit type index in each event type"""
+
+
+def _event_columns():
+    """Makes the arrays one event type of one turn is stored in: frame, x, y, player index, unit type and amount
+    """
+    return (array('H'), array('b'), array('b'), array('b'), array('b'), array('f'))
+
+
+class FrameHistory:
+    """Keeps the data strategies use from the action frames of the last few turns.
+
+    Full frames are not stored. For every turn in the window, the history keeps the events
+    of the requested types as columns of typed arrays: the frame, the x and y of the event,
+    the player index, the unit type and the damage or shield amount, one entry per event.
+    Ids and the target lists of self destructs are dropped. The unit positions of the first
+    frame it received are packed the same way, one array of alternating x and y per unit type.
+
+    Turns are stored in a ring buffer, so looking up a turn is O(1) and turns older than the
+    window are overwritten. Players are indexed like everywhere else in gamelib, 0 for you and 1 for your opponent.
+
+    Attributes :
+        * window (int): The number of turns that are kept
+        * event_types (tuple): The event types that are kept, see DEFAULT_EVENT_TYPES
+
+    """
+    def __init__(self, window=5, event_types=DEFAULT_EVENT_TYPES):
+        self.window = window
+        self.event_types = tuple(event_types)
+        self._turns = [None] * window
+        self._events = [None] * window
+        self._first_units = [None] * window
+
+    def record(self, state):
+        """Records a parsed action frame
+
+        Args:
+            state: The action frame, as returned by json.loads
+
+        """
+        turn_number = int(state["turnInfo"][1])
+        frame = int(state["turnInfo"][2])
+        slot = turn_number % self.window
+        if self._turns[slot] != turn_number:
+            self._turns[slot] = turn_number
+            self._events[slot] = {event_type: _event_columns() for event_type in self.event_types}
+            self._first_units[slot] = (self._pack(state["p1Units"]), self._pack(state["p2Units"]))
+
+        events = state["events"]
+        for event_type in self.event_types:
+            event_list = events.get(event_type)
+            if not event_list:
+                continue
+            frames, xs, ys, players, unit_types, amounts = self._events[slot][event_type]
+            player_field = EVENT_PLAYER_FIELD[event_type]
+            unit_field = EVENT_UNIT_FIELD[event_type]
+            amount_field = EVENT_AMOUNT_FIELD.get(event_type)
+            for event in event_list:
+                frames.append(frame)
+                xs.append(int(event[0][0]))
+                ys.append(int(event[0][1]))
+                players.append(int(event[player_field]) - 1)
+                unit_types.append(int(event[unit_field]))
+                amounts.append(0.0 if amount_field is None else event[amount_field])
+
+    def _pack(self, units):
+        """Packs the positions of each unit type into an array of alternating x and y
+        """
+        packed = []
+        for unit_list in units:
+            positions = array('b')
+            for unit in unit_list:
+                positions.append(int(unit[0]))
+                positions.append(int(unit[1]))
+            packed.append(positions)
+        return tuple(packed)
+
+    def has_turn(self, turn_number):
+        """Checks if frames of a turn are stored
+
+        Args:
+            turn_number: The turn to check
+
+        Returns:
+            True if at least one frame of the turn was recorded and it is still inside the window
+
+        """
+        return turn_number >= 0 and self._turns[turn_number % self.window] == turn_number
+
+    def count(self, turn_number, event_type):
+        """Counts the events of one type over all frames of a turn
+
+        Args:
+            turn_number: The turn of the action phase
+            event_type: An event type, 'breach', 'selfDestruct', etc. Must be one of event_types
+
+        Returns:
+            The number of events, 0 if the turn is not stored
+
+        """
+        if not self.has_turn(turn_number):
+            return 0
+        return len(self._events[turn_number % self.window][event_type][0])
+
+    def events(self, turn_number, event_type, player_index=None):
+        """Gets the events of one type over all frames of a turn
+
+        Args:
+            turn_number: The turn of the action phase
+            event_type: An event type, 'breach', 'selfDestruct', etc. Must be one of event_types
+            player_index: If given, only the events of this player, 0 for you 1 for your opponent
+
+        Returns:
+            A list of (frame, [x, y], player_index, unit_type, amount) tuples in frame order. Empty if the turn is not stored
+
+        """
+        if not self.has_turn(turn_number):
+            return []
+        frames, xs, ys, players, unit_types, amounts = self._events[turn_number % self.window][event_type]
+        return [(frames[i], [xs[i], ys[i]], players[i], unit_types[i], amounts[i])
+                for i in range(len(frames)) if player_index is None or players[i] == player_index]
+
+    def locations(self, turn_number, event_type, player_index):
+        """Gets the location of every event of one type a player had during a turn
+
+        Args:
+            turn_number: The turn of the action phase
+            event_type: An event type, 'breach', 'selfDestruct', etc. Must be one of event_types
+            player_index: The player owning the events, 0 for you 1 for your opponent
+
+        Returns:
+            A list of [x, y] locations in frame order, with a location once per event. Empty if the turn is not stored
+
+        """
+        if not self.has_turn(turn_number):
+            return []
+        _, xs, ys, players, _, _ = self._events[turn_number % self.window][event_type]
+        return [[xs[i], ys[i]] for i in range(len(xs)) if players[i] == player_index]
+
+    def first_frame_units(self, turn_number, player_index, unit_index):
+        """Gets the positions of one unit type in the first frame of a turn
+
+        Args:
+            turn_number: The turn of the action phase
+            player_index: 0 for you, 1 for your opponent
+            unit_index: The index of the unit type in the config, 3 for scouts, 4 for demolishers, etc.
+
+        Returns:
+            A list of [x, y] locations. Empty if the turn is not stored
+
+        """
+        if not self.has_turn(turn_number):
+            return []
+        units = self._first_units[turn_number % self.window][player_index]
+        if unit_index >= len(units):
+            return []
+        positions = units[unit_index]
+        return [[positions[i], positions[i + 1]] for i in range(0, len(positions), 2)]
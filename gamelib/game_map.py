@@ -1,7 +1,41 @@
 import math
-from .unit import GameUnit
+import random
+from .unit import GameUnit, OpponentGameUnit
+from .regions import Region
 from .util import debug_write
 
+_zobrist_random = random.Random(20201206)
+BLOCKED_KEYS = [[_zobrist_random.getrandbits(64) for y in range(28)] for x in range(28)]
+"""Random 64 bit keys per location, XORed into GameMap.blocked_hash while a location holds a structure"""
+STRUCTURE_KEYS = [[[[[_zobrist_random.getrandbits(64) for upgraded in range(2)] for player in range(2)] for unit_type in range(3)]
+                   for y in range(28)] for x in range(28)]
+"""Random 64 bit keys per location, structure type index, player index and upgraded flag, XORed into GameMap.zobrist_hash"""
+HEALTH_BUCKETS = 64
+HEALTH_KEYS = [[[_zobrist_random.getrandbits(64) for bucket in range(HEALTH_BUCKETS)] for y in range(28)] for x in range(28)]
+"""Random 64 bit keys per location and health bucket, XORed into GameMap.zobrist_hash when health buckets are enabled"""
+
+_mirrored_regions = {}
+_flipped_regions = {}
+
+
+def _mirrored_region(region):
+    """Gets region.mirrored(), built once per region since the views look it up on every region_totals call
+    """
+    mirrored = _mirrored_regions.get(region)
+    if mirrored is None:
+        mirrored = _mirrored_regions[region] = region.mirrored(region.name)
+    return mirrored
+
+
+def _flipped_region(region):
+    """Gets region.flipped(), built once per region, see _mirrored_region
+    """
+    flipped = _flipped_regions.get(region)
+    if flipped is None:
+        flipped = _flipped_regions[region] = region.flipped(region.name)
+    return flipped
+
+
 class GameMap:
     """Holds data about the current game map and provides functions
     useful for getting information related to the map.
@@ -18,6 +52,14 @@ class GameMap:
         * TOP_LEFT (int): A constant that represents the top left edge
         * BOTTOM_LEFT (int): Hidden challenge! Can you guess what this constant represents???
         * BOTTOM_RIGHT (int): A constant that represents the bottom right edge
+        * blocked_hash (int): Zobrist hash of the locations blocked by structures, kept up to date as units are added and removed
+        * zobrist_hash (int): Zobrist hash of the structures on the map, their type, owner, upgrade and optionally health bucket
+        * health_bucket (float): The health range of one bucket in zobrist_hash, None if health is not hashed. See set_health_bucket
+        * mirrored_blocked_hash (int): The blocked_hash the map would have if it was mirrored left to right
+        * mirrored_zobrist_hash (int): The zobrist_hash the map would have if it was mirrored left to right
+
+    Totals of the structures in a region, per player and type, are kept up to date for every region
+    region_totals has been asked about, see region_totals.
 
     """
     def __init__(self, config):
@@ -37,6 +79,18 @@ class GameMap:
         self.BOTTOM_RIGHT = 3
         self.__map = self.__empty_grid()
         self.__start = [13,0]
+        self.blocked_hash = 0
+        self.zobrist_hash = 0
+        self.mirrored_blocked_hash = 0
+        self.mirrored_zobrist_hash = 0
+        self.health_bucket = None
+        self.__type_index = {config["unitInformation"][i]["shorthand"]: i for i in range(3)}
+        self.__cell_regions = [[[] for y in range(self.ARENA_SIZE)] for x in range(self.ARENA_SIZE)]
+        self.__tracked_regions = set()
+        self.__region_totals = {}
+        self.__structure_masks = [0, 0]
+        self.__occupied = set()
+        self.__listeners = []
     
     def __getitem__(self, location):
         if len(location) == 2 and self.in_arena_bounds(location):
@@ -46,7 +100,16 @@ class GameMap:
 
     def __setitem__(self, location, val):
         if type(location) == tuple and len(location) == 2 and self.in_arena_bounds(location):
-            self.__map[location[0]][location[1]] = val
+            x, y = location
+            for unit in self.__map[x][y]:
+                self.__toggle_structure(unit, -1)
+            self.__map[x][y] = val
+            for unit in val:
+                self.__toggle_structure(unit, 1)
+            if val:
+                self.__occupied.add((x, y))
+            else:
+                self.__occupied.discard((x, y))
             return
         self._invalid_coordinates(location)
 
@@ -75,6 +138,179 @@ class GameMap:
                 grid[x].append([])
         return grid
 
+    def __unit_key(self, unit, x):
+        """The zobrist_hash key of a structure, as if it was in column x
+        """
+        key = STRUCTURE_KEYS[x][unit.y][self.__type_index[unit.unit_type]][unit.player_index][1 if unit.upgraded else 0]
+        if self.health_bucket is not None:
+            bucket = min(int(max(unit.health, 0) // self.health_bucket), HEALTH_BUCKETS - 1)
+            key ^= HEALTH_KEYS[x][unit.y][bucket]
+        return key
+
+    def __toggle_structure(self, unit, sign):
+        """XORs a structure in or out of the hashes and adds it to or subtracts it from the region totals.
+        Called with sign 1 when a unit is put on the map and -1 when it is taken off. Mobile units are ignored.
+        """
+        if unit.stationary:
+            mirrored_x = self.ARENA_SIZE - 1 - unit.x
+            self.blocked_hash ^= BLOCKED_KEYS[unit.x][unit.y]
+            self.zobrist_hash ^= self.__unit_key(unit, unit.x)
+            self.mirrored_blocked_hash ^= BLOCKED_KEYS[mirrored_x][unit.y]
+            self.mirrored_zobrist_hash ^= self.__unit_key(unit, mirrored_x)
+            self.__structure_masks[unit.player_index] ^= 1 << (unit.y * self.ARENA_SIZE + unit.x)
+            regions = self.__cell_regions[unit.x][unit.y]
+            if regions:
+                self.__add_to_totals(unit, regions, sign)
+            for listener in self.__listeners:
+                listener.on_structure(unit, sign)
+
+    def __add_to_totals(self, unit, regions, sign):
+        upgraded = 1 if unit.upgraded else 0
+        for region in regions:
+            for unit_type in (unit.unit_type, None):
+                totals = self.__region_totals[(unit.player_index, region, unit_type)]
+                totals[0] += sign * unit.health
+                totals[1] += sign
+                totals[2] += sign * unit.cost[0]
+                totals[3] += sign * upgraded
+
+    def add_listener(self, listener):
+        """Registers an index that is kept up to date with the structures on the map, like ThreatMap
+
+        Args:
+            listener: An object with an on_structure(unit, sign) method, called with sign 1 when a structure
+                is put on the map and -1 when it is taken off. Upgrades and health changes take the unit off and put it back
+
+        """
+        self.__listeners.append(listener)
+
+    def remove_listener(self, listener):
+        """Stops updating a listener registered with add_listener
+        """
+        self.__listeners.remove(listener)
+
+    def structure_region(self, player_index=None):
+        """Gets the locations of a player's structures
+
+        Args:
+            player_index: The index corresponding to the player, 0 for you 1 for the enemy. None for both players
+
+        Returns:
+            A Region of the locations, kept as a bitmask so this is O(1)
+
+        """
+        if player_index is None:
+            return Region(self.__structure_masks[0] | self.__structure_masks[1])
+        return Region(self.__structure_masks[player_index])
+
+    def occupied_locations(self):
+        """Gets every location that holds at least one unit, mobile units included
+
+        Returns:
+            A new list of (x, y) tuples, in no particular order
+
+        """
+        return list(self.__occupied)
+
+    def region_totals(self, region, player_index, unit_type=None):
+        """Gets the totals of the structures a player has in a region
+
+        The first call for a region counts its structures, after that the totals are kept up to date
+        as units are parsed, added, removed, upgraded and damaged through GameMap, so reads are O(1).
+
+        Args:
+            region: A Region, see regions.py
+            player_index: The index corresponding to the player, 0 for you 1 for the enemy
+            unit_type: A structure type to only count that type, or None for every structure
+
+        Returns:
+            A list of [total health, number of structures, total SP cost including upgrades, number upgraded]. Do not modify it
+
+        """
+        if region not in self.__tracked_regions:
+            self.__tracked_regions.add(region)
+            for player in (0, 1):
+                for tracked_type in list(self.__type_index) + [None]:
+                    self.__region_totals[(player, region, tracked_type)] = [0, 0, 0, 0]
+            for x, y in region:
+                if 0 <= x < self.ARENA_SIZE and 0 <= y < self.ARENA_SIZE:
+                    self.__cell_regions[x][y].append(region)
+                    for unit in self.__map[x][y]:
+                        if unit.stationary:
+                            self.__add_to_totals(unit, [region], 1)
+        return self.__region_totals[(player_index, region, unit_type)]
+
+    def __get_structure(self, location):
+        if not self.in_arena_bounds(location):
+            self._invalid_coordinates(location)
+            return None
+        for unit in self.__map[location[0]][location[1]]:
+            if unit.stationary:
+                return unit
+        return None
+
+    def set_health_bucket(self, health_bucket):
+        """Sets how structure health is included in zobrist_hash and rehashes the map.
+
+        Args:
+            health_bucket: Structures whose health falls in the same range of this size hash the same. None to ignore health
+
+        """
+        for location in self:
+            for unit in self[location]:
+                self.__toggle_structure(unit, -1)
+        self.health_bucket = health_bucket
+        for location in self:
+            for unit in self[location]:
+                self.__toggle_structure(unit, 1)
+
+    def upgrade_unit(self, location):
+        """Upgrades the structure at a location, keeping the hashes and region totals up to date.
+
+        Args:
+            location: The location of the structure
+
+        Returns:
+            The upgraded GameUnit, or None if there is no structure at the location
+
+        Like add_unit, this only changes the data stored in GameMap, use GameState.attempt_upgrade to upgrade during your turn.
+        """
+        unit = self.__get_structure(location)
+        if unit is None:
+            return None
+        self.__toggle_structure(unit, -1)
+        unit.upgrade()
+        self.__toggle_structure(unit, 1)
+        return unit
+
+    def set_unit_health(self, location, health):
+        """Sets the health of the structure at a location, keeping the hashes and region totals up to date.
+
+        Args:
+            location: The location of the structure
+            health: The new health
+
+        Returns:
+            The GameUnit, or None if there is no structure at the location
+
+        """
+        unit = self.__get_structure(location)
+        if unit is None:
+            return None
+        self.__toggle_structure(unit, -1)
+        unit.health = health
+        self.__toggle_structure(unit, 1)
+        return unit
+
+    def mirrored(self):
+        """Gets a view of the map mirrored left to right, see MirroredGameMap
+
+        Returns:
+            A MirroredGameMap of this map
+
+        """
+        return MirroredGameMap(self)
+
     def _invalid_coordinates(self, location):
         self.warn("{} is out of bounds.".format(str(location)))
 
@@ -168,10 +404,26 @@ class GameMap:
 
         x, y = location
         new_unit = GameUnit(unit_type, self.config, player_index, None, location[0], location[1])
+        self.__occupied.add((x, y))
         if not new_unit.stationary:
             self.__map[x][y].append(new_unit)
         else:
+            for unit in self.__map[x][y]:
+                self.__toggle_structure(unit, -1)
             self.__map[x][y] = [new_unit]
+            self.__toggle_structure(new_unit, 1)
+
+    def place_unit(self, unit):
+        """Adds an existing GameUnit to the map at its own location, next to any units already there.
+
+        Args:
+            unit: The GameUnit to add, its x and y must be inside the arena
+
+        Used by GameState when parsing the units of a turn.
+        """
+        self.__map[unit.x][unit.y].append(unit)
+        self.__occupied.add((unit.x, unit.y))
+        self.__toggle_structure(unit, 1)
 
     def remove_unit(self, location):
         """Remove all units on the map in the given location.
@@ -186,7 +438,10 @@ class GameMap:
             self._invalid_coordinates(location)
         
         x, y = location
+        for unit in self.__map[x][y]:
+            self.__toggle_structure(unit, -1)
         self.__map[x][y] = []
+        self.__occupied.discard((x, y))
 
     def get_locations_in_range(self, location, radius):
         """Gets locations in a circular area around a location
@@ -238,3 +493,189 @@ class GameMap:
         """
         if(self.enable_warnings):
             debug_write(message)
+
+
+class MirroredGameMap:
+    """A read only view of a GameMap mirrored left to right, [x, y] in the view is [ARENA_SIZE - 1 - x, y] in the map.
+
+    Nothing is copied, the view always shows the current state of the map. The units returned are the
+    units of the map, so their x attribute is not mirrored. Only functions reading the map are provided,
+    modify the map itself.
+
+    Attributes :
+        * ARENA_SIZE (int): The size of the arena.
+        * HALF_ARENA (int): Half of the size of the arena.
+        * TOP_RIGHT, TOP_LEFT, BOTTOM_LEFT, BOTTOM_RIGHT (int): The edge constants, see GameMap
+
+    """
+    def __init__(self, game_map):
+        self.__map = game_map
+        self.config = game_map.config
+        self.ARENA_SIZE = game_map.ARENA_SIZE
+        self.HALF_ARENA = game_map.HALF_ARENA
+        self.TOP_RIGHT = game_map.TOP_RIGHT
+        self.TOP_LEFT = game_map.TOP_LEFT
+        self.BOTTOM_LEFT = game_map.BOTTOM_LEFT
+        self.BOTTOM_RIGHT = game_map.BOTTOM_RIGHT
+
+    def __getitem__(self, location):
+        return self.__map[self.mirror_location(location)]
+
+    def __iter__(self):
+        return iter([self.mirror_location(location) for location in self.__map])
+
+    @property
+    def blocked_hash(self):
+        return self.__map.mirrored_blocked_hash
+
+    @property
+    def mirrored_blocked_hash(self):
+        return self.__map.blocked_hash
+
+    @property
+    def zobrist_hash(self):
+        return self.__map.mirrored_zobrist_hash
+
+    @property
+    def mirrored_zobrist_hash(self):
+        return self.__map.zobrist_hash
+
+    def mirror_location(self, location):
+        """Mirrors a location left to right
+
+        Args:
+            location: A location, [x, y]
+
+        Returns:
+            The mirrored location, [ARENA_SIZE - 1 - x, y]
+
+        """
+        return [self.ARENA_SIZE - 1 - location[0], location[1]]
+
+    def mirrored(self):
+        """Gets the map this view mirrors
+        """
+        return self.__map
+
+    def region_totals(self, region, player_index, unit_type=None):
+        """Gets the totals of the structures a player has in a region of the view, see GameMap.region_totals
+        """
+        return self.__map.region_totals(_mirrored_region(region), player_index, unit_type)
+
+    def in_arena_bounds(self, location):
+        return self.__map.in_arena_bounds(location)
+
+    def get_edge_locations(self, quadrant_description):
+        return self.__map.get_edge_locations(quadrant_description)
+
+    def get_edges(self):
+        return self.__map.get_edges()
+
+    def get_locations_in_range(self, location, radius):
+        return self.__map.get_locations_in_range(location, radius)
+
+    def distance_between_locations(self, location_1, location_2):
+        return self.__map.distance_between_locations(location_1, location_2)
+
+
+class OpponentGameMap:
+    """A read only view of a GameMap as the opponent sees it, [x, y] in the view is [x, ARENA_SIZE - 1 - y] in the map.
+
+    Nothing is copied, the view always shows the current state of the map. Units are returned as
+    OpponentGameUnit, with their y flipped and player_index swapped, so 0 is the opponent and 1 is you.
+    Only functions reading the map are provided, modify the map itself.
+
+    The hashes of the view are tagged tuples of the hashes of the map, they never equal a hash of a real map
+    but can key the same caches.
+
+    Attributes :
+        * ARENA_SIZE (int): The size of the arena.
+        * HALF_ARENA (int): Half of the size of the arena.
+        * TOP_RIGHT, TOP_LEFT, BOTTOM_LEFT, BOTTOM_RIGHT (int): The edge constants, see GameMap
+
+    """
+    def __init__(self, game_map):
+        self.__map = game_map
+        self.__units = {}
+        self.config = game_map.config
+        self.enable_warnings = game_map.enable_warnings
+        self.ARENA_SIZE = game_map.ARENA_SIZE
+        self.HALF_ARENA = game_map.HALF_ARENA
+        self.TOP_RIGHT = game_map.TOP_RIGHT
+        self.TOP_LEFT = game_map.TOP_LEFT
+        self.BOTTOM_LEFT = game_map.BOTTOM_LEFT
+        self.BOTTOM_RIGHT = game_map.BOTTOM_RIGHT
+
+    def __getitem__(self, location):
+        units = self.__map[self.flip_location(location)]
+        if units is None:
+            return None
+        return [self.__view_of(unit) for unit in units]
+
+    def __iter__(self):
+        return iter([self.flip_location(location) for location in self.__map])
+
+    def __view_of(self, unit):
+        view = self.__units.get(id(unit))
+        if view is None or view.unit is not unit:
+            view = OpponentGameUnit(unit, self.ARENA_SIZE)
+            self.__units[id(unit)] = view
+        return view
+
+    @property
+    def blocked_hash(self):
+        return ("opponent", self.__map.blocked_hash)
+
+    @property
+    def mirrored_blocked_hash(self):
+        return ("opponent", self.__map.mirrored_blocked_hash)
+
+    @property
+    def zobrist_hash(self):
+        return ("opponent", self.__map.zobrist_hash)
+
+    @property
+    def mirrored_zobrist_hash(self):
+        return ("opponent", self.__map.mirrored_zobrist_hash)
+
+    def flip_location(self, location):
+        """Flips a location between the view and the map
+
+        Args:
+            location: A location, [x, y]
+
+        Returns:
+            The flipped location, [x, ARENA_SIZE - 1 - y]
+
+        """
+        return [location[0], self.ARENA_SIZE - 1 - location[1]]
+
+    def opponent_map(self):
+        """Gets the map this view flips
+        """
+        return self.__map
+
+    def mirrored(self):
+        """Gets a view of this view mirrored left to right, see MirroredGameMap
+        """
+        return MirroredGameMap(self)
+
+    def region_totals(self, region, player_index, unit_type=None):
+        """Gets the totals of the structures a player has in a region of the view, see GameMap.region_totals
+        """
+        return self.__map.region_totals(_flipped_region(region), 1 - player_index, unit_type)
+
+    def in_arena_bounds(self, location):
+        return self.__map.in_arena_bounds(location)
+
+    def get_edge_locations(self, quadrant_description):
+        return self.__map.get_edge_locations(quadrant_description)
+
+    def get_edges(self):
+        return self.__map.get_edges()
+
+    def get_locations_in_range(self, location, radius):
+        return self.__map.get_locations_in_range(location, radius)
+
+    def distance_between_locations(self, location_1, location_2):
+        return self.__map.distance_between_locations(location_1, location_2)
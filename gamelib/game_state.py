@@ -4,8 +4,9 @@ import sys
 
 from .navigation import ShortestPathFinder
 from .util import send_command, debug_write
-from .unit import GameUnit
-from .game_map import GameMap
+from .unit import GameUnit, OpponentGameUnit
+from .game_map import GameMap, OpponentGameMap
+from .threat_map import ThreatMap
 
 def is_stationary(unit_type):
     """
@@ -44,20 +45,61 @@ class GameState:
         * my_time (int): The time you took to submit your previous turn
         * enemy_health (int): Your opponents current remaining health
         * enemy_time (int): Your opponents current remaining time
+        * mutation_count (int): Increases every time attempt_spawn, attempt_remove or attempt_upgrade changes the turn
 
     """
 
-    def __init__(self, config, serialized_string):
+    def __init__(self, config, serialized_string, unit_registry=None):
         """ Setup a turns variables using arguments passed
 
         Args:
             * config (JSON): A json object containing information about the game
             * serialized_string (string): A string containing information about the game state at the start of this turn
+            * unit_registry (:obj: UnitRegistry): Reuses the structures of the previous turn if given, see unit_registry.py
 
+        """
+        self.__setup(config, serialized_string, unit_registry)
+        self.game_map = GameMap(self.config)
+        self._shortest_path_finder = ShortestPathFinder()
+        self.__parse_state(serialized_string)
+
+    @classmethod
+    def from_previous(cls, previous_state, serialized_string):
+        """Creates the game state of a new turn by updating the game map of the previous turn
+
+        Only the structures that changed are applied to the map: new and destroyed structures, health,
+        upgrades and removals. Everything the map keeps up to date (hashes, region totals, structure
+        locations and listeners like ThreatMap) is therefore only updated where the board changed.
+        Changes you made to the previous map during your turn, like attempt_spawn, are undone.
+        Structures are matched through the UnitRegistry of the previous state, if it has one: a structure
+        kept on the map is counted as reused, and a structure the map lost is taken back from the registry.
+
+        The previous game state gives up its map, do not use it afterwards.
+
+        Args:
+            * previous_state (:obj: GameState): The game state of the previous turn
+            * serialized_string (string): A string containing information about the game state at the start of this turn
+
+        Returns:
+            The GameState of the new turn
+
+        """
+        state = cls.__new__(cls)
+        state.__setup(previous_state.config, serialized_string, previous_state._unit_registry)
+        state.game_map = previous_state.game_map
+        state._shortest_path_finder = previous_state._shortest_path_finder
+        state._threat_map = previous_state._threat_map
+        state.game_map.enable_warnings = True
+        state.__parse_state(serialized_string, incremental=True)
+        return state
+
+    def __setup(self, config, serialized_string, unit_registry):
+        """Sets the constants and empty fields shared by __init__ and from_previous
         """
         self.serialized_string = serialized_string
         self.config = config
         self.enable_warnings = True
+        self.mutation_count = 0
 
         global WALL, FACTORY, TURRET, SCOUT, DEMOLISHER, INTERCEPTOR, REMOVE, UPGRADE, STRUCTURE_TYPES, ALL_UNITS, UNIT_TYPE_TO_INDEX
         UNIT_TYPE_TO_INDEX = {}
@@ -89,19 +131,19 @@ class GameState:
         MP = self.MP
         SP = self.SP
 
-        self.game_map = GameMap(self.config)
-        self._shortest_path_finder = ShortestPathFinder()
         self._build_stack = []
         self._deploy_stack = []
         self._player_resources = [
                 {'SP': 0, 'MP': 0},  # player 0, which is you
                 {'SP': 0, 'MP': 0}]  # player 1, which is the opponent
-        self.__parse_state(serialized_string)
+        self._unit_registry = unit_registry
+        self._threat_map = None
 
-    def __parse_state(self, state_line):
+    def __parse_state(self, state_line, incremental=False):
         """
         Fills in map based on the serialized game state so that self.game_map[x,y] is a list of GameUnits at that location.
         state_line is the game state as a json string.
+        If incremental is True the map already holds the previous turn and is only updated where it differs.
         """
         state = json.loads(state_line)
 
@@ -123,8 +165,15 @@ class GameState:
         p1units = state["p1Units"]
         p2units = state["p2Units"]
 
-        self.__create_parsed_units(p1units, 0)
-        self.__create_parsed_units(p2units, 1)
+        if self._unit_registry is not None:
+            self._unit_registry.begin_turn()
+        if incremental:
+            self.__update_parsed_units(p1units, p2units)
+        else:
+            self.__create_parsed_units(p1units, 0)
+            self.__create_parsed_units(p2units, 1)
+        if self._unit_registry is not None:
+            self._unit_registry.end_turn()
 
     def __create_parsed_units(self, units, player_number):
         """
@@ -143,11 +192,90 @@ class GameState:
                     if self.contains_stationary_unit([x,y]):
                         self.game_map[x,y][0].pending_removal = True
                 elif unit_type == UPGRADE:
-                    if self.contains_stationary_unit([x,y]):
-                        self.game_map[x,y][0].upgrade()
+                    existing_unit = self.contains_stationary_unit([x,y])
+                    if existing_unit and not existing_unit.upgraded:
+                        self.game_map.upgrade_unit([x,y])
                 else:
-                    unit = GameUnit(unit_type, self.config, player_number, hp, x, y)
-                    self.game_map[x,y].append(unit)
+                    unit_id = uinfo[3] if len(uinfo) > 3 else None
+                    if self._unit_registry is not None:
+                        unit = self._unit_registry.get_unit(unit_type, self.config, player_number, hp, x, y, unit_id)
+                    else:
+                        unit = GameUnit(unit_type, self.config, player_number, hp, x, y)
+                        unit.unit_id = unit_id
+                    self.game_map.place_unit(unit)
+
+    def __update_parsed_units(self, p1units, p2units):
+        """
+        Helper function for __parse_state to bring the map of the previous turn up to date.
+        """
+        typedef = self.config.get("unitInformation")
+        structures = {}
+        mobile_units = []
+        removals = []
+        upgrades = set()
+        for player_number, units in enumerate([p1units, p2units]):
+            for i, unit_types in enumerate(units):
+                unit_type = typedef[i].get("shorthand")
+                for uinfo in unit_types:
+                    x, y = int(uinfo[0]), int(uinfo[1])
+                    if unit_type == REMOVE:
+                        removals.append((x, y))
+                    elif unit_type == UPGRADE:
+                        upgrades.add((x, y))
+                    else:
+                        entry = (unit_type, player_number, float(uinfo[2]), x, y, uinfo[3] if len(uinfo) > 3 else None)
+                        if is_stationary(unit_type):
+                            structures[(x, y)] = entry
+                        else:
+                            mobile_units.append(entry)
+
+        game_map = self.game_map
+        for location in set(game_map.occupied_locations()) | set(structures):
+            x, y = location
+            units = game_map[x,y]
+            entry = structures.get(location)
+            if entry is None:
+                game_map.remove_unit([x,y])
+                continue
+            unit_type, player_number, hp, _, _, unit_id = entry
+            current = None
+            for unit in units:
+                if unit.stationary:
+                    current = unit
+            if (current is not None and current.unit_type == unit_type and current.player_index == player_number
+                    and (unit_id is None or current.unit_id is None or current.unit_id == unit_id)
+                    and (location in upgrades or not current.upgraded)):
+                if len(units) > 1:
+                    game_map[x,y] = [current]
+                if current.health != hp:
+                    game_map.set_unit_health([x,y], hp)
+                current.unit_id = unit_id
+                current.pending_removal = False
+                if self._unit_registry is not None:
+                    self._unit_registry.keep(current)
+            else:
+                game_map.remove_unit([x,y])
+                # The registry still has the structure if only the map lost it, for example by remove_unit during the last turn
+                if self._unit_registry is not None:
+                    current = self._unit_registry.get_unit(unit_type, self.config, player_number, hp, x, y, unit_id)
+                else:
+                    current = GameUnit(unit_type, self.config, player_number, hp, x, y)
+                    current.unit_id = unit_id
+                game_map.place_unit(current)
+
+        # Like in __create_parsed_units, removals and upgrades apply to whatever structure is at the location
+        for x, y in removals:
+            existing_unit = self.contains_stationary_unit([x,y])
+            if existing_unit:
+                existing_unit.pending_removal = True
+        for x, y in upgrades:
+            existing_unit = self.contains_stationary_unit([x,y])
+            if existing_unit and not existing_unit.upgraded:
+                game_map.upgrade_unit([x,y])
+        for unit_type, player_number, hp, x, y, unit_id in mobile_units:
+            unit = GameUnit(unit_type, self.config, player_number, hp, x, y)
+            unit.unit_id = unit_id
+            game_map.place_unit(unit)
 
     def __resource_required(self, unit_type):
         return self.SP if is_stationary(unit_type) else self.MP
@@ -389,6 +517,8 @@ class GameState:
                     spawned_units += 1
                 else:
                     break
+        if spawned_units > 0:
+            self.mutation_count += 1
         return spawned_units
 
     def attempt_remove(self, locations):
@@ -411,6 +541,8 @@ class GameState:
                 removed_units += 1
             else:
                 self.warn("Could not remove a unit from {}. Location has no structures or is enemy territory.".format(location))
+        if removed_units > 0:
+            self.mutation_count += 1
         return removed_units
 
     def attempt_upgrade(self, locations):
@@ -441,11 +573,13 @@ class GameState:
                     if resources[SP] >= costs[SP] and resources[MP] >= costs[MP]:
                         self.__set_resource(SP, 0 - costs[SP])
                         self.__set_resource(MP, 0 - costs[MP])
-                        existing_unit.upgrade()
+                        self.game_map.upgrade_unit([x,y])
                         self._build_stack.append((UPGRADE, x, y))
                         spawned_units += 1
             else:
                 self.warn("Could not upgrade a unit from {}. Location has no structures or is enemy territory.".format(location))
+        if spawned_units > 0:
+            self.mutation_count += 1
         return spawned_units
 
     def check_if_upgraded(self, locations):
@@ -510,6 +644,63 @@ class GameState:
         end_points = self.game_map.get_edge_locations(target_edge)
         return self._shortest_path_finder.navigate_multiple_endpoints(start_location, end_points, self)
 
+    def path_traffic(self, weights=None, target_edge=None):
+        """Counts how many units would walk over each location, without building their paths one by one
+
+        Args:
+            weights: A dict mapping (x, y) start locations to how many units start there, for example
+                SpawnTracker.heatmap(). Every location of the edges the target edges are reached from counts once if None
+            target_edge: The edge the units want to reach. game_map.TOP_LEFT, game_map.BOTTOM_RIGHT, etc.
+                Induced from each start location if None.
+
+        Returns:
+            A dict mapping (x, y) tuples to the total weight of the paths going over them, like
+            find_path_to_edge from every start. Locations no path goes over are left out
+
+        """
+        edges = self.game_map.get_edges()
+        opposite = {self.game_map.TOP_RIGHT: self.game_map.BOTTOM_LEFT, self.game_map.TOP_LEFT: self.game_map.BOTTOM_RIGHT,
+                    self.game_map.BOTTOM_LEFT: self.game_map.TOP_RIGHT, self.game_map.BOTTOM_RIGHT: self.game_map.TOP_LEFT}
+        if weights is None:
+            target_edges = list(opposite) if target_edge is None else [target_edge]
+            weights = {(x, y): 1 for edge in target_edges for x, y in edges[opposite[edge]]}
+
+        by_edge = {}
+        for location, weight in weights.items():
+            edge = self.get_target_edge(location) if target_edge is None else target_edge
+            by_edge.setdefault(edge, {})[(location[0], location[1])] = weight
+
+        traffic = {}
+        for edge, edge_weights in by_edge.items():
+            for location, weight in self._shortest_path_finder.path_traffic(edge_weights, edges[edge], self).items():
+                traffic[location] = traffic.get(location, 0) + weight
+        return traffic
+
+    def path_sums(self, start_locations, value, target_edge=None):
+        """Sums a value over the path of every start location, with one pathing pass per target edge
+
+        Args:
+            start_locations: A list of [x, y] start locations
+            value: A function taking an [x, y] location and returning the number to add for it,
+                for example the attacker count of a ThreatMap
+            target_edge: The edge the units want to reach. Induced from each start location if None.
+
+        Returns:
+            A dict mapping (x, y) start locations to (sum, path length) tuples, like summing over find_path_to_edge.
+            Blocked start locations are left out
+
+        """
+        edges = self.game_map.get_edges()
+        by_edge = {}
+        for location in start_locations:
+            edge = self.get_target_edge(location) if target_edge is None else target_edge
+            by_edge.setdefault(edge, []).append(location)
+
+        sums = {}
+        for edge, locations in by_edge.items():
+            sums.update(self._shortest_path_finder.path_sums(locations, value, edges[edge], self))
+        return sums
+
     def contains_stationary_unit(self, location):
         """Check if a location is blocked, return structures unit if it is
 
@@ -556,6 +747,15 @@ class GameState:
         self.enable_warnings = not suppress
         self.game_map.enable_warnings = not suppress
 
+    def as_opponent(self):
+        """Gets a view of this game state from your opponent's side of the board, see OpponentGameState
+
+        Returns:
+            An OpponentGameState of this game state
+
+        """
+        return OpponentGameState(self)
+
     def get_target(self, attacking_unit):
         """Returns target of given unit based on current map of the game board. 
         A Unit can often have many other units in range, and Units that attack do so once each frame.
@@ -571,7 +771,7 @@ class GameState:
 
         """
 
-        if not isinstance(attacking_unit, GameUnit):
+        if not isinstance(attacking_unit, (GameUnit, OpponentGameUnit)):
             self.warn("Passed a {} to get_target as attacking_unit. Expected a GameUnit.".format(type(attacking_unit)))
             return
 
@@ -635,6 +835,19 @@ class GameState:
                     target_x_distance = unit_x_distance
         return target
 
+    def get_threat_map(self):
+        """Gets the ThreatMap of the game map, created the first time it is asked for
+
+        The threat map follows the game map, including the changes from_previous makes in later turns.
+
+        Returns:
+            A ThreatMap, see threat_map.py
+
+        """
+        if self._threat_map is None:
+            self._threat_map = ThreatMap(self.game_map)
+        return self._threat_map
+
     def get_attackers(self, location, player_index):
         """Gets the stationary units threatening a given location
 
@@ -666,3 +879,72 @@ class GameState:
                 if unit.damage_i + unit.damage_f > 0 and unit.player_index != player_index and self.game_map.distance_between_locations(location, location_unit) <= unit.attackRange:
                     attackers.append(unit)
         return attackers
+
+
+class OpponentGameState(GameState):
+    """A read only view of a GameState from your opponent's side of the board
+
+    Players are swapped and the board is flipped vertically, so the opponent is player 0 and spawns on the
+    bottom edges, like you do in a normal GameState. This lets every GameState function, and any of your
+    own analyses taking a GameState, be run as the opponent, for example to predict their attacks.
+
+    Nothing is parsed or copied, game_map is an OpponentGameMap over the map of the original state,
+    and resources and health are read from it when the view is created.
+    Locations returned by the view are in its own coordinates, use game_map.flip_location to convert them.
+    Spawning, removing, upgrading and submitting are not possible and only print a warning.
+
+    """
+    def __init__(self, game_state):
+        """Creates the view
+
+        Args:
+            * game_state (:obj: GameState): The game state to view as the opponent
+
+        """
+        self.__source = game_state
+        self.serialized_string = game_state.serialized_string
+        self.config = game_state.config
+        self.enable_warnings = game_state.enable_warnings
+        self.mutation_count = 0
+        self.ARENA_SIZE = game_state.ARENA_SIZE
+        self.HALF_ARENA = game_state.HALF_ARENA
+        self.MP = game_state.MP
+        self.SP = game_state.SP
+        self.turn_number = game_state.turn_number
+        self.my_health = game_state.enemy_health
+        self.my_time = game_state.enemy_time
+        self.enemy_health = game_state.my_health
+        self.enemy_time = game_state.my_time
+        self.game_map = OpponentGameMap(game_state.game_map)
+        self._shortest_path_finder = ShortestPathFinder(game_state._shortest_path_finder.path_cache)
+        self._build_stack = []
+        self._deploy_stack = []
+        self._player_resources = [dict(game_state._player_resources[1]), dict(game_state._player_resources[0])]
+        self._threat_map = None
+
+    def get_threat_map(self):
+        """Gets a ThreatMap of the view. It is built from the board when first asked for and does not follow later changes
+        """
+        if self._threat_map is None:
+            self._threat_map = ThreatMap(self.game_map, follow=False)
+        return self._threat_map
+
+    def as_opponent(self):
+        """Gets the game state this view was created from
+        """
+        return self.__source
+
+    def submit_turn(self):
+        self.warn("Cannot submit a turn from an opponent view")
+
+    def attempt_spawn(self, unit_type, locations, num=1):
+        self.warn("Cannot spawn units in an opponent view")
+        return 0
+
+    def attempt_remove(self, locations):
+        self.warn("Cannot remove units in an opponent view")
+        return 0
+
+    def attempt_upgrade(self, locations):
+        self.warn("Cannot upgrade units in an opponent view")
+        return 0
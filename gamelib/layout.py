@@ -0,0 +1,143 @@
+ARENA_SIZE = 28
+
+BUILD = 0
+"""Build the structure if the location is empty"""
+BUILD_OR_UPGRADE = 1
+"""Build the structure if the location is empty, upgrade the structure there otherwise"""
+UPGRADE = 2
+"""Upgrade the structure at the location, never build"""
+
+
+class Layout:
+    """A declared set of structures, built and upgraded in priority order.
+
+    A layout is a list of (unit_type, location, action) entries, where action is BUILD, BUILD_OR_UPGRADE
+    or UPGRADE. Entries are applied in the order they are given, so list the most important structures
+    first. Layouts can be added together with + and mirrored left to right with mirrored().
+
+    Declare layouts once, for example in on_game_start, and call compile() with the config before
+    applying them. compile() turns the entries into parallel arrays of bit indices, locations and costs.
+    apply() then diffs the layout against the structure bitmask of the GameMap (see GameMap.structure_region)
+    in one pass, and only calls attempt_spawn and attempt_upgrade for entries that are missing or can be
+    upgraded, and that are affordable.
+
+    Attributes :
+        * name (str): The name of the layout, None if it has none
+        * entries (list): The (unit_type, [x, y], action) entries, in priority order
+
+    """
+    def __init__(self, entries, name=None):
+        self.name = name
+        self.entries = []
+        seen = set()
+        for unit_type, location, action in entries:
+            key = (unit_type, location[0], location[1], action)
+            # Repeating a BUILD or UPGRADE entry can not change the result, the first one is kept.
+            # A repeated BUILD_OR_UPGRADE entry upgrades what the first one built, so it is kept
+            if action == BUILD_OR_UPGRADE or key not in seen:
+                seen.add(key)
+                self.entries.append((unit_type, [location[0], location[1]], action))
+        self._compiled = None
+
+    @classmethod
+    def from_locations(cls, unit_type, locations, action=BUILD, name=None):
+        """Creates a layout with one type of structure
+
+        Args:
+            unit_type: The shorthand of the structure type
+            locations: A list of [x, y] locations, in priority order
+            action: BUILD, BUILD_OR_UPGRADE or UPGRADE
+            name: The name of the layout
+
+        Returns:
+            A new Layout
+
+        """
+        return cls([(unit_type, location, action) for location in locations], name)
+
+    def __add__(self, other):
+        return Layout(self.entries + other.entries)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __repr__(self):
+        return "Layout({}, {} entries)".format(self.name, len(self.entries))
+
+    def mirrored(self, name=None):
+        """Gets the layout mirrored left to right, [x, y] becomes [27 - x, y]. The priority order is kept
+        """
+        return Layout([(unit_type, [ARENA_SIZE - 1 - x, y], action) for unit_type, (x, y), action in self.entries], name)
+
+    def locations(self):
+        """Gets the locations of the entries
+
+        Returns:
+            A new list of [x, y] locations, in priority order
+
+        """
+        return [list(location) for _, location, _ in self.entries]
+
+    def compile(self, config):
+        """Prepares the layout for apply(). Call it once, the config does not change during a game
+
+        Args:
+            config: The game config
+
+        """
+        costs = {}
+        for info in config["unitInformation"]:
+            shorthand = info.get("shorthand")
+            if shorthand is not None:
+                costs[shorthand] = info.get("cost1", 0)
+        self._compiled = (
+            [unit_type for unit_type, _, _ in self.entries],
+            [y * ARENA_SIZE + x for _, (x, y), _ in self.entries],
+            [location for _, location, _ in self.entries],
+            [action for _, _, action in self.entries],
+            [costs.get(unit_type, 0) for unit_type, _, _ in self.entries])
+
+    def missing(self, game_map):
+        """Gets the entries that would build a structure on the current board
+
+        Args:
+            game_map: The GameMap to diff the layout against
+
+        Returns:
+            A list of (unit_type, [x, y]) tuples, in priority order
+
+        """
+        mask = game_map.structure_region().mask
+        return [(unit_type, list(location)) for unit_type, location, action in self.entries
+                if action != UPGRADE and not mask >> (location[1] * ARENA_SIZE + location[0]) & 1]
+
+    def apply(self, game_state, reserve=0):
+        """Builds and upgrades the structures of the layout that are missing or not upgraded yet, in priority order
+
+        Args:
+            game_state: The GameState of the current turn
+            reserve: Only build a structure if this many more of the same type would still be affordable.
+                Upgrades are not limited
+
+        Returns:
+            The number of structures built and upgraded
+
+        """
+        if self._compiled is None:
+            self.compile(game_state.config)
+        unit_types, indices, locations, actions, costs = self._compiled
+        mask = game_state.game_map.structure_region().mask
+        sp = game_state.get_resource(game_state.SP)
+        done = 0
+        for i in range(len(indices)):
+            action = actions[i]
+            if mask >> indices[i] & 1:
+                if action != BUILD and game_state.attempt_upgrade(locations[i]):
+                    sp = game_state.get_resource(game_state.SP)
+                    done += 1
+            elif action != UPGRADE and sp >= costs[i] * (reserve + 1):
+                if game_state.attempt_spawn(unit_types[i], locations[i]):
+                    mask |= 1 << indices[i]
+                    sp = game_state.get_resource(game_state.SP)
+                    done += 1
+        return done
@@ -2,6 +2,7 @@ import heapq
 import math
 import sys
 import queue
+from collections import OrderedDict, deque
 from .util import debug_write
 
 class Node:
@@ -20,6 +21,101 @@ class Node:
         self.blocked = False
         self.pathlength = -1
 
+class PathCache:
+    """A least recently used cache of paths, shared between turns
+
+    Paths are keyed by the blocked layout hash of the map, the start location and the end points,
+    which is everything a path depends on. When the estimated memory used goes over max_bytes,
+    the least recently used paths are evicted.
+
+    Paths stored as mirror safe also answer the mirrored query, the same start and end points mirrored
+    left to right on the mirrored board, by mirroring the stored path.
+
+    Attributes :
+        * max_bytes (int): The memory ceiling of the cache, in bytes
+        * bytes_used (int): The estimated memory used by the cached paths
+        * hits (int): Number of lookups that found a path
+        * misses (int): Number of lookups that did not find a path
+        * mirror_hits (int): Number of lookups answered by mirroring a stored path, not counted in hits
+        * evictions (int): Number of paths evicted to stay under max_bytes
+
+    """
+    def __init__(self, max_bytes=2000000):
+        self.max_bytes = max_bytes
+        self.bytes_used = 0
+        self.hits = 0
+        self.misses = 0
+        self.mirror_hits = 0
+        self.evictions = 0
+        self._paths = OrderedDict()
+
+    def get(self, key, mirror_key=None, arena_size=28):
+        """Looks up a path
+
+        Args:
+            key: The key the path was stored with
+            mirror_key: The key of the mirrored query, tried if key is not cached
+            arena_size: The size of the arena, used to mirror paths
+
+        Returns:
+            A new list of [x, y] locations, or None if the path is not cached
+
+        """
+        entry = self._paths.get(key)
+        if entry is not None:
+            self._paths.move_to_end(key)
+            self.hits += 1
+            return [list(location) for location in entry[0]]
+        if mirror_key is not None:
+            entry = self._paths.get(mirror_key)
+            if entry is not None and entry[2]:
+                self._paths.move_to_end(mirror_key)
+                self.mirror_hits += 1
+                return [[arena_size - 1 - x, y] for x, y in entry[0]]
+        self.misses += 1
+        return None
+
+    def put(self, key, path, mirror_safe=False):
+        """Stores a path, evicting the least recently used paths if needed
+
+        Args:
+            key: The key to store the path with
+            path: A list of [x, y] locations
+            mirror_safe: True if the mirrored query is known to give the mirrored path
+
+        """
+        stored = tuple((location[0], location[1]) for location in path)
+        size = sys.getsizeof(key) + sys.getsizeof(stored) + len(stored) * sys.getsizeof((0, 0))
+        old = self._paths.pop(key, None)
+        if old is not None:
+            self.bytes_used -= old[1]
+        self._paths[key] = (stored, size, mirror_safe)
+        self.bytes_used += size
+        while self.bytes_used > self.max_bytes and self._paths:
+            _, (_, evicted_size, _) = self._paths.popitem(last=False)
+            self.bytes_used -= evicted_size
+            self.evictions += 1
+
+    def clear(self):
+        """Removes every path from the cache
+        """
+        self._paths.clear()
+        self.bytes_used = 0
+
+    def stats(self):
+        """Gets the cache statistics
+
+        Returns:
+            A dict with the number of entries, bytes used, hits, mirror hits, misses and evictions
+
+        """
+        return {"entries": len(self._paths), "bytes_used": self.bytes_used, "hits": self.hits,
+                "mirror_hits": self.mirror_hits, "misses": self.misses, "evictions": self.evictions}
+
+
+DEFAULT_PATH_CACHE = PathCache()
+"""The cache used by every ShortestPathFinder that is not given its own, so paths carry over between turns"""
+
 """
 This class helps with pathfinding. We guarantee the results will
 be accurate, but top players may want to write their own pathfinding
@@ -34,12 +130,15 @@ class ShortestPathFinder:
 
         * game_state (:obj: GameState): The current gamestate
         * game_map (:obj: GameMap): The current gamemap
+        * path_cache (:obj: PathCache): The cache paths are looked up in, None to always compute paths.
+          Paths computed on the mirror image of a cached board are mirrored from the cache when that gives the same path
 
     """
-    def __init__(self):
+    def __init__(self, path_cache=DEFAULT_PATH_CACHE):
         self.HORIZONTAL = 1
         self.VERTICAL = 2
         self.initialized = False
+        self.path_cache = path_cache
 
     def initialize_map(self, game_state):
         """Initializes the map
@@ -68,6 +167,17 @@ class ShortestPathFinder:
         if game_state.contains_stationary_unit(start_point):
             return
 
+        cache_key = None
+        if self.path_cache is not None and game_state.game_map.blocked_hash is not None:
+            last = game_state.ARENA_SIZE - 1
+            end_points_key = tuple(sorted((location[0], location[1]) for location in end_points))
+            cache_key = (game_state.game_map.blocked_hash, start_point[0], start_point[1], end_points_key)
+            mirrored_end_points_key = tuple(sorted((last - location[0], location[1]) for location in end_points))
+            mirror_key = (game_state.game_map.mirrored_blocked_hash, last - start_point[0], start_point[1], mirrored_end_points_key)
+            path = self.path_cache.get(cache_key, mirror_key, game_state.ARENA_SIZE)
+            if path is not None:
+                return path
+
         #Initialize map 
         self.initialize_map(game_state)
         #Fill in walls
@@ -77,7 +187,166 @@ class ShortestPathFinder:
         #Do pathfinding
         ideal_endpoints = self._idealness_search(start_point, end_points)
         self._validate(ideal_endpoints, end_points)
-        return self._get_path(start_point, end_points)
+        path = self._get_path(start_point, end_points)
+        if cache_key is not None:
+            self.path_cache.put(cache_key, path, self._mirror_safe)
+        return path
+
+    def path_traffic(self, weights, end_points, game_state):
+        """Counts how many units would walk over each location on their way to a set of endpoints
+
+        Every pocket of pathable space gets its pathlengths in one pass, like navigate_multiple_endpoints
+        would give them to a unit in that pocket. The paths are not built one by one: a unit's next move only
+        depends on its location and the direction of its last move, so the weight of each start is pushed
+        along the next moves from the longest pathlength down, and every location and direction is handled once.
+
+        Args:
+            * weights: A dict mapping (x, y) start locations to the number of units starting there
+            * end_points: The end points of the units, should be a list of edge locations
+            * game_state: The current game state
+
+        Returns:
+            A dict mapping (x, y) tuples to the total weight of the paths going over them, the starts and
+            ends included. Locations no path goes over are left out
+
+        """
+        self._initialize_field(end_points, game_state)
+        self._mirror_safe = False
+
+        # levels[pathlength] maps (x, y, previous move direction) to the weight of units there
+        levels = {}
+        for (x, y), weight in weights.items():
+            if not self.game_state.game_map.in_arena_bounds([x, y]) or self.game_map[x][y].blocked or not weight:
+                continue
+            level = levels.setdefault(self.game_map[x][y].pathlength, {})
+            level[(x, y, 0)] = level.get((x, y, 0), 0) + weight
+
+        traffic = {}
+        for pathlength in range(max(levels, default=-1), -1, -1):
+            level = levels.pop(pathlength, None)
+            if not level:
+                continue
+            next_level = levels.setdefault(pathlength - 1, {}) if pathlength > 0 else None
+            for (x, y, move_direction), weight in level.items():
+                traffic[(x, y)] = traffic.get((x, y), 0) + weight
+                if next_level is None:
+                    continue
+                next_x, next_y = self._choose_next_move([x, y], move_direction, end_points)
+                key = (next_x, next_y, self.VERTICAL if next_x == x else self.HORIZONTAL)
+                next_level[key] = next_level.get(key, 0) + weight
+        return traffic
+
+    def path_sums(self, start_points, value, end_points, game_state):
+        """Sums a value over the paths of many start locations, without building the paths one by one
+
+        Like path_traffic, the next moves are followed on one pathlength field. The sum from each location
+        and direction of the last move to the end of the path is kept, so paths that meet are only walked once.
+
+        Args:
+            * start_points: A list of [x, y] start locations, blocked ones are left out
+            * value: A function taking an [x, y] location and returning the number to add for it
+            * end_points: The end points of the units, should be a list of edge locations
+            * game_state: The current game state
+
+        Returns:
+            A dict mapping (x, y) start locations to (sum, path length) tuples, the same as summing over navigate_multiple_endpoints
+
+        """
+        self._initialize_field(end_points, game_state)
+        self._mirror_safe = False
+        # (x, y, previous move direction) -> (sum, length) from there to the end of the path
+        rest = {}
+        sums = {}
+        for x, y in start_points:
+            if not self.game_state.game_map.in_arena_bounds([x, y]) or self.game_map[x][y].blocked:
+                continue
+            walk = []
+            state = (x, y, 0)
+            while state not in rest:
+                walk.append(state)
+                current = [state[0], state[1]]
+                if self.game_map[state[0]][state[1]].pathlength == 0:
+                    break
+                next_x, next_y = self._choose_next_move(current, state[2], end_points)
+                state = (next_x, next_y, self.VERTICAL if next_x == state[0] else self.HORIZONTAL)
+            total, length = rest.get(state, (0, 0)) if state not in walk else (0, 0)
+            for state in reversed(walk):
+                total += value([state[0], state[1]])
+                length += 1
+                rest[state] = (total, length)
+            sums[(x, y)] = rest[(x, y, 0)]
+        return sums
+
+    def pathlengths(self, end_points, game_state):
+        """Gets how many moves a unit at each location is from the end of its path, see path_traffic
+
+        Args:
+            * end_points: The end points of the units, should be a list of edge locations
+            * game_state: The current game state
+
+        Returns:
+            A list of lists where [x][y] is the pathlength of [x, y], -1 for blocked locations and locations outside the arena
+
+        """
+        self._initialize_field(end_points, game_state)
+        return [[node.pathlength for node in column] for column in self.game_map]
+
+    def _initialize_field(self, end_points, game_state):
+        self.initialize_map(game_state)
+        for location in self.game_state.game_map:
+            if self.game_state.contains_stationary_unit(location):
+                self.game_map[location[0]][location[1]].blocked = True
+        self._fill_pathlengths(end_points)
+
+    def _fill_pathlengths(self, end_points):
+        """Sets the pathlength of every pathable location, towards the end points if its pocket holds one
+        and towards the most ideal location of the pocket otherwise, see _idealness_search and _validate
+        """
+        size = self.game_state.ARENA_SIZE
+        end_point_set = set((x, y) for x, y in end_points)
+        seeds = []
+        for x in range(size):
+            for y in range(size):
+                node = self.game_map[x][y]
+                if node.blocked or node.visited_idealness or not self.game_state.game_map.in_arena_bounds([x, y]):
+                    continue
+                # Collect the pocket, keeping its most ideal location
+                node.visited_idealness = True
+                pocket = [[x, y]]
+                pocket_end_points = []
+                most_ideal, best_idealness = None, -1
+                for location in pocket:
+                    if (location[0], location[1]) in end_point_set:
+                        pocket_end_points.append(location)
+                    idealness = self._get_idealness(location, end_points)
+                    if idealness > best_idealness:
+                        most_ideal, best_idealness = location, idealness
+                    for neighbor in self._get_neighbors(location):
+                        if not self.game_state.game_map.in_arena_bounds(neighbor):
+                            continue
+                        neighbor_node = self.game_map[neighbor[0]][neighbor[1]]
+                        if not neighbor_node.blocked and not neighbor_node.visited_idealness:
+                            neighbor_node.visited_idealness = True
+                            pocket.append(neighbor)
+                seeds.extend(pocket_end_points if pocket_end_points else [most_ideal])
+
+        current = deque()
+        for location in seeds:
+            node = self.game_map[location[0]][location[1]]
+            node.pathlength = 0
+            node.visited_validate = True
+            current.append(location)
+        while current:
+            location = current.popleft()
+            pathlength = self.game_map[location[0]][location[1]].pathlength
+            for neighbor in self._get_neighbors(location):
+                if not self.game_state.game_map.in_arena_bounds(neighbor):
+                    continue
+                neighbor_node = self.game_map[neighbor[0]][neighbor[1]]
+                if not neighbor_node.blocked and not neighbor_node.visited_validate:
+                    neighbor_node.pathlength = pathlength + 1
+                    neighbor_node.visited_validate = True
+                    current.append(neighbor)
 
     def _idealness_search(self, start, end_points):
         """
@@ -202,6 +471,7 @@ class ShortestPathFinder:
         path = [start_point]
         current = start_point
         move_direction = 0
+        self._mirror_safe = True
 
         while not self.game_map[current[0]][current[1]].pathlength == 0:
             #debug_write("current tile {} has cost {}".format(current, self.game_map[current[0]][current[1]].pathlength))
@@ -249,9 +519,22 @@ class ShortestPathFinder:
             ideal_neighbor = neighbor
             best_pathlength = current_pathlength
 
+        #Ties between left and right are broken by the order neighbors are checked in, which a mirrored board reverses
+        if self._mirror_safe:
+            x, y = current_point
+            if self._pathlength_at([x + 1, y]) == best_pathlength and self._pathlength_at([x - 1, y]) == best_pathlength:
+                self._mirror_safe = False
+
         #debug_write("Gave unit at {} new tile {}".format(current_point, ideal_neighbor))
         return ideal_neighbor
 
+    def _pathlength_at(self, location):
+        """The pathlength of a location, None if it is blocked or outside the arena
+        """
+        if not self.game_state.game_map.in_arena_bounds(location) or self.game_map[location[0]][location[1]].blocked:
+            return None
+        return self.game_map[location[0]][location[1]].pathlength
+
     def _better_direction(self, prev_tile, new_tile, prev_best, previous_move_direction, end_points):
         """Compare two tiles and return True if the unit would rather move to the new one
 
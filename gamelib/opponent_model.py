@@ -0,0 +1,136 @@
+from .regions import edge_locations
+from .spawn_tracker import MOBILE_UNIT_INDICES
+
+
+class OpponentModel:
+    """Learns when and how a player attacks, with statistics that decay every turn.
+
+    Call observe() at the start of every turn with the new GameState, and record() with every action
+    frame that has spawn events. observe() folds the previous turn into the model: whether the player
+    spawned mobile units, with how much MP they started the turn, which unit types, which edge
+    and which tiles. All statistics are kept in fixed-size arrays and multiplied by decay before
+    each turn is added, so a turn costs the same no matter how long the game has been going.
+
+    Attributes :
+        * player_index (int): The modeled player, 0 for you 1 for your opponent
+        * decay (float): The factor the statistics are multiplied by every turn
+        * mp_bucket (float): The width of the MP ranges attack probabilities are kept for
+        * buckets (int): The number of MP ranges, MP above the last range counts towards it
+
+    """
+    def __init__(self, player_index=1, decay=0.9, mp_bucket=5.0, buckets=10):
+        self.player_index = player_index
+        self.decay = decay
+        self.mp_bucket = mp_bucket
+        self.buckets = buckets
+        self.edge_locations = edge_locations(player_index)
+        self._edge_index = {location: i for i, location in enumerate(self.edge_locations)}
+        self._turns_at = [0.0] * buckets
+        self._attacks_at = [0.0] * buckets
+        self._unit_mix = [0.0] * len(MOBILE_UNIT_INDICES)
+        self._edges = [0.0, 0.0]
+        self._tiles = [0.0] * len(self.edge_locations)
+        self._turn = None
+        self._mp = None
+        self._spawns = None
+
+    def _bucket(self, mp):
+        return min(int(mp // self.mp_bucket), self.buckets - 1)
+
+    def record(self, state):
+        """Adds the spawn events of a parsed action frame to the turn being observed
+
+        Args:
+            state: The action frame, as returned by json.loads
+
+        """
+        if self._spawns is None or int(state["turnInfo"][1]) != self._turn:
+            return
+        engine_player = self.player_index + 1
+        for spawn in state["events"].get("spawn", ()):
+            unit_index = int(spawn[1])
+            if int(spawn[3]) == engine_player and unit_index in MOBILE_UNIT_INDICES:
+                self._spawns.append((unit_index, (int(spawn[0][0]), int(spawn[0][1]))))
+
+    def observe(self, game_state):
+        """Folds the last observed turn into the model and starts observing a new turn
+
+        Args:
+            game_state: The GameState of the turn that is starting
+
+        """
+        if self._spawns is not None and game_state.turn_number != self._turn:
+            self._fold()
+        self._turn = game_state.turn_number
+        self._mp = game_state.get_resource(game_state.MP, self.player_index)
+        self._spawns = []
+
+    def _fold(self):
+        decay = self.decay
+        for values in (self._turns_at, self._attacks_at, self._unit_mix, self._edges, self._tiles):
+            for i in range(len(values)):
+                values[i] *= decay
+
+        bucket = self._bucket(self._mp)
+        self._turns_at[bucket] += 1
+        if not self._spawns:
+            return
+        self._attacks_at[bucket] += 1
+        half = len(self.edge_locations) // 2
+        for unit_index, location in self._spawns:
+            self._unit_mix[unit_index - MOBILE_UNIT_INDICES[0]] += 1
+            index = self._edge_index.get(location)
+            if index is not None:
+                self._tiles[index] += 1
+                self._edges[0 if index < half else 1] += 1
+
+    def attack_probability(self, mp):
+        """Estimates how likely the player is to spawn mobile units on a turn
+
+        Args:
+            mp: The MP the player starts the turn with
+
+        Returns:
+            The decayed share of turns with that much MP that had an attack, with one attack and
+            one quiet turn added so unseen MP ranges give 0.5
+
+        """
+        bucket = self._bucket(mp)
+        return (self._attacks_at[bucket] + 1) / (self._turns_at[bucket] + 2)
+
+    def unit_mix(self):
+        """Gets the decayed share of each mobile unit type among the units the player spawned
+
+        Returns:
+            A list with the shares of scouts, demolishers and interceptors, all 0 if nothing was spawned
+
+        """
+        total = sum(self._unit_mix)
+        if total == 0:
+            return [0.0] * len(self._unit_mix)
+        return [value / total for value in self._unit_mix]
+
+    def edge_probability(self):
+        """Gets the decayed share of units the player spawned on each edge
+
+        Returns:
+            A (left, right) tuple, (0.5, 0.5) if nothing was spawned
+
+        """
+        total = self._edges[0] + self._edges[1]
+        if total == 0:
+            return (0.5, 0.5)
+        return (self._edges[0] / total, self._edges[1] / total)
+
+    def likely_spawns(self, count=1):
+        """Gets the tiles the player spawned the most units on
+
+        Args:
+            count: The number of locations to return
+
+        Returns:
+            A list of at most count [x, y] locations, most used first
+
+        """
+        ranked = sorted((i for i in range(len(self._tiles)) if self._tiles[i] > 0), key=lambda i: -self._tiles[i])
+        return [list(self.edge_locations[i]) for i in ranked[:count]]
@@ -0,0 +1,159 @@
+from .regions import NEIGHBORS, edge_locations
+from .unit import GameUnit
+
+ARENA_SIZE = 28
+
+
+class PlacementScorer:
+    """Scores many candidate structures at once, by what each would change on its own.
+
+    Two objectives are scored against the paths the attacking player's units take from their spawn
+    locations, weighted by how many units start at each location (for example SpawnTracker.heatmap()):
+
+        * damage: the damage per frame the candidate adds to the units walking by, one frame per location
+          like ThreatMap.path_damage. It uses the range stencils of the ThreatMap and the path traffic
+          of GameState.path_traffic, so a candidate costs the size of its range
+        * lengthened: the weight of the starts whose shortest path to their target gets longer, or is cut off,
+          when the candidate blocks its location. Blocking a location can only change the paths that go
+          over it, and lengthens a path exactly when every shortest path goes over it. The shortest paths
+          through each location are counted once for every start, so a candidate is a lookup
+
+    Everything is computed when the scorer is created, from the board of the GameState, without copying it.
+    Create a new scorer after structures are built or removed. The damage of a candidate on a path location
+    is scored on the current paths, its blocking effect is what lengthened measures.
+
+    Attributes :
+        * game_state (:obj: GameState): The turn the candidates are scored on
+        * player_index (int): The player placing the structures, 0 for you 1 for the enemy
+        * weights (dict): The (x, y) start locations of the attacking units and their weights
+        * traffic (dict): The total weight of the paths going over each (x, y) location
+        * damage_to_go (float): The damage the attacking units take along their paths now, the baseline of the damage objective
+
+    """
+    def __init__(self, game_state, weights=None, player_index=0):
+        self.game_state = game_state
+        self.player_index = player_index
+        if weights is None:
+            weights = {location: 1 for location in edge_locations(1 - player_index)}
+        self.weights = {(x, y): weight for (x, y), weight in weights.items()
+                        if weight and game_state.game_map.in_arena_bounds([x, y]) and not game_state.contains_stationary_unit([x, y])}
+        self._threat_map = game_state.get_threat_map()
+        self._units = {}
+
+        self.traffic = game_state.path_traffic(self.weights)
+        self.damage_to_go = sum(weight * self._threat_map.damage([x, y], 1 - player_index)
+                                for (x, y), weight in self.traffic.items())
+        self._lengthened = self._count_lengthened()
+
+    def _count_lengthened(self):
+        """Finds, for every location, the weight of the starts that need it for all of their shortest paths
+        """
+        gains = [0] * (ARENA_SIZE * ARENA_SIZE)
+        game_map = self.game_state.game_map
+        edges = game_map.get_edges()
+        finder = self.game_state._shortest_path_finder
+        by_edge = {}
+        for location, weight in self.weights.items():
+            by_edge.setdefault(self.game_state.get_target_edge(location), {})[location] = weight
+
+        for edge, weights in by_edge.items():
+            field = finder.pathlengths(edges[edge], self.game_state)
+            pathlength = [-1] * (ARENA_SIZE * ARENA_SIZE)
+            levels = {}
+            for x in range(ARENA_SIZE):
+                for y in range(ARENA_SIZE):
+                    if field[x][y] >= 0:
+                        pathlength[y * ARENA_SIZE + x] = field[x][y]
+                        levels.setdefault(field[x][y], []).append(y * ARENA_SIZE + x)
+
+            # to_end[i] is the number of shortest paths from i to the end of its path
+            to_end = [0] * (ARENA_SIZE * ARENA_SIZE)
+            for index in levels.get(0, ()):
+                to_end[index] = 1
+            for level in range(1, len(levels)):
+                for index in levels.get(level, ()):
+                    to_end[index] = sum(to_end[n] for n in NEIGHBORS[index] if pathlength[n] == level - 1)
+
+            for (x, y), weight in weights.items():
+                start = y * ARENA_SIZE + x
+                total = to_end[start]
+                # from_start maps the locations of the current level to the number of shortest paths reaching them
+                from_start = {start: 1}
+                for level in range(pathlength[start], 0, -1):
+                    next_level = {}
+                    for index, count in from_start.items():
+                        if index != start and count * to_end[index] == total:
+                            gains[index] += weight
+                        for n in NEIGHBORS[index]:
+                            if pathlength[n] == level - 1:
+                                next_level[n] = next_level.get(n, 0) + count
+                    from_start = next_level
+                for index, count in from_start.items():
+                    if index != start and count * to_end[index] == total:
+                        gains[index] += weight
+        return gains
+
+    def _unit(self, unit_type):
+        unit = self._units.get(unit_type)
+        if unit is None:
+            unit = self._units[unit_type] = GameUnit(unit_type, self.game_state.config, self.player_index)
+        return unit
+
+    def _placeable(self, location):
+        return self.game_state.game_map.in_arena_bounds(location) and not self.game_state.contains_stationary_unit(location)
+
+    def damage(self, candidates):
+        """Scores the damage each candidate would add to the attacking units
+
+        Args:
+            candidates: A list of (unit_type, [x, y]) placements
+
+        Returns:
+            A list with the added damage of each candidate, 0 for candidates that do not attack or can not be placed
+
+        """
+        traffic = self.traffic
+        scores = []
+        for unit_type, location in candidates:
+            unit = self._unit(unit_type)
+            if unit.damage_i <= 0 or not self._placeable(location):
+                scores.append(0)
+                continue
+            total = 0
+            for index in self._threat_map.stencil(location[0], location[1], unit.attackRange):
+                total += traffic.get((index % ARENA_SIZE, index // ARENA_SIZE), 0)
+            scores.append(total * unit.damage_i)
+        return scores
+
+    def lengthened(self, candidates):
+        """Scores how many attacking units would take a longer path, or none at all, because of each candidate
+
+        Args:
+            candidates: A list of (unit_type, [x, y]) placements
+
+        Returns:
+            A list with the weight of the starts each candidate lengthens, 0 for candidates that can not be placed
+
+        """
+        return [self._lengthened[location[1] * ARENA_SIZE + location[0]] if self._placeable(location) else 0
+                for _, location in candidates]
+
+    def rank(self, candidates, damage_weight=1.0, lengthened_weight=1.0, count=None):
+        """Orders candidates by a weighted sum of both objectives, best first
+
+        Args:
+            candidates: A list of (unit_type, [x, y]) placements
+            damage_weight: The weight of the damage score
+            lengthened_weight: The weight of the lengthened score
+            count: The number of candidates to return, None for all
+
+        Returns:
+            A list of (score, unit_type, [x, y]) tuples, leaving out candidates that can not be placed
+
+        """
+        damage = self.damage(candidates) if damage_weight else [0] * len(candidates)
+        lengthened = self.lengthened(candidates) if lengthened_weight else [0] * len(candidates)
+        scored = [(damage_weight * damage[i] + lengthened_weight * lengthened[i], unit_type, list(location))
+                  for i, (unit_type, location) in enumerate(candidates) if self._placeable(location)]
+        scored.sort(key=lambda item: -item[0])
+        return scored if count is None else scored[:count]
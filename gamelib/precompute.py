@@ -0,0 +1,169 @@
+import threading
+
+from .game_state import GameState
+from .util import debug_write
+
+
+def board_hash(game_state):
+    """Gets the hash of the structures on the board of a game state
+
+    Mobile units and resources are ignored, health only counts if the map hashes health buckets.
+    Two game states with the same structures in the same places have the same hash.
+
+    Args:
+        game_state: The GameState to hash
+
+    Returns:
+        The zobrist_hash of the game map
+
+    """
+    return game_state.game_map.zobrist_hash
+
+
+class SpeculativePrecomputer:
+    """Prepares board analyses for the next turn while the action phase is still running.
+
+    Action frames are handed to a worker thread as they arrive. The worker rebuilds the board
+    the next turn will most likely start with (the latest frame, minus mobile units and structures
+    pending removal) and runs every registered analysis on it. When the next turn starts,
+    get() returns the precomputed result if the board hash still matches and computes it otherwise.
+
+    Analyses must only depend on the structures on the board, their types, locations and upgrades.
+    Results are keyed on board_hash, which ignores health unless the map hashes health buckets, so an
+    analysis reading health or resources would be reused after they changed. Results are shared, do not modify them.
+
+    Attributes :
+        * config (JSON): Contains information about the game, must be set before frames are submitted
+        * hits (int): Number of get() calls answered with a precomputed result
+        * misses (int): Number of get() calls that had to compute their result
+
+    """
+    def __init__(self):
+        self.config = None
+        self.hits = 0
+        self.misses = 0
+        self._analyses = {}
+        self._results = {}
+        self._condition = threading.Condition()
+        self._pending = None
+        self._busy = False
+        self._running = False
+        self._thread = None
+        self._last_hash = None
+
+    def register(self, name, analysis):
+        """Registers an analysis to be precomputed during the action phase
+
+        Args:
+            name: The name used to retrieve the result with get()
+            analysis: A function taking a GameState and returning the result of the analysis
+
+        """
+        with self._condition:
+            self._analyses[name] = analysis
+            self._results.pop(name, None)
+            self._last_hash = None
+
+    def submit(self, serialized_string):
+        """Hands an action frame to the worker thread. Only the latest frame is kept.
+
+        Args:
+            serialized_string: The action frame as it was received from the engine
+
+        """
+        if not self._analyses or self.config is None:
+            return
+        with self._condition:
+            self._pending = serialized_string
+            if not self._running:
+                self._running = True
+                self._thread = threading.Thread(target=self._work, daemon=True)
+                self._thread.start()
+            self._condition.notify_all()
+
+    def wait_idle(self):
+        """Waits for the worker to finish the last submitted frame.
+        Called when a new turn starts, the last frame is the best guess of the new board.
+        """
+        with self._condition:
+            while self._running and (self._busy or self._pending is not None):
+                self._condition.wait()
+
+    def stop(self):
+        """Stops the worker thread
+        """
+        with self._condition:
+            self._pending = None
+            self._running = False
+            self._condition.notify_all()
+
+    def get(self, name, game_state, compute=True):
+        """Gets the result of a registered analysis for the given game state
+
+        Args:
+            name: The name the analysis was registered with
+            game_state: The GameState the result is wanted for
+            compute: If False, None is returned instead of computing a result that was not precomputed
+
+        Returns:
+            The precomputed result if it was computed on the same board, otherwise a freshly computed result
+
+        """
+        current_hash = board_hash(game_state)
+        with self._condition:
+            entry = self._results.get(name)
+            analysis = self._analyses[name]
+        if entry is not None and entry[0] == current_hash:
+            self.hits += 1
+            return entry[1]
+
+        self.misses += 1
+        if not compute:
+            return None
+        result = analysis(game_state)
+        with self._condition:
+            self._results[name] = (current_hash, result)
+        return result
+
+    def _speculative_state(self, serialized_string):
+        """Builds the board the next turn is expected to start with from an action frame
+        """
+        state = GameState(self.config, serialized_string)
+        state.suppress_warnings(True)
+        state.turn_number += 1
+        for location in state.game_map:
+            units = state.game_map[location]
+            if any(not unit.stationary or unit.pending_removal for unit in units):
+                state.game_map[location[0], location[1]] = [unit for unit in units if unit.stationary and not unit.pending_removal]
+        return state
+
+    def _work(self):
+        while True:
+            with self._condition:
+                while self._running and self._pending is None:
+                    self._condition.wait()
+                if not self._running:
+                    return
+                serialized_string = self._pending
+                self._pending = None
+                self._busy = True
+                analyses = list(self._analyses.items())
+
+            try:
+                state = self._speculative_state(serialized_string)
+                state_hash = board_hash(state)
+                with self._condition:
+                    changed = state_hash != self._last_hash
+                if changed:
+                    results = {}
+                    for name, analysis in analyses:
+                        results[name] = (state_hash, analysis(state))
+                    with self._condition:
+                        self._results.update(results)
+                        self._last_hash = state_hash
+            except Exception as e:
+                debug_write("Speculative precomputation failed: {}".format(e))
+            finally:
+                with self._condition:
+                    self._busy = False
+                    self._condition.notify_all()
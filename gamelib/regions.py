@@ -0,0 +1,282 @@
+ARENA_SIZE = 28
+
+
+def _index(x, y):
+    if 0 <= x < ARENA_SIZE and 0 <= y < ARENA_SIZE:
+        return y * ARENA_SIZE + x
+    return None
+
+
+class Region:
+    """A set of board locations, stored as a bitmask over the 28x28 grid.
+
+    Regions are immutable, so they can be built once and shared. Combine them with | (union),
+    & (intersection), - (difference) and ^ (symmetric difference). Membership tests are O(1)
+    and iterating a region goes row by row, bottom row first and left to right inside a row.
+
+    Attributes :
+        * name (str): The name of the region, None if it has none
+        * mask (int): Bit y * 28 + x is set if [x, y] is in the region
+
+    """
+    def __init__(self, mask=0, name=None):
+        self.mask = mask
+        self.name = name
+        self._flags = None
+        self._locations = None
+
+    @classmethod
+    def from_locations(cls, locations, name=None):
+        """Creates a region from a list of locations
+
+        Args:
+            locations: A list of [x, y] locations, locations outside the grid are ignored
+            name: The name of the region
+
+        Returns:
+            A new Region
+
+        """
+        mask = 0
+        for location in locations:
+            index = _index(location[0], location[1])
+            if index is not None:
+                mask |= 1 << index
+        return cls(mask, name)
+
+    @classmethod
+    def from_rows(cls, rows, name=None):
+        """Creates a region from horizontal runs of locations
+
+        Args:
+            rows: A dict mapping a row y to the range of x in it, as a (first x, last x + 1) tuple like range takes
+            name: The name of the region
+
+        Returns:
+            A new Region
+
+        """
+        mask = 0
+        for y, (start, end) in rows.items():
+            for x in range(start, end):
+                index = _index(x, y)
+                if index is not None:
+                    mask |= 1 << index
+        return cls(mask, name)
+
+    def _get_flags(self):
+        if self._flags is None:
+            flags = bytearray(ARENA_SIZE * ARENA_SIZE)
+            for x, y in self.locations():
+                flags[y * ARENA_SIZE + x] = 1
+            self._flags = flags
+        return self._flags
+
+    def locations(self):
+        """Gets the locations in the region
+
+        Returns:
+            A new list of [x, y] locations, row by row
+
+        """
+        if self._locations is None:
+            locations = []
+            mask = self.mask
+            while mask:
+                low_bit = mask & -mask
+                index = low_bit.bit_length() - 1
+                locations.append((index % ARENA_SIZE, index // ARENA_SIZE))
+                mask ^= low_bit
+            self._locations = locations
+        return [[x, y] for x, y in self._locations]
+
+    def __contains__(self, location):
+        index = _index(location[0], location[1])
+        return index is not None and self._get_flags()[index] == 1
+
+    def __iter__(self):
+        return iter(self.locations())
+
+    def __len__(self):
+        return bin(self.mask).count("1")
+
+    def __bool__(self):
+        return self.mask != 0
+
+    def __eq__(self, other):
+        return isinstance(other, Region) and self.mask == other.mask
+
+    def __hash__(self):
+        return hash(self.mask)
+
+    def __or__(self, other):
+        return Region(self.mask | other.mask)
+
+    def __and__(self, other):
+        return Region(self.mask & other.mask)
+
+    def __sub__(self, other):
+        return Region(self.mask & ~other.mask)
+
+    def __xor__(self, other):
+        return Region(self.mask ^ other.mask)
+
+    def __repr__(self):
+        return "Region({}, {} locations)".format(self.name, len(self))
+
+    def mirrored(self, name=None):
+        """Gets the region mirrored left to right, [x, y] becomes [27 - x, y]
+        """
+        return Region.from_locations([[ARENA_SIZE - 1 - x, y] for x, y in self.locations()], name)
+
+    def flipped(self, name=None):
+        """Gets the region flipped top to bottom, [x, y] becomes [x, 27 - y]
+        """
+        return Region.from_locations([[x, ARENA_SIZE - 1 - y] for x, y in self.locations()], name)
+
+    def intersect_path(self, path):
+        """Gets the locations of a path that are in the region
+
+        Args:
+            path: A list of [x, y] locations, as returned by find_path_to_edge
+
+        Returns:
+            The locations of the path inside the region, in path order. O(len(path))
+
+        """
+        flags = self._get_flags()
+        result = []
+        for location in path:
+            index = _index(location[0], location[1])
+            if index is not None and flags[index]:
+                result.append(location)
+        return result
+
+    def count_in_region(self, locations):
+        """Counts how many of the given locations are in the region
+
+        Args:
+            locations: A list of [x, y] locations
+
+        Returns:
+            The number of locations inside the region, duplicates are counted every time. O(len(locations))
+
+        """
+        flags = self._get_flags()
+        count = 0
+        for location in locations:
+            index = _index(location[0], location[1])
+            if index is not None and flags[index]:
+                count += 1
+        return count
+
+
+def intersect_path(path, region):
+    """Gets the locations of a path that are in a region, see Region.intersect_path
+    """
+    return region.intersect_path(path)
+
+
+def count_in_region(locations, region):
+    """Counts how many of the given locations are in a region, see Region.count_in_region
+    """
+    return region.count_in_region(locations)
+
+
+def _arena_rows(y_start, y_end):
+    rows = {}
+    for y in range(y_start, y_end):
+        row_size = y + 1 if y < ARENA_SIZE // 2 else ARENA_SIZE - y
+        rows[y] = (ARENA_SIZE // 2 - row_size, ARENA_SIZE // 2 + row_size)
+    return rows
+
+
+ARENA = Region.from_rows(_arena_rows(0, ARENA_SIZE), "arena")
+"""Every location inside the diamond shaped board"""
+BOTTOM_HALF = Region.from_rows(_arena_rows(0, ARENA_SIZE // 2), "bottom_half")
+"""Your side of the board"""
+TOP_HALF = Region((ARENA - BOTTOM_HALF).mask, "top_half")
+"""Your opponent's side of the board"""
+LEFT_HALF = Region((ARENA & Region.from_rows({y: (0, ARENA_SIZE // 2) for y in range(ARENA_SIZE)})).mask, "left_half")
+"""The left half of the board, x < 14"""
+RIGHT_HALF = Region((ARENA - LEFT_HALF).mask, "right_half")
+"""The right half of the board, x >= 14"""
+
+NEIGHBORS = [()] * (ARENA_SIZE * ARENA_SIZE)
+"""The indices of the arena locations next to each arena location, y * 28 + x"""
+for _x, _y in ARENA.locations():
+    NEIGHBORS[_y * ARENA_SIZE + _x] = tuple(
+        _y2 * ARENA_SIZE + _x2 for _x2, _y2 in ((_x, _y + 1), (_x, _y - 1), (_x + 1, _y), (_x - 1, _y))
+        if [_x2, _y2] in ARENA)
+
+
+def edge_locations(player_index):
+    """Gets the edges a player can spawn mobile units on
+
+    Args:
+        player_index: 0 for you, 1 for your opponent
+
+    Returns:
+        A list of (x, y) tuples, the left edge first, each edge starting from the middle of the board
+
+    """
+    half_arena = ARENA_SIZE // 2
+    locations = []
+    for num in range(0, half_arena):
+        y = num if player_index == 0 else ARENA_SIZE - 1 - num
+        locations.append((half_arena - 1 - num, y))
+    for num in range(0, half_arena):
+        y = num if player_index == 0 else ARENA_SIZE - 1 - num
+        locations.append((half_arena + num, y))
+    return locations
+
+_regions = {}
+
+
+def register_region(name, region):
+    """Registers a region under a name, replacing any region registered with the same name
+
+    Args:
+        name: The name to look the region up with
+        region: A Region, or a list of [x, y] locations
+
+    Returns:
+        The registered Region
+
+    """
+    if not isinstance(region, Region):
+        region = Region.from_locations(region, name)
+    elif region.name != name:
+        region = Region(region.mask, name)
+    _regions[name] = region
+    return region
+
+
+def get_region(name):
+    """Gets a registered region
+
+    Args:
+        name: The name the region was registered with
+
+    Returns:
+        The Region, or None if no region has that name
+
+    """
+    return _regions.get(name)
+
+
+def unregister_region(name):
+    """Removes a registered region
+
+    Args:
+        name: The name the region was registered with
+
+    Returns:
+        The removed Region, or None if no region has that name
+
+    """
+    return _regions.pop(name, None)
+
+
+for _region in (ARENA, BOTTOM_HALF, TOP_HALF, LEFT_HALF, RIGHT_HALF):
+    register_region(_region.name, _region)
@@ -0,0 +1,158 @@
+from .regions import ARENA
+
+FACTORY_INDEX = 1
+"""Config index of the factory type"""
+
+
+class ResourceForecaster:
+    """Projects the MP and SP of both players a number of turns ahead, including factory income.
+
+    The income schedule of the config is turned into tables once: the MP every turn starts with,
+    and prefix sums of that income scaled by the MP decay, so the MP after any number of turns is
+    a closed form lookup instead of a turn by turn loop. Factory income is read from the structure
+    totals GameMap keeps up to date (see GameMap.region_totals), so counting factories does not scan the board.
+
+    Like GameState.project_future_MP, the result is rounded to one decimal. SP does not decay, so the SP
+    projection is the current SP plus the income of each turn. Points gained by damaging the opponent
+    are not projected.
+
+    Attributes :
+        * config (JSON): Contains information about the game
+        * factory_income (tuple): The (SP, MP) a factory gives each turn, read from the config unless given
+        * upgraded_factory_income (tuple): The (SP, MP) an upgraded factory gives each turn
+        * max_turns (int): Turns the tables cover, they are extended when a later turn is asked for
+
+    """
+    def __init__(self, config, factory_income=None, upgraded_factory_income=None, max_turns=128):
+        self.config = config
+        resources = config["resources"]
+        self._mp_keep = 1 - resources["bitDecayPerRound"]
+        self._mp_per_round = resources["bitsPerRound"]
+        self._mp_growth = resources["bitGrowthRate"]
+        self._mp_interval = resources["turnIntervalForBitSchedule"]
+        self._sp_per_round = resources["coresPerRound"]
+
+        factory = config["unitInformation"][FACTORY_INDEX]
+        upgraded = dict(factory)
+        upgraded.update(factory.get("upgrade", {}))
+        self.factory_shorthand = factory.get("shorthand")
+        if factory_income is None:
+            factory_income = (factory.get("generatesResource1", 0), factory.get("generatesResource2", 0))
+        if upgraded_factory_income is None:
+            upgraded_factory_income = (upgraded.get("generatesResource1", 0), upgraded.get("generatesResource2", 0))
+        self.factory_income = tuple(factory_income)
+        self.upgraded_factory_income = tuple(upgraded_factory_income)
+
+        self.max_turns = 0
+        self._keep_powers = [1.0]
+        self._geometric = [0.0]
+        self._scaled_income = [0.0]
+        self._extend(max_turns)
+
+    def _extend(self, max_turns):
+        """Extends the tables to cover turns up to max_turns
+        """
+        keep = self._mp_keep
+        for turn in range(self.max_turns + 1, max_turns + 1):
+            self._keep_powers.append(self._keep_powers[-1] * keep)
+            self._geometric.append(self._geometric[-1] * keep + 1)
+            # Income of a turn divided by keep ** turn, so a range of turns is a difference of prefix sums
+            income = self._mp_per_round + self._mp_growth * (turn // self._mp_interval)
+            scaled = income / self._keep_powers[turn] if self._keep_powers[turn] else 0.0
+            self._scaled_income.append(self._scaled_income[-1] + scaled)
+        self.max_turns = max(self.max_turns, max_turns)
+
+    def mp_income(self, turn_number):
+        """Gets the MP a player receives at the start of a turn, without factories
+        """
+        return self._mp_per_round + self._mp_growth * (turn_number // self._mp_interval)
+
+    def factories(self, game_map, player_index):
+        """Counts the factories of a player
+
+        Returns:
+            A (factories, upgraded factories) tuple, upgraded factories are counted in both
+
+        """
+        totals = game_map.region_totals(ARENA, player_index, self.factory_shorthand)
+        return totals[1], totals[3]
+
+    def factory_income_of(self, game_map, player_index):
+        """Gets the SP and MP the factories of a player give each turn
+
+        Returns:
+            An (SP, MP) tuple
+
+        """
+        count, upgraded = self.factories(game_map, player_index)
+        plain = count - upgraded
+        return (plain * self.factory_income[0] + upgraded * self.upgraded_factory_income[0],
+                plain * self.factory_income[1] + upgraded * self.upgraded_factory_income[1])
+
+    def _mp(self, mp, turn_number, turns, factory_mp):
+        if turn_number + turns > self.max_turns:
+            self._extend(max(2 * self.max_turns, turn_number + turns))
+        keep_power = self._keep_powers[turns]
+        if self._mp_keep == 0:
+            return self.mp_income(turn_number + turns) + factory_mp
+        income = (self._scaled_income[turn_number + turns] - self._scaled_income[turn_number]) * self._keep_powers[turn_number + turns]
+        return mp * keep_power + income + factory_mp * self._geometric[turns]
+
+    def mp(self, game_state, turns=1, player_index=0, factories=True, current_MP=None):
+        """Projects the MP a player will have after a number of turns
+
+        Args:
+            game_state: The GameState of the current turn
+            turns: The number of turns to look ahead, at least 1
+            player_index: The index corresponding to the player, 0 for you 1 for the enemy
+            factories: If factory income is included
+            current_MP: The MP to start from instead of the MP the player has now
+
+        Returns:
+            The projected MP, rounded to one decimal
+
+        """
+        mp = game_state.get_resource(game_state.MP, player_index) if current_MP is None else current_MP
+        factory_mp = self.factory_income_of(game_state.game_map, player_index)[1] if factories else 0
+        return round(self._mp(mp, game_state.turn_number, turns, factory_mp), 1)
+
+    def mp_horizons(self, game_state, horizon, player_index=0, factories=True):
+        """Projects the MP of a player for every number of turns from 1 to horizon at once
+
+        Returns:
+            A list where item i is the projected MP after i + 1 turns
+
+        """
+        mp = game_state.get_resource(game_state.MP, player_index)
+        factory_mp = self.factory_income_of(game_state.game_map, player_index)[1] if factories else 0
+        turn_number = game_state.turn_number
+        return [round(self._mp(mp, turn_number, turns, factory_mp), 1) for turns in range(1, horizon + 1)]
+
+    def sp(self, game_state, turns=1, player_index=0, factories=True):
+        """Projects the SP a player will have after a number of turns, if nothing is built
+
+        Args:
+            game_state: The GameState of the current turn
+            turns: The number of turns to look ahead
+            player_index: The index corresponding to the player, 0 for you 1 for the enemy
+            factories: If factory income is included
+
+        Returns:
+            The projected SP
+
+        """
+        sp = game_state.get_resource(game_state.SP, player_index)
+        factory_sp = self.factory_income_of(game_state.game_map, player_index)[0] if factories else 0
+        return sp + turns * (self._sp_per_round + factory_sp)
+
+    def sp_horizons(self, game_state, horizon, player_index=0, factories=True):
+        """Projects the SP of a player for every number of turns from 1 to horizon at once
+
+        Returns:
+            A list where item i is the projected SP after i + 1 turns
+
+        """
+        sp = game_state.get_resource(game_state.SP, player_index)
+        factory_sp = self.factory_income_of(game_state.game_map, player_index)[0] if factories else 0
+        per_turn = self._sp_per_round + factory_sp
+        return [sp + turns * per_turn for turns in range(1, horizon + 1)]
@@ -0,0 +1,162 @@
+from .regions import edge_locations
+
+MOBILE_UNIT_INDICES = (3, 4, 5)
+"""Config indices of the mobile unit types, scouts, demolishers and interceptors"""
+
+
+class SpawnTracker:
+    """Tracks where a player spawns mobile units, using the spawn events of action frames.
+
+    The spawn locations of the last few turns are kept as they were observed, and a heatmap
+    over every edge tile and mobile unit type is kept for the whole game. Each turn the heatmap
+    is multiplied by decay before the new spawns are added, so recent turns weigh more.
+    The spawns of a turn are folded into the heatmap when a frame of a later turn is recorded, or when
+    update() is called once the action phase is over, for example at the start of on_turn.
+    Queries read the last fold, so asking during the action phase does not fold a turn that is still running.
+
+    Attributes :
+        * player_index (int): The tracked player, 0 for you 1 for your opponent
+        * decay (float): The factor the heatmap is multiplied by every turn
+        * history (int): The number of turns whose spawn locations are kept
+
+    """
+    def __init__(self, player_index=1, decay=0.8, history=3):
+        self.player_index = player_index
+        self.decay = decay
+        self.history = history
+        self.edge_locations = edge_locations(player_index)
+        self._edge_index = {location: i for i, location in enumerate(self.edge_locations)}
+        self._heat = [0.0] * (len(self.edge_locations) * len(MOBILE_UNIT_INDICES))
+        self._tile_heat = [0.0] * len(self.edge_locations)
+        self._turn_spawns = [None] * history
+        self._turns = [None] * history
+        self._current_turn = None
+        self._current = {}
+        self._folded_turn = None
+        self._unfolded = False
+
+    def record(self, state):
+        """Adds the spawn events of a parsed action frame
+
+        Args:
+            state: The action frame, as returned by json.loads
+
+        """
+        turn_number = int(state["turnInfo"][1])
+        if turn_number != self._current_turn:
+            self.update()
+            self._current_turn = turn_number
+        self._unfolded = True
+
+        engine_player = self.player_index + 1
+        for spawn in state["events"].get("spawn", ()):
+            unit_index = int(spawn[1])
+            if int(spawn[3]) != engine_player or unit_index not in MOBILE_UNIT_INDICES:
+                continue
+            location = (int(spawn[0][0]), int(spawn[0][1]))
+            counts = self._current.get(location)
+            if counts is None:
+                counts = [0] * len(MOBILE_UNIT_INDICES)
+                self._current[location] = counts
+            counts[unit_index - MOBILE_UNIT_INDICES[0]] += 1
+
+    def update(self):
+        """Folds the spawns recorded since the last fold into the heatmap.
+        Call it once the action phase is over, queries do not fold a turn that may still be running.
+        Does nothing if nothing was recorded since the last fold.
+        """
+        if not self._unfolded:
+            return
+        turn_number = self._current_turn
+        heat = self._heat
+        tile_heat = self._tile_heat
+        slot = turn_number % self.history
+        if turn_number != self._folded_turn:
+            turns_passed = 1 if self._folded_turn is None else turn_number - self._folded_turn
+            factor = self.decay ** turns_passed
+            for i in range(len(heat)):
+                heat[i] *= factor
+            for i in range(len(tile_heat)):
+                tile_heat[i] *= factor
+            self._turns[slot] = turn_number
+            self._turn_spawns[slot] = []
+
+        spawns = self._turn_spawns[slot]
+        types = len(MOBILE_UNIT_INDICES)
+        for location, counts in self._current.items():
+            index = self._edge_index.get(location)
+            if index is None:
+                continue
+            for type_offset, count in enumerate(counts):
+                heat[index * types + type_offset] += count
+            tile_heat[index] += sum(counts)
+        for x, y in self._current:
+            if [x, y] not in spawns:
+                spawns.append([x, y])
+        self._current = {}
+        self._unfolded = False
+        self._folded_turn = turn_number
+
+    def spawns(self, turn_number):
+        """Gets the locations the player spawned mobile units at during a turn
+
+        Args:
+            turn_number: The turn of the action phase
+
+        Returns:
+            A list of unique [x, y] locations in the order they were first seen. Empty if the turn is not kept
+
+        """
+        slot = turn_number % self.history
+        if turn_number < 0 or self._turns[slot] != turn_number:
+            return []
+        return list(self._turn_spawns[slot])
+
+    def heat(self, location, unit_index=None):
+        """Gets the decayed number of units spawned at a location
+
+        Args:
+            location: An edge location of the tracked player
+            unit_index: The config index of a mobile unit type, or None for all mobile units
+
+        Returns:
+            The heat of the location, 0 for locations that are not on the player's edges or unit indices that are not mobile units
+
+        """
+        index = self._edge_index.get((location[0], location[1]))
+        if index is None or (unit_index is not None and unit_index not in MOBILE_UNIT_INDICES):
+            return 0
+        if unit_index is None:
+            return self._tile_heat[index]
+        return self._heat[index * len(MOBILE_UNIT_INDICES) + unit_index - MOBILE_UNIT_INDICES[0]]
+
+    def heatmap(self, unit_index=None):
+        """Gets the heat of every edge location that was spawned on
+
+        Args:
+            unit_index: The config index of a mobile unit type, or None for all mobile units
+
+        Returns:
+            A dict mapping (x, y) tuples to their heat
+
+        """
+        heatmap = {}
+        for location in self.edge_locations:
+            value = self.heat(location, unit_index)
+            if value > 0:
+                heatmap[location] = value
+        return heatmap
+
+    def hottest(self, count=1, unit_index=None):
+        """Gets the locations with the highest heat
+
+        Args:
+            count: The number of locations to return
+            unit_index: The config index of a mobile unit type, or None for all mobile units
+
+        Returns:
+            A list of at most count [x, y] locations, hottest first
+
+        """
+        ranked = sorted(self.heatmap(unit_index).items(), key=lambda item: -item[1])
+        return [[x, y] for (x, y), _ in ranked[:count]]
@@ -1,11 +1,31 @@
 import unittest
 import json
+from unittest import mock
+from .algocore import AlgoCore, FRAMES_FIRST, FRAMES_EVENTS
 from .game_state import GameState
 from .unit import GameUnit
+from .precompute import SpeculativePrecomputer
+from .frame_history import FrameHistory
+from .event_index import EventIndex
+from .spawn_tracker import SpawnTracker
+from .opponent_model import OpponentModel
+from .action_phase_tracker import ActionPhaseTracker
+from .damage_timeline import DamageTimeline
+from .turn_cache import TurnCache
+from .resource_forecaster import ResourceForecaster
+from .turret_stats import TurretStats
+from .transposition import TranspositionTable
+from .unit_registry import UnitRegistry
+from .regions import Region, register_region, get_region, unregister_region, edge_locations, NEIGHBORS
+from .layout import Layout, BUILD, BUILD_OR_UPGRADE, UPGRADE
+from .build_planner import BuildPlanner
+from .chokepoints import ChokepointAnalyzer
+from .placement import PlacementScorer
+from .navigation import PathCache
 
 class BasicTests(unittest.TestCase):
 
-    def make_turn_0_map(self):
+    def make_config(self):
         config = """
             {
             "seasonCompatibilityModeP1": 5,
@@ -186,9 +206,12 @@ class BasicTests(unittest.TestCase):
             }
         }
         """
+        return json.loads(config)
+
+    def make_turn_0_map(self):
         turn_0 = """{"p2Units":[[],[],[],[],[],[],[]],"turnInfo":[0,0,-1],"p1Stats":[30.0,25.0,5.0,0],"p1Units":[[],[],[],[],[],[],[]],"p2Stats":[30.0,25.0,5.0,0],"events":{"selfDestruct":[],"breach":[],"damage":[],"shield":[],"move":[],"spawn":[],"death":[],"attack":[],"melee":[]}}"""
         
-        state = GameState(json.loads(config), turn_0)
+        state = GameState(self.make_config(), turn_0)
         state.suppress_warnings(True)
         return state
 
@@ -275,3 +298,604 @@ class BasicTests(unittest.TestCase):
         actual = game.project_future_MP(turns)
         self.assertAlmostEqual(actual, expected, 0, "Expected {} MP {} turns from now, got {}".format(expected, turns, actual))
 
+
+    def test_resource_forecaster(self):
+        game = self.make_turn_0_map()
+        forecaster = ResourceForecaster(self.make_config(), max_turns=4)
+        for turns in (1, 2, 9, 30):
+            self.assertAlmostEqual(game.project_future_MP(turns), forecaster.mp(game, turns), delta=0.1)
+        self.assertEqual([forecaster.mp(game, turns, 1) for turns in range(1, 6)], forecaster.mp_horizons(game, 5, 1))
+        self.assertEqual(forecaster.mp(game, 3, current_MP=10.0), forecaster.mp(game, 3, current_MP=10.0, factories=False))
+
+        game.game_map.add_unit("EF", [13,3], 0)
+        game.game_map.add_unit("EF", [14,3], 0)
+        game.game_map.upgrade_unit([14,3])
+        self.assertEqual((2, 1), forecaster.factories(game.game_map, 0))
+        self.assertEqual((2, 1), forecaster.factory_income_of(game.game_map, 0), "Both factories give SP, the upgraded one also gives MP")
+        self.assertEqual(round(forecaster.mp(game, 2, factories=False) + 1 + 0.75, 1), forecaster.mp(game, 2))
+        self.assertEqual([25.0 + 7, 25.0 + 14], forecaster.sp_horizons(game, 2))
+        self.assertEqual(25.0 + 5, forecaster.sp(game, 1, 1))
+
+    def test_speculative_precompute(self):
+        game = self.make_turn_0_map()
+        calls = []
+        def count_structures(state):
+            calls.append(state.turn_number)
+            return sum(1 for location in state.game_map if state.contains_stationary_unit(location))
+
+        precomputer = SpeculativePrecomputer()
+        precomputer.config = game.config
+        precomputer.register("structures", count_structures)
+        frame = """{"p2Units":[[],[],[[13,20,90.0,"3"]],[],[],[],[],[]],"turnInfo":[1,0,5],"p1Stats":[30.0,25.0,5.0,0],"p1Units":[[[13,6,75.0,"1"],[14,6,75.0,"2"]],[],[],[[13,2,15.0,"4"]],[],[],[[14,6,0,"2"]],[]],"p2Stats":[30.0,25.0,5.0,0],"events":{"selfDestruct":[],"breach":[],"damage":[],"shield":[],"move":[],"spawn":[],"death":[],"attack":[],"melee":[]}}"""
+        precomputer.submit(frame)
+        precomputer.wait_idle()
+        precomputer.stop()
+        self.assertEqual([1], calls, "The analysis should have run once on the speculative board")
+
+        game.game_map.add_unit("FF", [13,6], 0)
+        game.game_map.add_unit("DF", [13,20], 1)
+        self.assertEqual(2, precomputer.get("structures", game), "Pending removals should not be on the speculative board")
+        self.assertEqual(1, precomputer.hits, "A matching board should reuse the precomputed result")
+        game.game_map.add_unit("FF", [14,6], 0)
+        self.assertIsNone(precomputer.get("structures", game, compute=False), "Nothing was precomputed for this board")
+        self.assertEqual(3, precomputer.get("structures", game), "A different board should be recomputed")
+        self.assertEqual(2, precomputer.misses)
+
+    def make_frame(self, turn, frame, events=None, p1units=None, p2units=None):
+        all_events = {"selfDestruct":[],"breach":[],"damage":[],"shield":[],"move":[],"spawn":[],"death":[],"attack":[],"melee":[]}
+        all_events.update(events or {})
+        empty_units = [[],[],[],[],[],[],[],[]]
+        return {"turnInfo": [1, turn, frame], "p1Units": p1units or empty_units, "p2Units": p2units or empty_units,
+                "p1Stats": [30.0, 25.0, 5.0, 0], "p2Stats": [30.0, 25.0, 5.0, 0], "events": all_events}
+
+    def test_frame_history(self):
+        history = FrameHistory(window=2)
+        scouts = [[],[],[],[[5,18,15.0,"7"],[6,17,15.0,"8"]],[],[],[],[]]
+        history.record(self.make_frame(0, 0, {"spawn": [[[5,18],3,"7",2]]}, p2units=scouts))
+        history.record(self.make_frame(0, 1, {"breach": [[[3,10],1.0,3,"9",2]]}))
+        history.record(self.make_frame(0, 2, {"breach": [[[24,10],1.0,3,"10",1],[[3,10],2.0,4,"11",2]]}))
+        self.assertEqual([[5,18],[6,17]], history.first_frame_units(0, 1, 3), "First frame scouts were not kept")
+        self.assertEqual([], history.first_frame_units(0, 0, 3), "Player 1 should have no scouts")
+        self.assertEqual(3, history.count(0, "breach"), "Breaches of every frame should be kept")
+        self.assertEqual([(1, [3,10], 1, 3, 1.0), (2, [3,10], 1, 4, 2.0)], history.events(0, "breach", 1))
+        self.assertEqual([[24,10]], history.locations(0, "breach", 0))
+        self.assertEqual([(0, [5,18], 1, 3, 0.0)], history.events(0, "spawn"))
+        self.assertEqual([], history.events(0, "death"))
+
+        history.record(self.make_frame(1, 0))
+        self.assertTrue(history.has_turn(0), "The window holds two turns")
+        history.record(self.make_frame(2, 0))
+        self.assertFalse(history.has_turn(0), "Turns outside the window should be dropped")
+        self.assertEqual([], history.events(0, "breach"))
+        self.assertEqual(0, history.count(0, "breach"))
+        self.assertEqual([], history.first_frame_units(0, 1, 3))
+        self.assertTrue(history.has_turn(2))
+        self.assertEqual(0, history.count(2, "breach"))
+
+    def test_event_index(self):
+        index = EventIndex(window=3)
+        index.record(self.make_frame(4, 0, {"spawn": [[[13,0],3,"1",1],[[14,27],3,"2",2]]}))
+        index.record(self.make_frame(4, 7, {"breach": [[[3,10],1.0,3,"2",2],[[3,10],1.0,3,"3",2]], "damage": [[[13,5],4.5,0,"4",1]]}))
+        index.record(self.make_frame(4, 9, {"selfDestruct": [[[20,20],[[20,21]],15.0,3,"1",1]]}))
+        self.assertEqual(2, index.count(4, "breach", 1, [3,10]), "Both breaches at [3,10] should be counted")
+        self.assertEqual(0, index.count(4, "breach", 0), "We did not breach")
+        self.assertEqual(4.5, index.total(4, "damage", 0))
+        self.assertEqual([[3,10]], index.intersection(4, "breach", 1, [[0,13],[3,10]]))
+        self.assertTrue(index.any_at(4, "selfDestruct", 0, [[20,20]]), "Self destructs should be owned by player index 5")
+        self.assertEqual({(14,27): 1}, index.locations(4, "spawn", 1))
+        self.assertEqual(0, index.count(3, "breach", 1), "Unknown turns should be empty")
+
+    def test_frame_subscription(self):
+        received = []
+        class FrameRecorder(AlgoCore):
+            def on_action_frame(self, turn_string):
+                received.append(json.loads(turn_string)["turnInfo"][2])
+
+        messages = [json.dumps(self.make_config()),
+                    json.dumps(self.make_frame(1, 0)),
+                    json.dumps(self.make_frame(1, 1, {"move": [[[13,1],[13,2],[0,0],3,"1",1]]})),
+                    json.dumps(self.make_frame(1, 2, {"breach": [[[3,10],1.0,3,"2",2]]})),
+                    json.dumps(self.make_frame(1, 3)).replace('"breach":[]', '"breach": [ ]'),
+                    json.dumps({"turnInfo": [2, 1, -1]})]
+        algo = FrameRecorder()
+        algo.subscribe_frames(FRAMES_FIRST | FRAMES_EVENTS, ["breach"])
+        with mock.patch("gamelib.algocore.get_command", side_effect=messages), mock.patch("gamelib.algocore.debug_write"):
+            algo.start()
+        self.assertEqual([0, 2], received, "Only the first frame and the frame with a breach should be passed on")
+
+    def test_spawn_tracker(self):
+        tracker = SpawnTracker(player_index=1, decay=0.5, history=2)
+        tracker.record(self.make_frame(0, 0, {"spawn": [[[5,19],3,"1",2],[[5,19],3,"2",2],[[22,19],5,"3",2],[[13,0],3,"4",1],[[13,20],2,"5",2]]}))
+        tracker.record(self.make_frame(1, 0, {"spawn": [[[5,19],4,"6",2]]}))
+        self.assertEqual([], tracker.spawns(1), "A turn should not be folded while it may still be running")
+        tracker.update()
+        self.assertEqual([[5,19],[22,19]], tracker.spawns(0), "Our units and structures should not be tracked")
+        self.assertEqual([[5,19]], tracker.spawns(1))
+        self.assertEqual(2.0, tracker.heat([5,19]), "Two scouts decayed once plus one demolisher")
+        self.assertEqual(1.0, tracker.heat([5,19], 3))
+        self.assertEqual(1.0, tracker.heat([5,19], 4))
+        self.assertEqual(0, tracker.heat([13,0]), "Locations that are not on the tracked edges have no heat")
+        self.assertEqual(0, tracker.heat([5,19], 2), "Structure indices should not read the heat of another location")
+        self.assertEqual(0, tracker.heat([5,19], 6))
+        self.assertEqual({}, tracker.heatmap(0))
+        self.assertEqual([[5,19]], tracker.hottest())
+
+        tracker.record(self.make_frame(3, 0))
+        self.assertEqual(1.0, tracker.heat([5,19], 4), "Queries should read the last fold")
+        tracker.record(self.make_frame(3, 4, {"spawn": [[[22,19],5,"7",2]]}))
+        tracker.record(self.make_frame(4, 0))
+        self.assertEqual([], tracker.spawns(1), "Turns outside the history should be dropped")
+        self.assertEqual(0.25, tracker.heat([5,19], 4), "Skipped turns should still decay the heatmap")
+        self.assertEqual([[22,19]], tracker.spawns(3), "Frames recorded after a query should still be folded")
+        self.assertEqual(1.125, tracker.heat([22,19]))
+
+    def test_action_phase_tracker(self):
+        tracker = ActionPhaseTracker(self.make_config())
+        p1units = [[[13,6,75.0,"1"]],[],[[13,7,150.0,"2"]],[],[],[],[],[[13,7,150.0,"2"]]]
+        p2units = [[],[],[],[[5,18,15.0,"3"],[5,18,15.0,"4"]],[],[],[],[]]
+        tracker.record(self.make_frame(1, 0, p1units=p1units, p2units=p2units))
+        self.assertEqual([5,18], tracker.stack_location(1))
+        self.assertEqual((2, 0, 150.0), tracker.structure_at([13,7]))
+        self.assertEqual([], tracker.damaged_structures(0), "An upgraded turret at full health is not damaged")
+
+        tracker.record(self.make_frame(1, 1, {"move": [[[5,18],[6,17],[0,0],3,"3",2],[[5,18],[6,17],[0,0],3,"4",2]],
+            "spawn": [[[7,20],3,"5",2]], "damage": [[[13,6],30.0,0,"1",1]]}))
+        self.assertEqual([6,17], tracker.stack_location(1))
+        self.assertEqual(3, tracker.mobile_count(1))
+        self.assertEqual([[13,6]], tracker.structures_below(0, 50))
+        self.assertEqual([], tracker.structures_below(0, 10))
+        self.assertEqual(2, len(tracker.structures_below(0, 200)), "Thresholds above full health should include undamaged structures")
+
+        tracker.record(self.make_frame(1, 2, {"death": [[[13,6],0,"1",1,False],[[6,17],3,"3",2,False]],
+            "breach": [[[6,17],1.0,3,"4",2]]}))
+        self.assertIsNone(tracker.structure_at([13,6]))
+        self.assertEqual([7,20], tracker.stack_location(1))
+        self.assertEqual((2, 1), (tracker.deltas, tracker.seeds))
+
+        tracker.record(self.make_frame(1, 5, p1units=p1units))
+        self.assertEqual(2, tracker.seeds, "A missing frame should seed the board again")
+        self.assertEqual((0, 0, 75.0), tracker.structure_at([13,6]))
+        self.assertIsNone(tracker.stack_location(1))
+
+    def test_damage_timeline(self):
+        timeline = DamageTimeline(window=2)
+        timeline.record(self.make_frame(1, 3, {"damage": [[[13,6],40.0,0,"1",1],[[5,18],5.0,3,"9",2]]}))
+        timeline.record(self.make_frame(1, 4, {"damage": [[[13,6],40.0,0,"1",1],[[10,12],10.0,2,"2",1]],
+            "death": [[[13,6],0,"1",1,False],[[11,12],0,"3",1,True]]}))
+        wall, turret = timeline.summary(1, 0)
+        self.assertEqual(("1", 80.0, 3, 4), (wall.unit_id, wall.damage, wall.first_hit, wall.destroyed))
+        self.assertEqual((10.0, 4, None), (turret.damage, turret.first_hit, turret.destroyed))
+        self.assertEqual(2, len(timeline.summary(1)), "Mobile units and removed structures should not be accounted")
+
+        game = self.make_turn_0_map()
+        game.game_map.add_unit("FF", [13,6], 0)
+        game.game_map.add_unit("DF", [10,12], 0)
+        game.game_map.add_unit("FF", [3,12], 0)
+        game.game_map.set_unit_health([10,12], 8)
+        self.assertEqual([[13,6],[10,12]], timeline.predict_destroyed(game.game_map, 1))
+        self.assertEqual([[13,6],[10,12],[3,12]], timeline.prioritize([[3,12],[13,6],[10,12]], game.game_map, 1))
+        self.assertEqual([], timeline.predict_destroyed(game.game_map, 0))
+
+    def test_turret_stats(self):
+        stats = TurretStats()
+        stats.record(self.make_frame(1, 1, {"attack": [[[10,15],[9,13],6.0,2,"1",3,2],[[14,16],[14,13],6.0,2,"2",4,2],[[5,12],[5,15],2.0,3,"3",7,1]]}))
+        stats.record(self.make_frame(1, 2, {"attack": [[[14,16],[14,13],6.0,2,"2",4,2],[[8,12],[9,14],6.0,2,"4",5,1]]}))
+        self.assertEqual([], stats.most_dangerous(), "A turn should not be folded while it may still be running")
+        stats.update()
+        self.assertEqual([[14,16],[10,15]], stats.most_dangerous(), "Scouts should not be counted")
+        self.assertEqual([[8,12]], stats.most_useful())
+        self.assertEqual(12.0, stats.damage_dealt([14,16], 1))
+
+        stats.record(self.make_frame(2, 1, {"attack": [[[10,15],[9,13],8.0,2,"1",3,2]]}))
+        self.assertEqual(6.0, stats.damage_dealt([10,15], 1), "Queries should read the last fold")
+        stats.record(self.make_frame(2, 2, {"death": [[[14,16],2,"2",2,False]]}))
+        stats.record(self.make_frame(3, 1))
+        self.assertEqual([[10,15]], stats.most_dangerous(1), "Destroyed turrets should leave the ranking")
+        self.assertEqual((14.0, 8.0), (stats.damage_dealt([10,15], 1), stats.damage_dealt([10,15], 1, last_turn=True)),
+            "Frames recorded after a query should still be folded")
+        self.assertEqual([[8,12],[3,12]], stats.prioritize([[3,12],[8,12]], 0))
+
+    def test_opponent_model(self):
+        model = OpponentModel(player_index=1, decay=0.5)
+        config = self.make_config()
+        def turn(number, mp):
+            state = GameState(config, json.dumps({"p2Units":[[],[],[],[],[],[],[],[]],"turnInfo":[0,number,-1],"p1Stats":[30.0,25.0,5.0,0],
+                "p1Units":[[],[],[],[],[],[],[],[]],"p2Stats":[30.0,25.0,mp,0],"events":{}}))
+            model.observe(state)
+        self.assertEqual(0.5, model.attack_probability(3.0), "Unseen MP should be a coin flip")
+        turn(0, 3.0)
+        turn(1, 12.0)
+        model.record(self.make_frame(1, 0, {"spawn": [[[5,19],3,"1",2],[[5,19],3,"2",2],[[22,19],4,"3",2],[[13,0],3,"4",1]]}))
+        turn(2, 12.0)
+        self.assertEqual(1 / 2.5, model.attack_probability(4.0), "The quiet first turn should have decayed once")
+        self.assertEqual(2 / 3, model.attack_probability(14.0))
+        self.assertEqual([2 / 3, 1 / 3, 0.0], model.unit_mix(), "Our own units should not be counted")
+        self.assertEqual((2 / 3, 1 / 3), model.edge_probability())
+        self.assertEqual([[5,19],[22,19]], model.likely_spawns(2))
+
+        turn(3, 12.0)
+        self.assertEqual(1.5 / 3.5, model.attack_probability(12.0), "Older turns should weigh less")
+
+    def test_turn_cache(self):
+        game = self.make_turn_0_map()
+        cache = TurnCache()
+        count_structures = cache.register("structures", lambda state: sum(1 for location in state.game_map if state.contains_stationary_unit(location)))
+        self.assertEqual(0, count_structures(game))
+        self.assertEqual(0, count_structures(game))
+        self.assertEqual([1, 1], cache.stats["structures"][:2], "The second call should be a hit")
+        game.attempt_spawn("FF", [13,6])
+        self.assertEqual(1, game.mutation_count, "Spawning should count as a mutation")
+        self.assertEqual(1, count_structures(game), "A mutation should invalidate the cached result")
+        game.game_map.remove_unit([13,6])
+        self.assertEqual(0, count_structures(game), "Changing the map directly should invalidate the cached result")
+        self.assertEqual(0, count_structures(self.make_turn_0_map()), "A new game state should not reuse results")
+        self.assertEqual([("structures", 1, 4)], [row[:3] for row in cache.report()])
+
+    def test_blocked_hash(self):
+        game = self.make_turn_0_map()
+        self.assertEqual(0, game.game_map.blocked_hash, "An empty map should have an empty hash")
+        game.game_map.add_unit("FF", [13,6])
+        blocked = game.game_map.blocked_hash
+        self.assertNotEqual(0, blocked)
+        game.game_map.add_unit("DF", [13,6], 1)
+        game.game_map.add_unit("PI", [13,7])
+        self.assertEqual(blocked, game.game_map.blocked_hash, "Replacing a structure or adding mobile units should not change the layout")
+        game.game_map.remove_unit([13,6])
+        self.assertEqual(0, game.game_map.blocked_hash, "Removing the structure should restore the hash")
+
+    def test_zobrist_hash(self):
+        game = self.make_turn_0_map()
+        game_map = game.game_map
+        self.assertEqual(0, game_map.zobrist_hash, "An empty map should have an empty hash")
+        game_map.add_unit("FF", [13,6])
+        wall = game_map.zobrist_hash
+        game_map.add_unit("DF", [13,6])
+        self.assertNotEqual(wall, game_map.zobrist_hash, "The structure type should be hashed")
+        game_map.add_unit("FF", [13,6])
+        self.assertEqual(wall, game_map.zobrist_hash, "Replacing a structure should undo its key")
+        game_map.upgrade_unit([13,6])
+        upgraded = game_map.zobrist_hash
+        self.assertNotEqual(wall, upgraded, "Upgrading should change the hash")
+        game_map.add_unit("PI", [13,7])
+        self.assertEqual(upgraded, game_map.zobrist_hash, "Mobile units should not be hashed")
+
+        game_map.set_unit_health([13,6], 1)
+        self.assertEqual(upgraded, game_map.zobrist_hash, "Health should not be hashed by default")
+        game_map.set_health_bucket(10)
+        damaged = game_map.zobrist_hash
+        self.assertNotEqual(upgraded, damaged, "Health should be hashed once buckets are set")
+        game_map.set_unit_health([13,6], 5)
+        self.assertEqual(damaged, game_map.zobrist_hash, "Health in the same bucket should hash the same")
+        game_map.set_health_bucket(None)
+        self.assertEqual(upgraded, game_map.zobrist_hash)
+
+        game_map.remove_unit([13,6])
+        game_map.remove_unit([13,7])
+        self.assertEqual(0, game_map.zobrist_hash, "Removing every structure should restore the hash")
+
+        other = self.make_turn_0_map()
+        other.attempt_spawn("FF", [13,6])
+        other.attempt_upgrade([13,6])
+        self.assertEqual(upgraded, other.game_map.zobrist_hash, "Spawning and upgrading should hash like the map functions")
+
+    def test_mirrored_path_cache(self):
+        game = self.make_turn_0_map()
+        game.game_map.add_unit("FF", [10,5])
+        game.game_map.add_unit("DF", [12,3], 1)
+        view = game.game_map.mirrored()
+        self.assertEqual("FF", view[17,5][0].unit_type, "The view should mirror locations")
+        self.assertEqual([], view[10,5])
+
+        mirrored = self.make_turn_0_map()
+        mirrored.game_map.add_unit("DF", [17,5])
+        mirrored.game_map.add_unit("FF", [15,3], 1)
+        self.assertEqual(view.blocked_hash, mirrored.game_map.blocked_hash, "Only the layout should matter for the blocked hash")
+        self.assertEqual(game.game_map.mirrored_zobrist_hash, view.zobrist_hash)
+
+        cache = PathCache()
+        game._shortest_path_finder.path_cache = cache
+        mirrored._shortest_path_finder.path_cache = cache
+        path = game.find_path_to_edge([11,2])
+        mirrored_path = mirrored.find_path_to_edge([16,2])
+        self.assertEqual([[27 - x, y] for x, y in path], mirrored_path, "The mirrored query should get the mirrored path")
+        self.assertEqual((0, 1, 1), (cache.hits, cache.mirror_hits, cache.misses))
+
+    def test_opponent_view(self):
+        game = self.make_turn_0_map()
+        game.game_map.add_unit("DF", [13,20], 1)
+        game.game_map.add_unit("FF", [13,7])
+        view = game.as_opponent()
+        turret = view.game_map[13,7][0]
+        self.assertEqual(("DF", 0, 7), (turret.unit_type, turret.player_index, turret.y), "The opponent's units should be player 0 on the bottom")
+        self.assertIs(game.game_map[13,20][0], turret.unit, "Units should not be copied")
+        self.assertEqual(1, view.game_map[13,20][0].player_index)
+        self.assertEqual([turret.unit], [unit.unit for unit in view.get_attackers([13,6], 1)])
+        self.assertEqual([], view.get_attackers([13,6], 0))
+        self.assertEqual(game.get_resource(game.SP, 1), view.get_resource(view.SP))
+        self.assertTrue(view.contains_stationary_unit([13,20]))
+
+        path = view.find_path_to_edge([13,0])
+        self.assertIn(path[-1], view.game_map.get_edge_locations(view.game_map.TOP_RIGHT), "Paths should be found in view coordinates")
+        self.assertEqual(0, view.attempt_spawn("PI", [13,0]))
+        self.assertIs(game, view.as_opponent())
+        game.game_map.remove_unit([13,20])
+        self.assertEqual([], view.game_map[13,7], "The view should follow the map")
+
+    def test_regions(self):
+        game = self.make_turn_0_map()
+        region = Region.from_rows({5: (11, 14), 6: (10, 12)})
+        self.assertEqual([[11,5], [12,5], [13,5], [10,6], [11,6]], region.locations(), "Regions should iterate row by row")
+        self.assertIn([12,5], region)
+        self.assertNotIn([12,6], region)
+        self.assertNotIn([-1,40], region)
+        game_map = game.game_map
+        self.assertEqual([list(location) for location in edge_locations(1)],
+                         game_map.get_edge_locations(game_map.TOP_LEFT) + game_map.get_edge_locations(game_map.TOP_RIGHT))
+        self.assertEqual({14 * 28 + 0, 13 * 28 + 1}, set(NEIGHBORS[13 * 28 + 0]), "Neighbors off the arena should be left out")
+
+        other = Region.from_locations([[13,5], [20,20]])
+        self.assertEqual(6, len(region | other))
+        self.assertEqual([[13,5]], (region & other).locations())
+        self.assertEqual(4, len(region - other))
+        self.assertEqual(Region.from_locations([[14,5], [7,20]]), other.mirrored())
+
+        path = game.find_path_to_edge([13,0])
+        bottom = get_region("bottom_half")
+        self.assertEqual([location for location in path if location[1] < 14], bottom.intersect_path(path))
+        self.assertEqual(len(bottom.intersect_path(path)), bottom.count_in_region(path))
+        self.assertEqual(len([location for location in game.game_map]), len(get_region("arena")))
+
+        try:
+            registered = register_region("test_region", [[1,13], [2,13]])
+            self.assertIs(registered, get_region("test_region"))
+            self.assertEqual("test_region", registered.name)
+        finally:
+            unregister_region("test_region")
+        self.assertIsNone(get_region("test_region"), "The test region should not leak into other tests")
+
+    def test_region_totals(self):
+        game = self.make_turn_0_map()
+        game_map = game.game_map
+        left = Region.from_rows({y: (0, 14) for y in range(14, 28)})
+        game_map.add_unit("FF", [10,15], 1)
+        totals = game_map.region_totals(left, 1)
+        wall_health = totals[0]
+        self.assertEqual(1, totals[1], "Structures already on the map should be counted")
+
+        game_map.add_unit("DF", [11,15], 1)
+        game_map.add_unit("DF", [20,15], 1)
+        game_map.add_unit("DF", [11,12], 0)
+        game_map.add_unit("PI", [12,15], 1)
+        self.assertEqual(2, totals[1], "Only structures of the player inside the region should be counted")
+        self.assertEqual(1, game_map.region_totals(left, 1, "DF")[1])
+
+        game_map.upgrade_unit([11,15])
+        self.assertEqual(1, totals[3])
+        turret = game_map[11,15][0]
+        self.assertEqual(wall_health + turret.health, totals[0])
+        self.assertEqual(game_map[10,15][0].cost[0] + turret.cost[0], totals[2], "Upgrades should count towards the cost")
+        game_map.set_unit_health([11,15], 1)
+        self.assertEqual(wall_health + 1, totals[0], "Damage should be reflected")
+        game_map.remove_unit([11,15])
+        self.assertEqual([wall_health, 1, game_map[10,15][0].cost[0], 0], totals)
+
+        view = game.as_opponent()
+        self.assertEqual(totals, view.game_map.region_totals(left.flipped(), 0), "The opponent view should swap players")
+
+        corner = Region.from_rows({y: (0, 3) for y in range(13, 16)})
+        with mock.patch.object(Region, "flipped", autospec=True, side_effect=Region.flipped) as flipped:
+            for _ in range(3):
+                view.game_map.region_totals(corner, 0)
+                view.game_map.mirrored().region_totals(corner, 0)
+        self.assertEqual(2, flipped.call_count, "The views should build the region they look up once")
+
+    def test_unit_registry(self):
+        registry = UnitRegistry()
+        units = [[[13,6,60.0,"1"],[14,6,60.0,"2"]],[],[[13,7,75.0,"3"]],[],[],[],[],[[13,7,75.0,"3"]]]
+        first = GameState(self.make_config(), json.dumps(self.make_frame(1, 0, p1units=units)), registry)
+        turret = first.game_map[13,7][0]
+        self.assertTrue(turret.upgraded)
+        self.assertEqual("3", turret.unit_id)
+        cost = turret.cost[0]
+
+        units = [[[13,6,30.0,"1"],[14,6,60.0,"5"]],[],[[13,7,75.0,"3"]],[],[],[],[[13,6,30.0,"1"]],[[13,7,75.0,"3"]]]
+        second = GameState(self.make_config(), json.dumps(self.make_frame(2, 0, p1units=units)), registry)
+        self.assertIs(turret, second.game_map[13,7][0], "A structure should keep its GameUnit")
+        self.assertEqual(cost, turret.cost[0], "A reused unit should not be upgraded twice")
+        self.assertIs(first.game_map[13,6][0], second.game_map[13,6][0])
+        self.assertEqual((30.0, True), (second.game_map[13,6][0].health, second.game_map[13,6][0].pending_removal))
+        self.assertIsNot(first.game_map[14,6][0], second.game_map[14,6][0], "A rebuilt structure should be a new unit")
+        self.assertIs(turret, registry.by_id("3"))
+        self.assertEqual((2, 4), (registry.reused, registry.created))
+        self.assertEqual(second.game_map.zobrist_hash, GameState(self.make_config(), json.dumps(self.make_frame(2, 0, p1units=units))).game_map.zobrist_hash)
+
+    def test_from_previous(self):
+        turns = [
+            [[[13,6,60.0,"1"],[14,6,60.0,"2"]],[],[[13,7,75.0,"3"]],[],[],[],[],[]],
+            [[[13,6,30.0,"1"],[14,6,60.0,"2"]],[],[[13,7,75.0,"3"],[10,9,75.0,"4"]],[[13,0,15.0,"5"]],[],[],[[14,6,60.0,"2"]],[[13,7,75.0,"3"]]],
+            [[[13,6,30.0,"1"],[14,6,60.0,"6"]],[],[[13,7,75.0,"3"]],[],[],[],[],[[13,7,75.0,"3"]]],
+        ]
+        state = None
+        for turn, units in enumerate(turns):
+            frame = json.dumps(self.make_frame(turn, 0, p1units=units))
+            fresh = GameState(self.make_config(), frame)
+            if state is None:
+                state = GameState(self.make_config(), frame)
+                threat_map = state.get_threat_map()
+                turret = state.game_map[13,7][0]
+                continue
+            state = GameState.from_previous(state, frame)
+            self.assertEqual(fresh.game_map.zobrist_hash, state.game_map.zobrist_hash)
+            for location in fresh.game_map:
+                self.assertEqual([(u.unit_type, u.health, u.upgraded, u.pending_removal) for u in fresh.game_map[location]],
+                    [(u.unit_type, u.health, u.upgraded, u.pending_removal) for u in state.game_map[location]])
+            self.assertEqual(sorted(fresh.game_map.occupied_locations()), sorted(state.game_map.occupied_locations()))
+        self.assertIs(turret, state.game_map[13,7][0], "An unchanged structure should keep its GameUnit")
+        self.assertIs(threat_map, state.get_threat_map(), "The threat map should follow the map")
+        self.assertEqual(len(fresh.get_attackers([10,12], 1)), threat_map.attacker_count([10,12], 1))
+
+        registry = UnitRegistry()
+        state = GameState(self.make_config(), json.dumps(self.make_frame(0, 0, p1units=turns[0])), registry)
+        wall = state.game_map[13,6][0]
+        state.game_map.remove_unit([13,6])
+        state = GameState.from_previous(state, json.dumps(self.make_frame(1, 0, p1units=turns[0])))
+        self.assertIs(wall, state.game_map[13,6][0], "A structure the map lost should be taken back from the registry")
+        self.assertEqual((3, 3), (registry.reused, registry.created), "Kept structures should count as reused")
+        self.assertEqual(GameState(self.make_config(), json.dumps(self.make_frame(1, 0, p1units=turns[0]))).game_map.zobrist_hash,
+                         state.game_map.zobrist_hash)
+
+    def test_threat_map(self):
+        game = self.make_turn_0_map()
+        threat_map = game.get_threat_map()
+        game.game_map.add_unit("DF", [13,10], 0)
+        game.game_map.add_unit("DF", [10,12], 0)
+        game.game_map.add_unit("FF", [11,12], 0)
+        game.game_map.upgrade_unit([10,12])
+        game.game_map.remove_unit([13,10])
+        for location in game.game_map:
+            attackers = game.get_attackers(location, 1)
+            self.assertEqual(len(attackers), threat_map.attacker_count(location, 1))
+            self.assertEqual(sum(unit.damage_i for unit in attackers), threat_map.damage(location, 1))
+        self.assertEqual(0, threat_map.attacker_count([10,12], 0), "Structures should not threaten their own side")
+        path = [[10,14],[10,15],[10,16]]
+        self.assertEqual(sum(threat_map.damage(location, 1) for location in path), threat_map.path_damage(path, 1))
+
+    def test_layout(self):
+        game = self.make_turn_0_map()
+        layout = Layout([("DF", [3,12], BUILD_OR_UPGRADE), ("FF", [4,13], BUILD), ("FF", [4,13], BUILD), ("FF", [5,13], UPGRADE), ("EF", [13,0], BUILD)])
+        self.assertEqual(4, len(layout), "Repeated BUILD entries should be dropped")
+        self.assertEqual([[24,12],[23,13],[22,13],[14,0]], layout.mirrored().locations())
+        game.game_map.add_unit("FF", [5,13], 0)
+        self.assertEqual([("DF", [3,12]), ("FF", [4,13]), ("EF", [13,0])], layout.missing(game.game_map))
+
+        layout.compile(game.config)
+        self.assertEqual(4, layout.apply(game), "Spawns and the upgrade should count")
+        self.assertEqual([("DF", 3, 12), ("FF", 4, 13), ("UP", 5, 13), ("EF", 13, 0)], game._build_stack, "Entries should be applied in order")
+        self.assertEqual(1, layout.apply(game), "Only the turret is left to upgrade")
+        self.assertEqual([], layout.missing(game.game_map), "Everything should be built")
+
+        game = self.make_turn_0_map()
+        self.assertEqual(5, Layout.from_locations("FF", [[x, 13] for x in range(2, 12)]).apply(game, reserve=20), "The reserve should hold back SP")
+
+    def test_build_planner(self):
+        game = self.make_turn_0_map()
+        game._player_resources[0]["SP"] = 4
+        planner = BuildPlanner(game.config)
+        planner.add("EF", [13,0], 5)
+        planner.add("DF", [3,12], 4)
+        planner.add("DF", [24,12], 4)
+        self.assertEqual([("build", "DF", [3,12]), ("build", "DF", [24,12])], planner.plan(game), "Two turrets are worth more than the factory")
+
+        planner.clear()
+        planner.add("DF", [3,12], 4)
+        planner.add("DF", [3,12], 1, upgrade=True)
+        planner.add("FF", [4,13], 2)
+        self.assertEqual([("build", "DF", [3,12]), ("build", "FF", [4,13])], planner.plan(game), "The upgrade does not fit with its turret")
+        game._player_resources[0]["SP"] = 7
+        self.assertEqual(3, planner.apply(game))
+        self.assertEqual([("DF", 3, 12), ("UP", 3, 12), ("FF", 4, 13)], game._build_stack, "The upgrade should follow the turret it upgrades")
+
+        game = self.make_turn_0_map()
+        game.game_map.add_unit("DF", [3,12], 0)
+        game._player_resources[0]["SP"] = 5
+        planner.clear()
+        planner.add_layout(Layout([("DF", [3,12], BUILD_OR_UPGRADE), ("FF", [4,13], BUILD), ("FF", [5,13], BUILD)]))
+        self.assertEqual([("upgrade", "DF", [3,12]), ("build", "FF", [4,13])], planner.plan(game), "Built structures can only be upgraded")
+
+        game._player_resources[0]["SP"] = 4
+        planner.clear()
+        planner.add_layout(Layout([("EF", [13,0], BUILD)]) + Layout.from_locations("FF", [[x, 13] for x in range(6, 10)]))
+        self.assertEqual([("build", "EF", [13,0])], planner.plan(game), "Cheap later entries should not outvalue an earlier entry")
+        game._player_resources[0]["SP"] = 6
+        self.assertEqual([("build", "EF", [13,0]), ("build", "FF", [6,13]), ("build", "FF", [7,13])], planner.plan(game))
+
+    def test_chokepoints(self):
+        game = self.make_turn_0_map()
+        analyzer = ChokepointAnalyzer()
+        self.assertEqual(28, len(analyzer.min_cut(game.game_map)), "Every bottom edge cell has to be blocked on an empty board")
+        self.assertFalse(analyzer.separators(game.game_map), "No single cell blocks an empty board")
+
+        for x in range(28):
+            if x != 13:
+                game.game_map.add_unit("FF", [x, 13], 0)
+        self.assertEqual([[13,12], [13,13], [13,14]], analyzer.separators(game.game_map).locations())
+        self.assertIn([1,14], analyzer.articulation_cells(game.game_map), "The only way to the corner cell")
+        self.assertEqual([[13,12]], analyzer.min_cut(game.game_map, allowed=[[13,11], [13,12]]).locations())
+        self.assertIsNone(analyzer.min_cut(game.game_map, allowed=[[5,5]]), "No cut uses only allowed cells")
+        misses = analyzer.misses
+        analyzer.separators(game.game_map)
+        self.assertEqual((misses, 1), (analyzer.misses, analyzer.hits), "The same board should be answered from the cache")
+
+    def test_path_traffic(self):
+        game = self.make_turn_0_map()
+        for x in range(4, 24):
+            game.game_map.add_unit("FF", [x, 13], 0)
+        weights = {(0, 13): 2, (3, 10): 1, (27, 13): 1, (10, 17): 0.5}
+        expected = {}
+        for location, weight in weights.items():
+            for x, y in game.find_path_to_edge(list(location)):
+                expected[(x, y)] = expected.get((x, y), 0) + weight
+        self.assertEqual(expected, game.path_traffic(weights), "Traffic should add up the paths of every start")
+
+        starts = [list(location) for location in weights]
+        sums = game.path_sums(starts, lambda location: location[0])
+        self.assertEqual({location: (sum(x for x, _ in game.find_path_to_edge(list(location))), len(game.find_path_to_edge(list(location))))
+                          for location in weights}, sums, "Sums should match summing over every path")
+
+        traffic = game.path_traffic(target_edge=game.game_map.BOTTOM_LEFT)
+        self.assertEqual(14, sum(traffic.get(tuple(location), 0) for location in game.game_map.get_edge_locations(game.game_map.BOTTOM_LEFT)),
+            "Every start should end on the target edge")
+
+    def test_placement_scorer(self):
+        game = self.make_turn_0_map()
+        for x in range(28):
+            if x != 13:
+                game.game_map.add_unit("FF", [x, 13], 0)
+        scorer = PlacementScorer(game, {(13, 27): 2, (20, 21): 1})
+        candidates = [("FF", [13,12]), ("FF", [13,2]), ("FF", [5,13]), ("DF", [13,11]), ("DF", [3,3])]
+        self.assertEqual([3, 0, 0, 0, 0], scorer.lengthened(candidates), "Only the gap is on every path, built cells score 0")
+
+        damage = scorer.damage(candidates)
+        self.assertEqual(0, damage[0], "Walls deal no damage")
+        self.assertGreater(damage[3], 0)
+        game.game_map.add_unit("DF", [3,3], 0)
+        self.assertAlmostEqual(scorer.damage_to_go + damage[4], PlacementScorer(game, scorer.weights).damage_to_go,
+            msg="The score should be the damage the turret adds")
+        self.assertEqual([("DF", [13,11]), ("FF", [13,12])], [(unit_type, location) for _, unit_type, location in scorer.rank(candidates, count=2)])
+
+    def test_transposition_table(self):
+        table = TranspositionTable(size=1)
+        self.assertIsNone(table.probe(1, [(3, 5)], [[13,0]]))
+        table.store(1, [(3, 5)], [[13,0]], 2, 30, 1, depth=10)
+        self.assertEqual((2, 30, 1), table.probe(1, [(3, 5)], [[13,0]]))
+        self.assertEqual((1, 1), (table.hits, table.misses))
+
+        table.store(2, [(3, 5)], [[13,0]], 0, 0, 0, depth=1)
+        table.store(3, [(3, 5)], [[13,0]], 0, 0, 0, depth=1)
+        self.assertIsNotNone(table.probe(1, [(3, 5)], [[13,0]]), "Shallow entries should not replace a deep one")
+        self.assertIsNone(table.probe(2, [(3, 5)], [[13,0]]), "The second slot should be replaced")
+
+        table.new_generation()
+        table.store(4, [(3, 5)], [[13,0]], 0, 0, 0, depth=1)
+        table.store(5, [(3, 5)], [[13,0]], 0, 0, 0, depth=1)
+        self.assertIsNone(table.probe(1, [(3, 5)], [[13,0]]), "Entries from older generations should age out")
+        self.assertEqual(2, table.stats()["entries"])
+
+    def test_path_cache(self):
+        game = self.make_turn_0_map()
+        cache = PathCache()
+        game._shortest_path_finder.path_cache = cache
+        path = game.find_path_to_edge([13,0])
+        self.assertEqual(path, game.find_path_to_edge([13,0]), "Cached paths should match computed paths")
+        self.assertEqual(1, cache.hits)
+        game.game_map.add_unit("FF", path[3])
+        self.assertNotEqual(path, game.find_path_to_edge([13,0]), "Blocking the path should not reuse the cached path")
+        self.assertEqual(2, cache.misses)
+        game.game_map.remove_unit(path[3])
+        self.assertEqual(path, game.find_path_to_edge([13,0]))
+        self.assertEqual(2, cache.hits, "The old layout should be found again")
+
+        cache.max_bytes = cache.bytes_used
+        game.find_path_to_edge([10,3])
+        self.assertGreater(cache.stats()["evictions"], 0, "Going over the memory ceiling should evict paths")
+        self.assertLessEqual(cache.bytes_used, cache.max_bytes)
@@ -0,0 +1,116 @@
+import math
+
+
+class ThreatMap:
+    """Keeps how many structures can attack each location, and the damage they deal per frame.
+
+    The map is built once from a GameMap and then follows it: the GameMap calls on_structure
+    whenever a structure is added, removed, upgraded or damaged, and only the locations in range of
+    that structure are updated. Keep using the same GameMap, for example with GameState.from_previous,
+    and the threat map carries over between turns for the cost of the structures that changed.
+
+    Like GameState.get_attackers, a structure threatens the locations within its attackRange.
+    Only structures are counted, mobile units are not.
+
+    Attributes :
+        * game_map (:obj: GameMap): The map the threats are kept for
+        * follow (bool): If the threat map is kept up to date with the map. Views like OpponentGameMap can not be followed
+
+    """
+    def __init__(self, game_map, follow=True):
+        self.game_map = game_map
+        self.__size = game_map.ARENA_SIZE
+        self.__stencils = {}
+        cells = self.__size * self.__size
+        self.__counts = [[0] * cells, [0] * cells]
+        self.__damage = [[0.0] * cells, [0.0] * cells]
+        for location in game_map:
+            for unit in game_map[location]:
+                if unit.stationary:
+                    self.on_structure(unit, 1)
+        self.follow = follow
+        if follow:
+            game_map.add_listener(self)
+
+    def stencil(self, x, y, attack_range):
+        """Gets the locations in range of a structure at [x, y], computed once per location and range
+
+        Returns:
+            A list of y * 28 + x indices, do not modify it
+
+        """
+        key = (x, y, attack_range)
+        stencil = self.__stencils.get(key)
+        if stencil is None:
+            stencil = []
+            reach = int(math.ceil(attack_range))
+            for i in range(x - reach, x + reach + 1):
+                for j in range(y - reach, y + reach + 1):
+                    if self.game_map.in_arena_bounds([i, j]) and math.sqrt((i - x)**2 + (j - y)**2) <= attack_range:
+                        stencil.append(j * self.__size + i)
+            self.__stencils[key] = stencil
+        return stencil
+
+    def on_structure(self, unit, sign):
+        """Adds or subtracts the threat of a structure, called by GameMap
+
+        Args:
+            unit: The structure
+            sign: 1 if the structure was put on the map, -1 if it was taken off
+
+        """
+        if unit.damage_i + unit.damage_f <= 0:
+            return
+        counts = self.__counts[unit.player_index]
+        damage = self.__damage[unit.player_index]
+        amount = sign * unit.damage_i
+        for index in self.stencil(unit.x, unit.y, unit.attackRange):
+            counts[index] += sign
+            damage[index] += amount
+
+    def attacker_count(self, location, player_index):
+        """Counts the structures that would attack a unit at a location
+
+        Args:
+            location: The location of a hypothetical defender
+            player_index: The index corresponding to the defending player, 0 for you 1 for the enemy
+
+        Returns:
+            The number of enemy structures in range, the structures get_attackers would return
+
+        """
+        return self.__counts[1 - player_index][location[1] * self.__size + location[0]]
+
+    def damage(self, location, player_index):
+        """Gets the damage a mobile unit at a location would take each frame from structures
+
+        Args:
+            location: The location of a hypothetical defender
+            player_index: The index corresponding to the defending player, 0 for you 1 for the enemy
+
+        Returns:
+            The summed damage of the enemy structures in range
+
+        """
+        return self.__damage[1 - player_index][location[1] * self.__size + location[0]]
+
+    def path_damage(self, path, player_index):
+        """Sums the damage a mobile unit would take over a path, one frame per location
+
+        Args:
+            path: A list of [x, y] locations, as returned by find_path_to_edge
+            player_index: The index corresponding to the player the unit belongs to
+
+        Returns:
+            The summed damage
+
+        """
+        damage = self.__damage[1 - player_index]
+        return sum(damage[location[1] * self.__size + location[0]] for location in path)
+
+    def detach(self):
+        """Stops following the game map
+        """
+        if self.follow:
+            self.game_map.remove_listener(self)
+            self.follow = False
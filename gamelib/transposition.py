@@ -0,0 +1,115 @@
+class TranspositionTable:
+    """Remembers the outcome of simulated attacks so the same attack against the same defense is only simulated once.
+
+    Entries are keyed on the board hash (see GameMap.zobrist_hash), the composition of the attacking units
+    and the tiles they are spawned on, and hold the predicted breaches, damage dealt and structures destroyed.
+
+    The table has a fixed number of buckets with two slots each. The first slot keeps the deepest entry
+    (the most expensive simulation) of the current generation, the second slot is always replaced.
+    Call new_generation() once per turn so entries from older turns age out of the first slot
+    instead of pinning it forever.
+
+    Attributes :
+        * size (int): The number of buckets, the table holds at most twice as many entries
+        * generation (int): The current generation, increased by new_generation()
+        * hits (int): Number of probes that found an entry
+        * misses (int): Number of probes that did not
+        * stores (int): Number of entries stored
+        * replacements (int): Number of stores that overwrote an entry with a different key
+
+    """
+    def __init__(self, size=4096):
+        self.size = size
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.replacements = 0
+        self._slots = [None] * (size * 2)
+
+    def _key(self, board_hash, attackers, spawn_tiles):
+        """Normalizes the parts of a key, so the order of attackers and spawn tiles does not matter
+        """
+        attackers = tuple(sorted(attackers))
+        spawn_tiles = tuple(sorted((location[0], location[1]) for location in spawn_tiles))
+        return (board_hash, attackers, spawn_tiles)
+
+    def _bucket(self, key):
+        return (hash(key) % self.size) * 2
+
+    def new_generation(self):
+        """Starts a new generation. Entries are kept, but entries of older generations can be replaced by shallower ones.
+        """
+        self.generation += 1
+
+    def probe(self, board_hash, attackers, spawn_tiles):
+        """Looks up the outcome of an attack
+
+        Args:
+            board_hash: The hash of the defending board, usually game_map.zobrist_hash
+            attackers: The attacking units, for example a list of (unit_type, count) tuples
+            spawn_tiles: The [x, y] locations the attackers are spawned on
+
+        Returns:
+            A (breaches, damage, destroyed) tuple, or None if the attack is not in the table
+
+        """
+        key = self._key(board_hash, attackers, spawn_tiles)
+        bucket = self._bucket(key)
+        for slot in (bucket, bucket + 1):
+            entry = self._slots[slot]
+            if entry is not None and entry[0] == key:
+                self.hits += 1
+                return entry[3]
+        self.misses += 1
+        return None
+
+    def store(self, board_hash, attackers, spawn_tiles, breaches, damage, destroyed, depth=0):
+        """Stores the outcome of an attack
+
+        Args:
+            board_hash: The hash of the defending board, usually game_map.zobrist_hash
+            attackers: The attacking units, for example a list of (unit_type, count) tuples
+            spawn_tiles: The [x, y] locations the attackers are spawned on
+            breaches: The predicted number of breaches
+            damage: The predicted damage dealt by or to the attackers
+            destroyed: The predicted number of structures destroyed
+            depth: How expensive the simulation was, for example the number of frames simulated.
+                Deeper entries are kept over shallower ones
+
+        """
+        key = self._key(board_hash, attackers, spawn_tiles)
+        bucket = self._bucket(key)
+        entry = (key, depth, self.generation, (breaches, damage, destroyed))
+        self.stores += 1
+
+        deep = self._slots[bucket]
+        if deep is None or deep[0] == key or deep[2] != self.generation or depth >= deep[1]:
+            if deep is not None and deep[0] != key:
+                # Demote the previous deep entry rather than dropping it
+                if self._slots[bucket + 1] is not None and self._slots[bucket + 1][0] != key:
+                    self.replacements += 1
+                self._slots[bucket + 1] = deep
+            elif self._slots[bucket + 1] is not None and self._slots[bucket + 1][0] == key:
+                self._slots[bucket + 1] = None
+            self._slots[bucket] = entry
+            return
+
+        if self._slots[bucket + 1] is not None and self._slots[bucket + 1][0] != key:
+            self.replacements += 1
+        self._slots[bucket + 1] = entry
+
+    def clear(self):
+        """Drops every entry. Counters are kept
+        """
+        self._slots = [None] * (self.size * 2)
+
+    def stats(self):
+        """Gets the counters of the table
+
+        Returns:
+            A dict with hits, misses, stores, replacements and the number of entries in use
+
+        """
+        used = sum(1 for entry in self._slots if entry is not None)
+        return {"hits": self.hits, "misses": self.misses, "stores": self.stores, "replacements": self.replacements, "entries": used}
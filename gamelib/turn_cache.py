@@ -0,0 +1,96 @@
+import time
+
+from .util import debug_write
+
+
+class TurnCache:
+    """Memoizes queries derived from a GameState for the turn it belongs to.
+
+    Queries are registered once and then called through the function register() returns.
+    A result is reused as long as it is asked for with the same GameState and arguments, and neither the
+    state's mutation_count nor the zobrist_hash of its map has changed. Spawning, removing or upgrading during
+    the turn invalidates it, and so do changes made directly on the GameMap, like remove_unit.
+    Only results for the latest GameState are kept.
+
+    Results are shared between callers, queries returning lists that callers modify should not be cached.
+
+    Attributes :
+        * stats (dict): Maps each query name to [hits, misses, seconds spent computing]
+
+    """
+    def __init__(self):
+        self.stats = {}
+        self._queries = {}
+        self._entries = {}
+        self._state = None
+
+    def register(self, name, query):
+        """Registers a query
+
+        Args:
+            name: The name of the query, used in reports
+            query: A function taking a GameState followed by any hashable arguments
+
+        Returns:
+            A function with the same signature as query that uses the cache
+
+        """
+        self._queries[name] = query
+        self.stats[name] = [0, 0, 0.0]
+
+        def cached_query(game_state, *args):
+            return self.get(name, game_state, *args)
+        return cached_query
+
+    def get(self, name, game_state, *args):
+        """Gets the result of a registered query, computing it if there is no valid cached result
+
+        Args:
+            name: The name the query was registered with
+            game_state: The GameState to run the query on
+            args: Additional arguments passed to the query
+
+        Returns:
+            The result of the query
+
+        """
+        if game_state is not self._state:
+            self._state = game_state
+            self._entries = {}
+
+        key = (name, args)
+        entry = self._entries.get(key)
+        stats = self.stats[name]
+        version = (game_state.mutation_count, game_state.game_map.zobrist_hash)
+        if entry is not None and entry[0] == version:
+            stats[0] += 1
+            return entry[1]
+
+        stats[1] += 1
+        start = time.time()
+        result = self._queries[name](game_state, *args)
+        stats[2] += time.time() - start
+        self._entries[key] = (version, result)
+        return result
+
+    def clear(self):
+        """Drops every cached result
+        """
+        self._state = None
+        self._entries = {}
+
+    def report(self):
+        """Gets the hit and miss counts of every query
+
+        Returns:
+            A list of (name, hits, misses, seconds spent computing), slowest query first
+
+        """
+        rows = [(name, hits, misses, seconds) for name, (hits, misses, seconds) in self.stats.items()]
+        return sorted(rows, key=lambda row: -row[3])
+
+    def debug_report(self):
+        """Prints the report to the debug output
+        """
+        for name, hits, misses, seconds in self.report():
+            debug_write("{}: {} hits, {} misses, {:.1f} ms".format(name, hits, misses, seconds * 1000))
@@ -0,0 +1,142 @@
+STRUCTURE_INDICES = (0, 1, 2)
+"""Config indices of the structure types, walls, factories and turrets"""
+
+
+class TurretStats:
+    """Accumulates the damage each structure deals to mobile units, using the attack events of action frames.
+
+    Attack events are attributed to the structure that made them, by its unit id. The damage of a turn is
+    folded into the game totals when a frame of a later turn is recorded, or when update() is called once the
+    action phase is over, for example at the start of on_turn. The structures of each player are ranked by their
+    game totals at that moment. Queries return the ranking of the last fold, they do not scan stored frames or the board.
+
+    A structure leaves the ranking when it dies. A structure rebuilt at the same location starts over.
+    Only turrets attack in the default config, but any structure that attacks is tracked.
+    The attack and death events of every frame are needed, subscribe to them if frames are filtered
+    (see AlgoCore.subscribe_frames).
+
+    """
+    def __init__(self):
+        self._current_turn = None
+        self._folded_turn = None
+        self._turn_damage = {}
+        self._dead = set()
+        self._unfolded = False
+        # unit id -> [player index, (x, y), damage over the game, damage last turn]
+        self._units = {}
+        self._by_location = [{}, {}]
+        self._ranked = [[], []]
+        self._ranks = [{}, {}]
+
+    def record(self, state):
+        """Adds the attack and death events of a parsed action frame
+
+        Args:
+            state: The action frame, as returned by json.loads
+
+        """
+        turn_number = int(state["turnInfo"][1])
+        if turn_number != self._current_turn:
+            self.update()
+            self._current_turn = turn_number
+        self._unfolded = True
+
+        events = state["events"]
+        for event in events.get("attack", ()):
+            if int(event[3]) not in STRUCTURE_INDICES:
+                continue
+            unit_id = event[4]
+            if unit_id not in self._units:
+                self._units[unit_id] = [int(event[6]) - 1, (int(event[0][0]), int(event[0][1])), 0.0, 0.0]
+            self._turn_damage[unit_id] = self._turn_damage.get(unit_id, 0.0) + event[2]
+        for event in events.get("death", ()):
+            if int(event[1]) in STRUCTURE_INDICES:
+                self._dead.add(event[2])
+
+    def update(self):
+        """Folds the damage recorded since the last fold into the totals and ranks the structures again.
+        Call it once the action phase is over, queries do not fold a turn that may still be running.
+        Does nothing if nothing was recorded since the last fold.
+        """
+        if not self._unfolded:
+            return
+        if self._current_turn != self._folded_turn:
+            for unit in self._units.values():
+                unit[3] = 0.0
+        for unit_id, damage in self._turn_damage.items():
+            unit = self._units[unit_id]
+            unit[2] += damage
+            unit[3] += damage
+        for unit_id in self._dead:
+            self._units.pop(unit_id, None)
+        self._turn_damage = {}
+        self._dead = set()
+        self._unfolded = False
+
+        self._by_location = [{}, {}]
+        for unit_id, unit in self._units.items():
+            self._by_location[unit[0]][unit[1]] = unit_id
+        for player_index in (0, 1):
+            by_location = self._by_location[player_index]
+            ranked = sorted(by_location, key=lambda location: -self._units[by_location[location]][2])
+            self._ranked[player_index] = [[x, y] for x, y in ranked]
+            self._ranks[player_index] = {location: rank for rank, location in enumerate(ranked)}
+        self._folded_turn = self._current_turn
+
+    def ranked(self, player_index, count=None):
+        """Gets the structures of a player that dealt damage, most damage over the game first
+
+        Args:
+            player_index: The owner of the structures, 0 for you 1 for your opponent
+            count: The number of locations to return, None for all
+
+        Returns:
+            A list of [x, y] locations
+
+        """
+        ranked = self._ranked[player_index]
+        return list(ranked if count is None else ranked[:count])
+
+    def most_dangerous(self, count=None):
+        """Gets the enemy structures that dealt the most damage to your units, see ranked
+        """
+        return self.ranked(1, count)
+
+    def most_useful(self, count=None):
+        """Gets your structures that dealt the most damage to enemy units, see ranked
+        """
+        return self.ranked(0, count)
+
+    def damage_dealt(self, location, player_index, last_turn=False):
+        """Gets the damage dealt by the structure at a location
+
+        Args:
+            location: The [x, y] location of the structure
+            player_index: The owner of the structure, 0 for you 1 for your opponent
+            last_turn: If True, only the damage of the last folded turn is returned
+
+        Returns:
+            The damage dealt, 0 if the structure is not tracked
+
+        """
+        unit_id = self._by_location[player_index].get((location[0], location[1]))
+        if unit_id is None:
+            return 0
+        return self._units[unit_id][3 if last_turn else 2]
+
+    def prioritize(self, locations, player_index):
+        """Orders locations so the structures that dealt the most damage come first, see ranked
+
+        Args:
+            locations: A list of [x, y] locations, for example a list of upgrade targets
+            player_index: The owner of the structures
+
+        Returns:
+            A new list with the same locations. Structures that dealt no damage keep their order, after the others
+
+        """
+        ranks = self._ranks[player_index]
+        if not ranks:
+            return list(locations)
+        last = len(ranks)
+        return sorted(locations, key=lambda location: ranks.get((location[0], location[1]), last))
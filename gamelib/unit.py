@@ -30,6 +30,7 @@ class GameUnit:
         * shieldPerUnit (float): how much shield is given per unit
         * pending_removal (boolean): If this unit is marked for removal by its owner
         * upgraded (boolean): If this unit is upgraded
+        * unit_id (string): The id the engine gave this unit, None for units that were not parsed
 
     """
     def __init__(self, unit_type, config, player_index=None, health=None, x=-1, y=-1):
@@ -41,6 +42,7 @@ class GameUnit:
         self.player_index = player_index
         self.pending_removal = False
         self.upgraded = False
+        self.unit_id = None
         self.x = x
         self.y = y
         self.__serialize_type()
@@ -74,6 +76,13 @@ class GameUnit:
         self.upgraded = True
 
 
+    def remove_upgrade(self):
+        """Restores the stats this unit had before it was upgraded
+        """
+        if self.upgraded:
+            self.__serialize_type()
+            self.upgraded = False
+
     def __toString(self):
         owner = "Friendly" if self.player_index == 0 else "Enemy"
         removal = ", pending removal" if self.pending_removal else ""
@@ -85,3 +94,31 @@ class GameUnit:
     def __repr__(self):
         return self.__toString()
 
+
+
+class OpponentGameUnit:
+    """A GameUnit seen from the opponent's side of the board, used by OpponentGameMap.
+
+    player_index is swapped and y is flipped, every other attribute is read from the wrapped unit,
+    so the view stays up to date without copying the unit.
+
+    Attributes :
+        * unit (:obj: GameUnit): The wrapped unit
+        * player_index (integer): The player that controls this unit, 0 for the opponent 1 for you.
+        * y (integer): The flipped y coordinate of the unit
+
+    """
+    def __init__(self, unit, arena_size=28):
+        self.unit = unit
+        self.player_index = None if unit.player_index is None else 1 - unit.player_index
+        self.y = arena_size - 1 - unit.y
+
+    def __getattr__(self, name):
+        return getattr(self.unit, name)
+
+    def __str__(self):
+        owner = "Friendly" if self.player_index == 0 else "Enemy"
+        return "{} {}, health: {} location: {} (opponent view)".format(owner, self.unit_type, self.health, [self.x, self.y])
+
+    def __repr__(self):
+        return self.__str__()
@@ -0,0 +1,97 @@
+from .unit import GameUnit
+
+
+class UnitRegistry:
+    """Keeps the structures of the previous turn so a new GameState can reuse their GameUnit objects.
+
+    Pass the same registry to every GameState you create for a turn, GameState.from_previous uses the
+    registry of the previous state. A structure is matched by owner, type and location, and by the unit id
+    the engine sends when there is one. A matched GameUnit is updated in place (health and pending removal),
+    so the same structure is the same object for as long as it stands and anything attached to it carries
+    over between turns.
+
+    A reused unit starts the turn not upgraded, so the upgrade entries of the turn decide its stats like they do for new units.
+    Game states of earlier turns share the reused units and are out of date once a new turn is parsed.
+    Mobile units only live for one action phase and are always created.
+
+    Attributes :
+        * reused (int): Number of units reused over the whole game
+        * created (int): Number of units created over the whole game
+
+    """
+    def __init__(self):
+        self.reused = 0
+        self.created = 0
+        self._units = {}
+        self._next = {}
+        self._by_id = {}
+
+    def begin_turn(self):
+        """Starts matching the units of a new turn. Called by GameState before parsing
+        """
+        self._next = {}
+
+    def end_turn(self):
+        """Forgets the structures that were not seen this turn. Called by GameState after parsing
+        """
+        self._units = self._next
+        self._next = {}
+        self._by_id = {unit.unit_id: unit for unit in self._units.values() if unit.unit_id is not None}
+
+    def get_unit(self, unit_type, config, player_index, health, x, y, unit_id=None):
+        """Gets the unit for a parsed unit entry, reusing last turn's GameUnit if it is the same structure
+
+        Args:
+            unit_type, config, player_index, health, x, y: As in GameUnit
+            unit_id: The id the engine gave the unit, None if unknown
+
+        Returns:
+            A GameUnit with the given health that is neither upgraded nor pending removal
+
+        """
+        key = (player_index, unit_type, x, y)
+        unit = self._units.get(key)
+        if unit is not None and (unit_id is None or unit.unit_id is None or unit.unit_id == unit_id) and key not in self._next:
+            unit.health = health
+            unit.pending_removal = False
+            # The upgrade entries of the turn are parsed after the units and upgrade it again
+            unit.remove_upgrade()
+            if unit_id is not None:
+                unit.unit_id = unit_id
+            self.reused += 1
+        else:
+            unit = GameUnit(unit_type, config, player_index, health, x, y)
+            unit.unit_id = unit_id
+            self.created += 1
+        self.track(unit)
+        return unit
+
+    def keep(self, unit):
+        """Records that a structure of the last turn is still on the board, updated in place by
+        GameState.from_previous. It is counted as reused and can be reused next turn
+        """
+        self.reused += 1
+        self.track(unit)
+
+    def track(self, unit):
+        """Records that a structure is on the board this turn, so the next turn can reuse it.
+        Called by get_unit and keep. Mobile units are ignored
+        """
+        if unit.stationary:
+            self._next[(unit.player_index, unit.unit_type, unit.x, unit.y)] = unit
+
+    def by_id(self, unit_id):
+        """Gets a structure of the last parsed turn by its unit id
+
+        Returns:
+            The GameUnit, or None if no structure has that id
+
+        """
+        return self._by_id.get(unit_id)
+
+    def clear(self):
+        """Forgets every unit, the next turn creates all units again
+        """
+        self._units = {}
+        self._next = {}
+        self._by_id = {}